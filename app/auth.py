@@ -1,21 +1,42 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 
+import metrics
 from settings import AppSettings
 from sql_app.models.user import User as DbUser
-from sql_app.database import get_database
+from sql_app.database import get_database, get_mode_database, run_db
+from user_cache import UserCache, CachedUser
 
 # Secret key to encode the JWT token
 SECRET_KEY = AppSettings.TOKEN
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max_rounds равны стоимости по умолчанию: needs_update срабатывает на любой хэш с другой стоимостью
+pwd_context = CryptContext(schemes=["bcrypt"],
+                           deprecated="auto",
+                           bcrypt__rounds=AppSettings.BCRYPT_ROUNDS,
+                           bcrypt__min_rounds=AppSettings.BCRYPT_ROUNDS,
+                           bcrypt__max_rounds=AppSettings.BCRYPT_ROUNDS)
+# bcrypt отпускает GIL, поэтому хватает потоков. Отдельный ограниченный пул не даёт всплеску входов
+# занять потоки обработчиков и все ядра: лишние хэши ждут в его очереди, не блокируя остальные запросы
+password_executor = ThreadPoolExecutor(max_workers=AppSettings.PASSWORD_HASH_WORKERS,
+                                       thread_name_prefix='password-hash')
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+user_cache = UserCache(ttl=AppSettings.USER_CACHE_TTL, max_size=AppSettings.USER_CACHE_SIZE)
+USER_CACHE_LOOKUPS = metrics.Counter('auth_user_cache_lookups_total',
+                                     'Authenticated user lookups by cache result',
+                                     ['result'])
 
 
 def verify_password(plain_password, hashed_password):
@@ -26,10 +47,41 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
-def authenticate_user(db: Session, username: str, password: str):
+async def run_password_hashing(func, *args):
+    return await asyncio.wrap_future(password_executor.submit(func, *args))
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await run_password_hashing(pwd_context.hash, password)
+
+
+def get_db_user(db: Session, username: str) -> DbUser | None:
     user = db.query(DbUser).filter(DbUser.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+    # Соединение возвращается в пул сразу: пока запрос ждёт очереди bcrypt, оно нужно другим
+    if user is not None:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+
+def rehash_password(db: Session, user_id: int, hashed_password: str):
+    db.execute(update(DbUser).where(DbUser.id == user_id).values(hashed_password=hashed_password))
+    db.commit()
+
+
+async def authenticate_user(db: Session, username: str, password: str):
+    """
+    Проверка пароля в пуле password_executor. Если хэш посчитан с другой стоимостью bcrypt,
+    он прозрачно пересчитывается с текущей и сохраняется.
+    """
+    user = await run_in_threadpool(get_db_user, db, username)
+    if not user:
         return False
+    valid, new_hash = await run_password_hashing(pwd_context.verify_and_update, password, user.hashed_password)
+    if not valid:
+        return False
+    if new_hash:
+        await run_in_threadpool(rehash_password, db, user.id, new_hash)
     return user
 
 
@@ -44,20 +96,49 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_database)):
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def get_token_claims(token: str) -> tuple[str, int | None]:
+    """Имя пользователя и его id из токена; у токенов, выданных до появления uid, id нет."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise credentials_exception()
     except JWTError:
-        raise credentials_exception
-    user = db.query(DbUser).filter(DbUser.username == username).first()
+        raise credentials_exception()
+    return username, payload.get("uid")
+
+
+def cached_user(username: str, user_id: int | None) -> CachedUser | None:
+    user = user_cache.get(username)
+    if user is not None and (user_id is None or user.id == user_id):
+        USER_CACHE_LOOKUPS.inc(result='hit')
+        return user
+    USER_CACHE_LOOKUPS.inc(result='miss')
+    return None
+
+
+def cache_user(user: DbUser | None, user_id: int | None, generation: int) -> CachedUser:
+    # Пользователь с тем же именем, но другим id — пересозданная учётка: старый токен к ней не подходит
+    if user is None or (user_id is not None and user.id != user_id):
+        raise credentials_exception()
+    result = CachedUser.from_orm(user)
+    user_cache.put(result, generation)
+    return result
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme),
+                           db: Session | AsyncSession = Depends(get_mode_database)):
+    username, user_id = get_token_claims(token)
+    user = cached_user(username, user_id)
     if user is None:
-        raise credentials_exception
+        generation = user_cache.generation()
+        user = cache_user(await run_db(db, get_db_user, username=username), user_id, generation)
     return user
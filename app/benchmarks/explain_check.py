@@ -0,0 +1,108 @@
+"""
+Проверка планов горячих запросов: падает, если на большом наборе данных запрос читает
+крупную таблицу последовательным сканированием вместо индекса.
+
+Запуск из каталога app на отдельной (не боевой!) базе после create_tables.py и migrate.py:
+    DATABASE_URL=... python -m benchmarks.explain_check --seed
+--seed досыпает синтетические релизы, фичи, задачи, вложения и комментарии генератором benchmarks.generate_data
+(он же обновляет статистику). Код возврата 1 — есть регрессия плана.
+"""
+import argparse
+import json
+import sys
+import time
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from benchmarks import generate_data
+from sql_app import features_service, releases_service, tasks_service
+from sql_app.database import engine
+from sql_app.models.features import Feature
+from sql_app.models.releases import Release
+from sql_app.models.task import Task
+
+LARGE_TABLES = {'releases', 'features', 'tasks', 'attachment_links', 'task_comments'}
+
+
+def seed(features: int, releases: int):
+    """Синтетические данные генератором benchmarks.generate_data: features фич поровну на releases релизов."""
+    generate_data.generate(tag=f'explain{int(time.time()):x}', platforms=3, channels=2, releases=releases,
+                           features_per_release=max(1, -(-features // releases)), tasks_per_feature=3,
+                           attachments_per_task=1, comments_per_task=1, batch=100)
+
+
+def hot_queries(db: Session) -> dict:
+    feature = db.execute(select(Feature).where(Feature.jira_key.isnot(None)).order_by(Feature.id.desc())
+                         .limit(1)).scalar_one()
+    release = db.get(Release, feature.release_id)
+    page_size = 50
+    return {
+        'features: page of release': features_service.features_page_ids_stmt(page_size=page_size,
+                                                                             release_id=release.id),
+        'features: page of creator': features_service.features_page_ids_stmt(page_size=page_size,
+                                                                             user_id=feature.creator_id),
+        'features: page of status': features_service.features_page_ids_stmt(page_size=page_size,
+                                                                            feature_status=feature.status),
+        'features: count of release': features_service.features_count_stmt(release_id=release.id),
+        'features: aggregated page rows': features_service.all_features_stmt().where(
+            Feature.id.in_(features_service.features_page_ids_stmt(page_size=page_size,
+                                                                   release_id=release.id).scalar_subquery())),
+        'features: by id': features_service.features_stmt(feature_id=feature.id),
+        'features: by jira key': features_service.features_stmt(jira_key=feature.jira_key),
+        'features: by name substring': features_service.features_stmt(feature_name=feature.name[-6:]),
+        'features: name search': features_service.search_features_stmt(query=feature.name[-6:]),
+        'tasks: of feature': tasks_service.task_for_feature_stmt(feature_id=feature.id),
+        'tasks: by feature and type': select(Task).where(Task.feature_id == feature.id,
+                                                         Task.task_type_id == feature.feature_type_id),
+        'releases: page of platform': releases_service.releases_page_ids_stmt(page_size=page_size,
+                                                                             platform_id=release.platform_id),
+        'releases: page of channel': releases_service.releases_page_ids_stmt(page_size=page_size,
+                                                                            channel_id=release.channel_id),
+        'releases: page of status': releases_service.releases_page_ids_stmt(page_size=page_size,
+                                                                           status=release.status.value),
+        'releases: with features': releases_service.release_with_features_stmt(release_id=release.id),
+    }
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in LARGE_TABLES:
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def explain(db: Session, stmt) -> dict:
+    sql = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={'literal_binds': True})
+    # Компилированный запрос уже экранирован под paramstyle драйвера, поэтому в обход text()
+    result = db.connection().exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}', {}).scalar()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]['Plan']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='досыпать синтетические данные перед проверкой')
+    parser.add_argument('--features', type=int, default=100_000)
+    parser.add_argument('--releases', type=int, default=2_000)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(features=args.features, releases=args.releases)
+
+    failed = False
+    with Session(engine) as db:
+        print('features in database:', db.execute(select(func.count()).select_from(Feature)).scalar())
+        for name, stmt in hot_queries(db).items():
+            scans = seq_scans(explain(db, stmt))
+            status = 'SEQ SCAN on ' + ', '.join(sorted(set(scans))) if scans else 'ok'
+            failed = failed or bool(scans)
+            print(f'{name:<35} {status}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Генератор синтетических данных для нагрузочных замеров.
+
+Создаёт платформы и каналы, по типу релиза на каждую пару платформа/канал, релизы, фичи в каждом релизе,
+задачи каждой фичи, вложения и комментарии каждой задачи. Строки вставляются пачками через INSERT ... SELECT
+generate_series: фичи, задачи, вложения и комментарии — по --batch релизов в одной транзакции, так что
+объём не упирается ни в память процесса, ни в размер одной транзакции. В конце обновляется статистика таблиц.
+
+Пользователи, типы фич и типы задач берутся существующие, поэтому запуск из каталога app — после create_tables.py
+и migrate.py, на отдельной (не боевой!) базе:
+    DATABASE_URL=... python -m benchmarks.generate_data --releases 1000 --features-per-release 50
+Имена получают префикс --tag (по умолчанию — от времени запуска), поэтому генератор можно запускать повторно.
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from sql_app.database import engine
+
+LARGE_TABLES = ('platforms', 'channels', 'release_types', 'releases', 'features', 'tasks', 'attachment_links',
+                'task_comments')
+
+PLATFORMS_SQL = """
+INSERT INTO platforms (name) SELECT :tag || ' platform ' || g FROM generate_series(1, :count) AS g RETURNING id
+"""
+
+CHANNELS_SQL = """
+INSERT INTO channels (name) SELECT :tag || ' channel ' || g FROM generate_series(1, :count) AS g RETURNING id
+"""
+
+RELEASE_TYPES_SQL = """
+INSERT INTO release_types (name, platform_id, channel_id)
+SELECT :tag || ' type ' || p.id || '-' || c.id, p.id, c.id
+FROM unnest(CAST(:platform_ids AS integer[])) AS p(id) CROSS JOIN unnest(CAST(:channel_ids AS integer[])) AS c(id)
+RETURNING id
+"""
+
+RELEASES_SQL = """
+INSERT INTO releases (name, status, description, start_date, end_date, platform_id, channel_id, release_type_id)
+SELECT :tag || ' release ' || g,
+       (ARRAY['open', 'in_progress', 'done', 'cancelled'])[1 + g % 4]::releasestageenum,
+       'generated', now() - g * interval '1 hour', now() + g * interval '1 hour',
+       rt.platform_id, rt.channel_id, rt.id
+FROM generate_series(1, :count) AS g
+JOIN release_types rt ON rt.id = (CAST(:release_type_ids AS integer[]))[1 + g % cardinality(CAST(:release_type_ids AS integer[]))]
+ORDER BY g
+RETURNING id
+"""
+
+# Пачка: релизы с id из :release_ids. Задачи, вложения и комментарии находят свои фичи и задачи по релизу.
+FEATURES_SQL = """
+INSERT INTO features (name, jira_key, status, release_id, feature_type_id, creator_id)
+SELECT :tag || ' feature ' || r.id || '-' || g,
+       CASE WHEN g % 3 = 0 THEN upper(:tag) || '-' || r.id || '-' || g END,
+       (ARRAY['open', 'in_progress', 'review', 'done', 'cancelled'])[1 + (r.id + g) % 5],
+       r.id,
+       (CAST(:feature_type_ids AS integer[]))[1 + g % cardinality(CAST(:feature_type_ids AS integer[]))],
+       (CAST(:user_ids AS integer[]))[1 + (r.id + g) % cardinality(CAST(:user_ids AS integer[]))]
+FROM unnest(CAST(:release_ids AS integer[])) AS r(id) CROSS JOIN generate_series(1, :count) AS g
+"""
+
+TASKS_SQL = """
+INSERT INTO tasks (feature_id, task_type_id, status)
+SELECT f.id,
+       (CAST(:task_type_ids AS integer[]))[1 + (g - 1) % cardinality(CAST(:task_type_ids AS integer[]))],
+       (ARRAY['open', 'in_progress', 'review', 'done'])[1 + (f.id + g) % 4]
+FROM features f CROSS JOIN generate_series(1, :count) AS g
+WHERE f.release_id = ANY(CAST(:release_ids AS integer[]))
+"""
+
+ATTACHMENTS_SQL = """
+INSERT INTO attachment_links (task_id, link, uploaded_by)
+SELECT t.id, 'https://example.com/' || :tag || '/' || t.id || '/' || g,
+       (CAST(:user_ids AS integer[]))[1 + (t.id + g) % cardinality(CAST(:user_ids AS integer[]))]
+FROM tasks t JOIN features f ON f.id = t.feature_id CROSS JOIN generate_series(1, :count) AS g
+WHERE f.release_id = ANY(CAST(:release_ids AS integer[]))
+"""
+
+COMMENTS_SQL = """
+INSERT INTO task_comments (task_id, user_id, comment)
+SELECT t.id, (CAST(:user_ids AS integer[]))[1 + (t.id + g) % cardinality(CAST(:user_ids AS integer[]))],
+       'generated comment ' || g
+FROM tasks t JOIN features f ON f.id = t.feature_id CROSS JOIN generate_series(1, :count) AS g
+WHERE f.release_id = ANY(CAST(:release_ids AS integer[]))
+"""
+
+
+def existing_ids(connection, table: str) -> list[int]:
+    ids = connection.execute(text(f'SELECT id FROM {table} ORDER BY id')).scalars().all()
+    if not ids:
+        raise SystemExit(f'{table} is empty: run create_tables.py first')
+    return ids
+
+
+def insert_ids(connection, statement: str, **params) -> list[int]:
+    return connection.execute(text(statement), params).scalars().all()
+
+
+def generate(tag: str, platforms: int, channels: int, releases: int, features_per_release: int,
+             tasks_per_feature: int, attachments_per_task: int, comments_per_task: int, batch: int) -> dict:
+    counts = dict.fromkeys(LARGE_TABLES, 0)
+    with engine.begin() as connection:
+        user_ids = existing_ids(connection, 'users')
+        feature_type_ids = existing_ids(connection, 'feature_types')
+        task_type_ids = existing_ids(connection, 'task_types')
+        platform_ids = insert_ids(connection, PLATFORMS_SQL, tag=tag, count=platforms)
+        channel_ids = insert_ids(connection, CHANNELS_SQL, tag=tag, count=channels)
+        release_type_ids = insert_ids(connection, RELEASE_TYPES_SQL, tag=tag, platform_ids=platform_ids,
+                                      channel_ids=channel_ids)
+        release_ids = insert_ids(connection, RELEASES_SQL, tag=tag, count=releases, release_type_ids=release_type_ids)
+    counts.update(platforms=len(platform_ids), channels=len(channel_ids), release_types=len(release_type_ids),
+                  releases=len(release_ids))
+
+    children = (('features', FEATURES_SQL, features_per_release),
+                ('tasks', TASKS_SQL, tasks_per_feature),
+                ('attachment_links', ATTACHMENTS_SQL, attachments_per_task),
+                ('task_comments', COMMENTS_SQL, comments_per_task))
+    params = {'tag': tag, 'user_ids': user_ids, 'feature_type_ids': feature_type_ids, 'task_type_ids': task_type_ids}
+    for start in range(0, len(release_ids), batch):
+        with engine.begin() as connection:
+            for table, statement, count in children:
+                if count > 0:
+                    result = connection.execute(text(statement),
+                                                dict(params, count=count, release_ids=release_ids[start:start + batch]))
+                    counts[table] += result.rowcount
+        print(f'  releases {min(start + batch, len(release_ids))}/{len(release_ids)}', flush=True)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for table in LARGE_TABLES:
+            connection.execute(text(f"ANALYZE {table}"))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tag', default=f'gen{int(time.time()):x}', help='префикс имён сгенерированных строк')
+    parser.add_argument('--platforms', type=int, default=3)
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--releases', type=int, default=100)
+    parser.add_argument('--features-per-release', type=int, default=20)
+    parser.add_argument('--tasks-per-feature', type=int, default=3)
+    parser.add_argument('--attachments-per-task', type=int, default=1)
+    parser.add_argument('--comments-per-task', type=int, default=1)
+    parser.add_argument('--batch', type=int, default=100, help='релизов в одной транзакции')
+    args = parser.parse_args()
+    if min(args.platforms, args.channels, args.batch) < 1:
+        parser.error('--platforms, --channels and --batch must be positive')
+
+    started = time.perf_counter()
+    counts = generate(args.tag, args.platforms, args.channels, args.releases, args.features_per_release,
+                      args.tasks_per_feature, args.attachments_per_task, args.comments_per_task, args.batch)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f'{table:<18} {count:>10}')
+    print(f'tag {args.tag}: {total} rows in {elapsed:.1f} s ({total / elapsed:.0f} rows/s)')
+
+
+if __name__ == '__main__':
+    main()
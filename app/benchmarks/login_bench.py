@@ -0,0 +1,112 @@
+"""
+Бенчмарк входа (/auth/token) во время всплеска логинов.
+
+Шлёт --logins запросов входа (--concurrency одновременно) и всё это время опрашивает лёгкий GET /platforms/.
+Печатает пропускную способность входов и задержки чтения (p50/p95/max) для трёх схем:
+  inline  — прежняя: bcrypt прямо в потоке синхронного обработчика (маршрут добавляется только здесь);
+  pool    — /auth/token: bcrypt в ограниченном пуле auth.password_executor, обработчик асинхронный;
+  refresh — /auth/refresh: новый access-токен по refresh-токену, без bcrypt.
+
+Стоимость и размер пула берутся из BCRYPT_ROUNDS и PASSWORD_HASH_WORKERS. Запуск из каталога app
+после create_tables.py (пользователь admin/admin):
+    DATABASE_URL=... TOKEN=... BCRYPT_ROUNDS=12 python -m benchmarks.login_bench --logins 60 --concurrency 60
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+
+from auth import get_db_user, verify_password
+from benchmarks.async_load import percentile
+from main import app
+from settings import AppSettings
+from sql_app import tokens_service
+from sql_app.database import get_database, SessionLocal
+from sql_app.models.user import User
+
+USERNAME = 'admin'
+PASSWORD = 'admin'
+
+
+def inline_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_database)):
+    user = get_db_user(db, form_data.username)
+    if not user or not verify_password(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    return {}
+
+
+app.add_api_route('/bench/inline-token', inline_login, methods=['POST'])
+
+
+def issue_refresh_tokens(count: int) -> list[str]:
+    with SessionLocal() as db:
+        user_id = db.query(User.id).filter(User.username == USERNAME).scalar()
+        return [tokens_service.issue_refresh_token(user_id=user_id, db=db) for _ in range(count)]
+
+
+def login_request(path: str):
+    return lambda client: client.post(path, data={'username': USERNAME, 'password': PASSWORD})
+
+
+def refresh_request(tokens: list[str]):
+    return lambda client: client.post('/auth/refresh', json={'refresh_token': tokens.pop()})
+
+
+async def burst(client: httpx.AsyncClient, request, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+    read_latencies = []
+
+    async def login():
+        async with semaphore:
+            response = await request(client)
+            response.raise_for_status()
+
+    async def reader():
+        while not done.is_set():
+            started = time.perf_counter()
+            (await client.get('/platforms/')).raise_for_status()
+            read_latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0.05)
+
+    reader_task = asyncio.create_task(reader())
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await reader_task
+    return {'logins_per_s': logins / elapsed,
+            'read_p50': percentile(read_latencies, 50),
+            'read_p95': percentile(read_latencies, 95),
+            'read_max': max(read_latencies)}
+
+
+async def main_async(logins: int, concurrency: int):
+    print(f'bcrypt rounds {AppSettings.BCRYPT_ROUNDS}, hash workers {AppSettings.PASSWORD_HASH_WORKERS}, '
+          f'{logins} logins, concurrency {concurrency}')
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        # Первый вход пересчитывает хэш admin под текущую стоимость, чтобы обе схемы мерили одно и то же
+        (await client.post('/auth/token', data={'username': USERNAME, 'password': PASSWORD})).raise_for_status()
+        schemes = (('inline', login_request('/bench/inline-token')),
+                   ('pool', login_request('/auth/token')),
+                   ('refresh', refresh_request(issue_refresh_tokens(logins))))
+        for name, request in schemes:
+            result = await burst(client, request, logins, concurrency)
+            print(f"{name:<8} {result['logins_per_s']:7.1f} logins/s   GET /platforms/ p50 {result['read_p50']:7.1f} ms  "
+                  f"p95 {result['read_p95']:7.1f} ms  max {result['read_max']:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=60)
+    parser.add_argument('--concurrency', type=int, default=60)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.logins, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Бенчмарк отчёта по релизу на большом релизе.
+
+Создаёт (один раз) релиз с --features фичами и сравнивает прежнюю схему — весь релиз одним агрегирующим
+запросом и книга openpyxl целиком в памяти — с потоковой: серверный курсор пачками и write-only книга.
+Для каждой печатает время и пик памяти Python (tracemalloc).
+
+Запуск из каталога app на отдельной (не боевой!) базе после create_tables.py:
+    DATABASE_URL=... python -m benchmarks.report_bench --features 50000
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+import openpyxl
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from reports import ReleaseReport, new_report_path, remove_report
+from sql_app import releases_service
+from sql_app.database import engine
+from sql_app.models.releases import Release
+
+RELEASE_NAME = 'report bench release'
+
+SEED_SQL = [
+    """
+    INSERT INTO releases (name, status, description, start_date, end_date, platform_id, channel_id, release_type_id)
+    SELECT :name, 'open', 'report benchmark', now(), now(),
+           (SELECT min(id) FROM platforms), (SELECT min(id) FROM channels), (SELECT min(id) FROM release_types)
+    WHERE NOT EXISTS (SELECT 1 FROM releases WHERE name = :name)
+    """,
+    """
+    INSERT INTO features (name, jira_key, status, release_id, feature_type_id, creator_id)
+    SELECT 'report bench feature ' || g, 'BENCH-' || g,
+           (ARRAY['open', 'in_progress', 'review', 'done', 'cancelled'])[1 + g % 5],
+           r.id, (SELECT min(id) FROM feature_types), (SELECT min(id) FROM users)
+    FROM releases r CROSS JOIN generate_series(1, :features) AS g
+    WHERE r.name = :name
+      AND NOT EXISTS (SELECT 1 FROM features f WHERE f.release_id = r.id)
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+
+def seed(features: int) -> int:
+    with engine.begin() as connection:
+        for statement in SEED_SQL:
+            connection.execute(text(statement), {'name': RELEASE_NAME, 'features': features})
+        return connection.execute(select(Release.id).where(Release.name == RELEASE_NAME)).scalar_one()
+
+
+def in_memory_report(db: Session, release_id: int, file_path: str):
+    """Прежняя схема: весь релиз одной агрегацией, книга целиком в памяти, ячейки по одной."""
+    features = releases_service.get_release_with_features(release_id=release_id, db=db).features
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = RELEASE_NAME
+    for row_num, feature in enumerate(features, 2):
+        ws.cell(row=row_num, column=1, value=feature['name'])
+        ws.cell(row=row_num, column=2, value=feature['jira_key'])
+        ws.cell(row=row_num, column=3, value=feature['status'])
+        ws.cell(row=row_num, column=4, value=feature['feature_type_id'])
+    wb.save(file_path)
+
+
+def streaming_report(db: Session, release_id: int, file_path: str):
+    report = ReleaseReport()
+    report.add_release(RELEASE_NAME)
+    for features in releases_service.get_release_report_rows(release_id=release_id, db=db):
+        report.add_features(features)
+    report.save(file_path)
+
+
+def run(build, release_id: int, trace_memory: bool) -> tuple[float, int, int]:
+    file_path = new_report_path()
+    try:
+        with Session(engine) as db:
+            if trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            build(db, release_id, file_path)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+            tracemalloc.stop()
+        return elapsed, peak, os.path.getsize(file_path)
+    finally:
+        remove_report(file_path)
+
+
+def measure(name: str, build, release_id: int):
+    # tracemalloc замедляет Python в разы, поэтому время и память снимаются разными прогонами
+    elapsed, _, size = run(build, release_id, trace_memory=False)
+    _, peak, _ = run(build, release_id, trace_memory=True)
+    print(f'{name:<10} {elapsed:8.2f} s  peak {peak / 2 ** 20:8.1f} MiB  file {size / 2 ** 20:6.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--features', type=int, default=50_000)
+    args = parser.parse_args()
+
+    release_id = seed(features=args.features)
+    print(f'release {release_id}, {args.features} features')
+    measure('in-memory', in_memory_report, release_id)
+    measure('streaming', streaming_report, release_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Микробенчмарк сериализации страниц /releases/all и /feature/all/: стоимость на строку до и после быстрого пути.
+
+  before — прежняя схема: запрос с ORM-сущностью (select(Release, ...), select(Feature, ...)), для релизов
+           from_orm + проверка PaginationReleaseStages, затем jsonable_encoder и json.dumps, как в FastAPI;
+  after  — Core-запрос, dict из строк и fast_json.dumps (orjson);
+  after (json) — то же со стандартным json, если orjson не установлен.
+Отдельно меряются чтение строк (запрос + сборка строк/сущностей) и кодирование ответа, в микросекундах на строку,
+медиана по --repeat повторам. json-агрегаты фич и задач в обеих схемах разбирает json_deserializer движка.
+
+Запуск из каталога app после create_tables.py и benchmarks.generate_data:
+    DATABASE_URL=... python -m benchmarks.serialization_bench --rows 500
+"""
+import argparse
+import json
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+import fast_json
+from routers.features_router import feature_with_tasks_out
+from routers.releases_router import release_with_features_out
+from schemas import ReleaseStageOutWithFeature, PaginationReleaseStages
+from sql_app import features_service, releases_service
+from sql_app.database import SessionLocal
+from sql_app.models.features import Feature
+from sql_app.models.releases import Release
+
+
+def starlette_dumps(content) -> bytes:
+    """JSONResponse.render у Starlette."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def orm_releases_stmt(rows: int):
+    stmt = releases_service.all_releases_stmt()
+    stmt = stmt.with_only_columns(Release, stmt.selected_columns.features)
+    return stmt.order_by(Release.id.desc()).limit(rows)
+
+
+def orm_features_stmt(rows: int):
+    stmt = features_service.all_features_stmt()
+    stmt = stmt.with_only_columns(Feature, stmt.selected_columns.tasks)
+    return stmt.order_by(Feature.id.desc()).limit(rows)
+
+
+def releases_before(rows) -> bytes:
+    data = []
+    for release in rows:
+        row = ReleaseStageOutWithFeature.from_orm(release.Release)
+        row.features = release.features
+        data.append(row)
+    page = PaginationReleaseStages(data=data, page=1, page_size=len(data), total=len(data))
+    return starlette_dumps(jsonable_encoder(page))
+
+
+def releases_after(rows) -> bytes:
+    return fast_json.dumps({'data': [release_with_features_out(release) for release in rows],
+                            'page': 1, 'page_size': len(rows), 'total': len(rows), 'next_cursor': None})
+
+
+def features_before(rows) -> bytes:
+    return starlette_dumps(jsonable_encoder({'data': rows, 'page_size': len(rows), 'total': len(rows)}))
+
+
+def features_after(rows) -> bytes:
+    return fast_json.dumps({'data': [feature_with_tasks_out(row) for row in rows],
+                            'page_size': len(rows), 'total': len(rows)})
+
+
+def per_row_us(action, rows: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) / rows * 1e6
+
+
+def measure(db, stmt, serialize, repeat: int) -> tuple[int, float, float]:
+    def fetch():
+        db.expunge_all()
+        return db.execute(stmt).mappings().all()
+
+    rows = fetch()
+    fetch_us = per_row_us(fetch, len(rows), repeat)
+    encode_us = per_row_us(lambda: serialize(rows), len(rows), repeat)
+    return len(rows), fetch_us, encode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    orjson = fast_json.orjson
+    releases_stmt = releases_service.all_releases_stmt().order_by(Release.id.desc()).limit(args.rows)
+    features_stmt = features_service.all_features_stmt().order_by(Feature.id.desc()).limit(args.rows)
+    cases = [
+        ('releases', 'before', orm_releases_stmt(args.rows), releases_before, orjson),
+        ('releases', 'after', releases_stmt, releases_after, orjson),
+        ('releases', 'after (json)', releases_stmt, releases_after, None),
+        ('features', 'before', orm_features_stmt(args.rows), features_before, orjson),
+        ('features', 'after', features_stmt, features_after, orjson),
+        ('features', 'after (json)', features_stmt, features_after, None),
+    ]
+    print(f"orjson {'installed' if orjson else 'not installed'}, {args.repeat} repeats, µs per row")
+    print(f"{'page':<10} {'scheme':<14} {'rows':>6} {'fetch':>9} {'encode':>9} {'total':>9}")
+    try:
+        with SessionLocal() as db:
+            for page, scheme, stmt, serialize, encoder in cases:
+                fast_json.orjson = encoder
+                rows, fetch_us, encode_us = measure(db, stmt, serialize, args.repeat)
+                print(f'{page:<10} {scheme:<14} {rows:>6} {fetch_us:>9.1f} {encode_us:>9.1f} {fetch_us + encode_us:>9.1f}')
+    finally:
+        fast_json.orjson = orjson
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""
+Набор нагрузочных сценариев по настоящим роутерам приложения.
+
+Запросы идут в приложение в том же процессе (httpx.ASGITransport) со всеми middleware и зависимостями,
+режим БД — как у приложения (DB_ASYNC_MODE). Для каждого сценария печатаются пропускная способность и задержки
+p50/p95/p99/max, число ошибок и среднее число SQL-запросов на запрос (заголовок X-DB-Query-Count):
+  списки   — /releases/all, /feature/all/ (страница и keyset), /feature/all/?release_id=...;
+  карточки — /releases/{id}, /feature/?feature_id=...;
+  отчёт    — /releases/{id}/report (дисковый кэш отчётов выключен, если не передан --report-cache);
+  вход     — /auth/token (bcrypt) и /auth/refresh;
+  запись   — POST /feature/, PATCH /tasks/{id}, POST /tasks/{id}/comment.
+Id берутся из самых новых релизов с фичами, поэтому на одних и тех же данных прогоны повторяемы. Сценарии записи
+работают только с фичами, которые создаёт сам прогон, и в конце удаляют их вместе с задачами и комментариями.
+
+--save сохраняет результаты в JSON, --baseline сравнивает с сохранёнными: код возврата 1, если у сценария
+есть ошибки, p95 вырос или пропускная способность упала больше чем на --tolerance.
+
+Запуск из каталога app после create_tables.py (пользователь admin/admin) и benchmarks.generate_data:
+    DATABASE_URL=... TOKEN=... python -m benchmarks.suite --requests 200 --concurrency 10 --save baseline.json
+    DATABASE_URL=... TOKEN=... python -m benchmarks.suite --baseline baseline.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from typing import Callable, NamedTuple
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks.async_load import percentile
+from main import app
+from reports import report_cache
+from settings import DbSettings
+from sql_app import tokens_service
+from sql_app.database import engine, SessionLocal
+
+USERNAME = 'admin'
+PASSWORD = 'admin'
+SAMPLE_SIZE = 50
+WARMUP_REQUESTS = 5
+
+
+class Scenario(NamedTuple):
+    name: str
+    # request(client, i) -> ответ i-го запроса
+    request: Callable
+    expected_status: int = 200
+    # Доля от --requests: для дорогих сценариев (bcrypt, сборка отчёта) запросов меньше
+    share: float = 1.0
+
+
+class Fixture:
+    """Id существующих строк, на которые идут запросы чтения, и фичи, созданные сценариями записи."""
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        with engine.connect() as connection:
+            self.release_ids = connection.execute(
+                text('SELECT DISTINCT release_id FROM features ORDER BY release_id DESC LIMIT :n'),
+                {'n': SAMPLE_SIZE}).scalars().all()
+            self.feature_ids = connection.execute(
+                text('SELECT id FROM features ORDER BY id DESC LIMIT :n'), {'n': SAMPLE_SIZE}).scalars().all()
+            self.feature_type_id = connection.execute(
+                text('SELECT feature_type_id FROM feature_type_task_types ORDER BY id LIMIT 1')).scalar()
+        if not self.release_ids or self.feature_type_id is None:
+            raise SystemExit('no releases with features: run create_tables.py and benchmarks.generate_data first')
+        self.created_task_ids: list[int] = []
+        self.refresh_tokens: list[str] = []
+
+    def release_id(self, i: int) -> int:
+        return self.release_ids[i % len(self.release_ids)]
+
+    def feature_id(self, i: int) -> int:
+        return self.feature_ids[i % len(self.feature_ids)]
+
+    def task_id(self, i: int) -> int:
+        return self.created_task_ids[i % len(self.created_task_ids)]
+
+    def issue_refresh_tokens(self, count: int):
+        with SessionLocal() as db:
+            user_id = db.execute(text('SELECT id FROM users WHERE username = :name'), {'name': USERNAME}).scalar()
+            self.refresh_tokens = [tokens_service.issue_refresh_token(user_id=user_id, db=db) for _ in range(count)]
+
+    def cleanup(self) -> int:
+        with engine.begin() as connection:
+            return connection.execute(text("DELETE FROM features WHERE name LIKE :pattern"),
+                                      {'pattern': f'{self.tag} %'}).rowcount
+
+
+def scenarios(fixture: Fixture, statuses: itertools.cycle) -> list[Scenario]:
+    async def create_feature(client, i):
+        response = await client.post('/feature/', json={'name': f'{fixture.tag} feature {i}',
+                                                        'jira_key': None,
+                                                        'status': 'open',
+                                                        'feature_type_id': fixture.feature_type_id,
+                                                        'release_id': fixture.release_id(0)})
+        if response.status_code == 201:
+            fixture.created_task_ids += [task['id'] for task in response.json()[0]['tasks']]
+        return response
+
+    return [
+        Scenario('GET /releases/all', lambda client, i: client.get('/releases/all')),
+        Scenario('GET /releases/all cursor', lambda client, i: client.get('/releases/all', params={'cursor': ''})),
+        Scenario('GET /feature/all/', lambda client, i: client.get('/feature/all/')),
+        Scenario('GET /feature/all/ cursor', lambda client, i: client.get('/feature/all/', params={'cursor': ''})),
+        Scenario('GET /feature/all/?release_id',
+                 lambda client, i: client.get('/feature/all/', params={'release_id': fixture.release_id(i)})),
+        Scenario('GET /releases/{id}', lambda client, i: client.get(f'/releases/{fixture.release_id(i)}')),
+        Scenario('GET /feature/?feature_id',
+                 lambda client, i: client.get('/feature/', params={'feature_id': fixture.feature_id(i)})),
+        Scenario('GET /releases/{id}/report',
+                 lambda client, i: client.get(f'/releases/{fixture.release_id(i)}/report'), share=0.1),
+        Scenario('POST /auth/token',
+                 lambda client, i: client.post('/auth/token', data={'username': USERNAME, 'password': PASSWORD}),
+                 share=0.1),
+        Scenario('POST /auth/refresh',
+                 lambda client, i: client.post('/auth/refresh', json={'refresh_token': fixture.refresh_tokens.pop()})),
+        Scenario('POST /feature/', create_feature, expected_status=201),
+        Scenario('PATCH /tasks/{id}',
+                 lambda client, i: client.patch(f'/tasks/{fixture.task_id(i)}', params={'status': next(statuses)})),
+        Scenario('POST /tasks/{id}/comment',
+                 lambda client, i: client.post(f'/tasks/{fixture.task_id(i)}/comment', params={'comment': f'bench {i}'}),
+                 expected_status=201),
+    ]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, offset: int, requests: int,
+                       concurrency: int) -> dict:
+    latencies = []
+    queries = []
+    errors = 0
+    numbers = iter(range(offset, offset + requests))
+
+    async def worker():
+        nonlocal errors
+        for i in numbers:
+            started = time.perf_counter()
+            response = await scenario.request(client, i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(int(response.headers.get('X-DB-Query-Count', 0)))
+            if response.status_code != scenario.expected_status:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {'requests': requests,
+            'rps': requests / elapsed,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies),
+            'queries': sum(queries) / len(queries),
+            'errors': errors}
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    for name, result in results.items():
+        if result['errors']:
+            problems.append(f"{name}: {result['errors']} errors")
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['p95'] > base['p95'] * (1 + tolerance):
+            problems.append(f"{name}: p95 {base['p95']:.1f} -> {result['p95']:.1f} ms")
+        if result['rps'] < base['rps'] / (1 + tolerance):
+            problems.append(f"{name}: {base['rps']:.1f} -> {result['rps']:.1f} req/s")
+    return problems
+
+
+async def main_async(args) -> dict:
+    fixture = Fixture(args.tag)
+    selected = [scenario for scenario in scenarios(fixture, itertools.cycle(['in_progress', 'review', 'open']))
+                if not args.only or any(part in scenario.name for part in args.only)]
+    if not args.report_cache:
+        report_cache.max_bytes = 0
+    print(f"DB_ASYNC_MODE={DbSettings.ASYNC_MODE}, {args.requests} requests per scenario, "
+          f"concurrency {args.concurrency}, releases sampled {len(fixture.release_ids)}")
+    print(f"{'scenario':<30} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'sql/req':>8} {'errors':>6}")
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench',
+                                 timeout=None) as client:
+        token = await client.post('/auth/token', data={'username': USERNAME, 'password': PASSWORD})
+        token.raise_for_status()
+        client.headers['Authorization'] = f"Bearer {token.json()['access_token']}"
+        try:
+            for scenario in selected:
+                requests = max(1, int(args.requests * scenario.share))
+                concurrency = min(args.concurrency, requests)
+                if scenario.name == 'POST /auth/refresh':
+                    fixture.issue_refresh_tokens(requests + WARMUP_REQUESTS)
+                if '/tasks/{id}' in scenario.name and not fixture.created_task_ids:
+                    print(f'{scenario.name:<30} skipped: needs tasks from POST /feature/')
+                    continue
+                await run_scenario(client, scenario, 0, min(WARMUP_REQUESTS, requests), 1)
+                result = await run_scenario(client, scenario, WARMUP_REQUESTS, requests, concurrency)
+                results[scenario.name] = result
+                print(f"{scenario.name:<30} {result['rps']:8.1f} {result['p50']:8.1f} {result['p95']:8.1f} "
+                      f"{result['p99']:8.1f} {result['max']:8.1f} {result['queries']:8.1f} {result['errors']:6d}")
+        finally:
+            removed = fixture.cleanup()
+            if removed:
+                print(f'removed {removed} features created by the run')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='запросов на сценарий (после прогрева)')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--only', nargs='*', help='только сценарии, в названии которых есть одна из строк')
+    parser.add_argument('--report-cache', action='store_true', help='не выключать дисковый кэш отчётов')
+    parser.add_argument('--tag', default=f'bench{int(time.time()):x}', help='префикс имён фич сценариев записи')
+    parser.add_argument('--save', help='сохранить результаты в JSON')
+    parser.add_argument('--baseline', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    problems = regressions(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f'REGRESSION {problem}')
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,8 @@
 # create_db.py
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
 from auth import pwd_context
-from settings import DbSettings
-from sql_app.database import Base
+from sql_app.database import Base, engine
 from sql_app.models.channels import Channel
 from sql_app.models.features import FeatureType, FeatureTypeTaskType, Feature
 from sql_app.models.platforms import Platform
@@ -12,8 +10,6 @@ from sql_app.models.releases import Release, ReleaseStageEnum, ReleaseType
 from sql_app.models.task import TaskType, TaskTypeApprover
 from sql_app.models.user import User, RolesEnum, Role
 
-engine = create_engine(DbSettings.DB_URL)
-
 # Создание всех таблиц
 Base.metadata.create_all(bind=engine)
 
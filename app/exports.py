@@ -0,0 +1,154 @@
+"""
+Выгрузка релизов для аналитики в CSV, JSONL и Parquet.
+
+Строка выгрузки — задача фичи вместе с фичей и релизом; фича без задач даёт одну строку с пустыми полями задачи.
+Форматтеры принимают пачки строк из серверного курсора и на каждую отдают готовый кусок байт, поэтому ответ
+стримится с постоянной памятью: в памяти только текущая пачка (для Parquet — одна row group).
+"""
+import csv
+import importlib.util
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator
+
+EXPORT_FIELDS = ('release_id', 'release_name', 'release_status', 'platform_id', 'channel_id',
+                 'feature_id', 'feature_name', 'jira_key', 'feature_status', 'feature_type_id',
+                 'feature_created_at', 'feature_updated_at',
+                 'task_id', 'task_type_id', 'task_type', 'task_status')
+EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class ExportFormatError(Exception):
+    pass
+
+
+def export_filename(name: str, export_format: str) -> str:
+    return f'{name}.{export_format}'
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class CsvExport:
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow(EXPORT_FIELDS)
+
+    def _take(self) -> bytes:
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def write(self, rows: Iterable[tuple]) -> bytes:
+        self.writer.writerows(rows)
+        return self._take()
+
+    def close(self) -> bytes:
+        return self._take()
+
+
+class JsonlExport:
+    def write(self, rows: Iterable[tuple]) -> bytes:
+        return b''.join(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False,
+                                   default=_json_default).encode() + b'\n' for row in rows)
+
+    def close(self) -> bytes:
+        return b''
+
+
+class _ChunkSink:
+    """Файлоподобный приёмник для ParquetWriter: записанное забирается кусками через take()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('release_id', pa.int64()), ('release_name', pa.string()), ('release_status', pa.string()),
+        ('platform_id', pa.int64()), ('channel_id', pa.int64()),
+        ('feature_id', pa.int64()), ('feature_name', pa.string()), ('jira_key', pa.string()),
+        ('feature_status', pa.string()), ('feature_type_id', pa.int64()),
+        ('feature_created_at', pa.timestamp('us')), ('feature_updated_at', pa.timestamp('us')),
+        ('task_id', pa.int64()), ('task_type_id', pa.int64()), ('task_type', pa.string()),
+        ('task_status', pa.string()),
+    ])
+
+
+class ParquetExport:
+    """Каждая пачка строк пишется отдельной row group; write отдаёт всё, что writer успел записать."""
+
+    def __init__(self):
+        import pyarrow.parquet as pq
+
+        self.schema = parquet_schema()
+        self.sink = _ChunkSink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression='zstd')
+
+    def write(self, rows: Iterable[tuple]) -> bytes:
+        import pyarrow as pa
+
+        columns = list(zip(*rows))
+        if columns:
+            arrays = [pa.array(column, type=field.type) for column, field in zip(columns, self.schema)]
+            self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        return self.sink.take()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.sink.take()
+
+
+def check_format(export_format: str):
+    """Parquet требует pyarrow; без него выгрузка в Parquet недоступна, остальные форматы работают."""
+    if export_format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        raise ExportFormatError("Parquet export requires pyarrow")
+
+
+EXPORT_WRITERS = {
+    'csv': CsvExport,
+    'jsonl': JsonlExport,
+    'parquet': ParquetExport,
+}
+
+
+def export_chunks(export_format: str, batches: Iterable[Iterable[tuple]]) -> Iterator[bytes]:
+    export = EXPORT_WRITERS[export_format]()
+    for rows in batches:
+        if chunk := export.write(rows):
+            yield chunk
+    yield export.close()
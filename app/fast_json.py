@@ -0,0 +1,48 @@
+"""
+Быстрая сериализация больших JSON-ответов (списки и карточки релизов и фич).
+
+Обработчики отдают FastJSONResponse с готовыми dict из строк Core-запроса: без pydantic-моделей и без
+jsonable_encoder, которые FastAPI иначе прогоняет по каждому полю каждой строки. Кодирует orjson, если он
+установлен, иначе стандартный json; формат одинаковый и совпадает с прежним (datetime — isoformat, Enum — значение).
+"""
+import datetime
+import enum
+import json
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default)
+    return json.dumps(content, default=json_default, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def loads(data):
+    """Десериализатор json-колонок для движков БД: агрегаты задач и фич приходят из базы строками JSON."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def row_dict(row) -> dict:
+    """Строка результата (Row или RowMapping) как dict: ключи — имена колонок запроса."""
+    return dict(getattr(row, '_mapping', row))
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,122 @@
+"""
+Чтение файлов массового импорта фич (CSV и JSONL).
+
+Файл читается построчно, не целиком: строки отдаются генератором вместе с номером строки,
+чтобы отчёт об ошибках ссылался на место в исходном файле. Ошибка в строке не прерывает чтение.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator
+
+from pydantic import ValidationError
+
+from schemas import FeatureCreate, FeatureStatusENUM, ImportFormatENUM
+
+IMPORT_FIELDS = ('name', 'jira_key', 'status', 'feature_type_id', 'release_id')
+FEATURE_STATUSES = {status.value for status in FeatureStatusENUM}
+
+
+def _normalize(data: dict) -> dict:
+    row = {}
+    for field in IMPORT_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        row[field] = value
+    return row
+
+
+class ImportFileError(Exception):
+    def __init__(self, line_num: int, error: str):
+        super().__init__(error)
+        self.line_num = line_num
+        self.error = error
+
+
+def _decoded_lines(file: BinaryIO) -> Iterator[str]:
+    for line_num, raw in enumerate(file, start=1):
+        if line_num == 1:
+            raw = raw.removeprefix(codecs.BOM_UTF8)
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            raise ImportFileError(line_num, "Line is not valid UTF-8")
+
+
+def _read_csv(file: BinaryIO) -> Iterator[tuple[int, dict | None, str | None]]:
+    reader = csv.DictReader(_decoded_lines(file))
+    missing = [field for field in IMPORT_FIELDS if field != 'jira_key' and field not in (reader.fieldnames or [])]
+    if missing:
+        yield 1, None, f"Missing columns: {', '.join(missing)}"
+        return
+    for data in reader:
+        if not any(data.values()):
+            continue
+        yield reader.line_num, _normalize(data), None
+
+
+def _read_jsonl(file: BinaryIO) -> Iterator[tuple[int, dict | None, str | None]]:
+    for line_num, raw in enumerate(file, start=1):
+        if line_num == 1:
+            raw = raw.removeprefix(codecs.BOM_UTF8)
+        if not raw.strip():
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            # UnicodeDecodeError тоже ValueError: битая кодировка портит только свою строку
+            yield line_num, None, "Invalid JSON"
+            continue
+        if not isinstance(data, dict):
+            yield line_num, None, "Row must be a JSON object"
+            continue
+        yield line_num, _normalize(data), None
+
+
+def read_rows(file: BinaryIO, file_format: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """
+    Строки файла импорта в виде (номер строки, данные, ошибка).
+
+    Для CSV обязателен заголовок с колонками IMPORT_FIELDS (jira_key можно опустить), BOM допускается;
+    номер строки записи с переносами внутри кавычек — номер её последней строки.
+    Строка CSV не в UTF-8 останавливает чтение: дальше границы записей уже не определить.
+    """
+    try:
+        yield from _read_csv(file) if file_format == 'csv' else _read_jsonl(file)
+    except ImportFileError as error:
+        yield error.line_num, None, error.error
+
+
+def import_file_format(filename: str | None, file_format: ImportFormatENUM | None) -> ImportFormatENUM:
+    """Формат, указанный явно, иначе по расширению файла: .jsonl и .ndjson — JSONL, остальные — CSV."""
+    if file_format is not None:
+        return file_format
+    if (filename or '').lower().endswith(('.jsonl', '.ndjson')):
+        return ImportFormatENUM.JSONL
+    return ImportFormatENUM.CSV
+
+
+def import_rows(file: BinaryIO, file_format: ImportFormatENUM) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Строки файла импорта, проверенные по схеме FeatureCreate: (номер строки, данные, ошибка)."""
+    for line, data, error in read_rows(file, file_format.value):
+        if error:
+            yield line, None, error
+            continue
+        try:
+            feature = FeatureCreate(**data)
+        except ValidationError as validation_error:
+            yield line, None, '; '.join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}"
+                                        for item in validation_error.errors())
+            continue
+        if feature.status not in FEATURE_STATUSES:
+            yield line, None, f"Unknown feature status: {feature.status}"
+            continue
+        yield line, feature.dict(), None
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,46 @@
+"""
+Условные GET-запросы: ETag и If-None-Match.
+
+Если клиент прислал ETag, совпадающий с текущим, отвечаем 304 без тела — ресурс не строится и не передаётся.
+ETag строится по дешёвой версии данных (снимок справочника, версия релиза), а не по хэшу готового ответа,
+поэтому проверка If-None-Match не требует ни выборки, ни сериализации.
+"""
+import hashlib
+
+from starlette.responses import Response
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Сравнение по RFC 9110 (слабое): W/ не учитывается, '*' совпадает с любым ETag."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag.removeprefix('W/') in [candidate.removeprefix('W/') for candidate in candidates]
+
+
+def not_modified(etag: str, headers: dict | None = None) -> Response:
+    return Response(status_code=304, headers={'ETag': etag, **(headers or {})})
+
+
+def version_etag(name: str, *parts) -> str:
+    """Сильный ETag из имени ресурса и частей его версии."""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'"{name}-{digest}"'
+
+
+def cache_control(max_age: int | None = None) -> str:
+    """Без max_age клиент и прокси хранят ответ, но перед каждым использованием перепроверяют его по ETag."""
+    return f'public, max-age={max_age}' if max_age else 'public, no-cache'
+
+
+def conditional_get(response: Response, if_none_match: str | None, etag: str,
+                    max_age: int | None = None) -> Response | None:
+    """
+    304, если у клиента актуальная версия; иначе None, а ETag и Cache-Control проставляются в response
+    для ответа, который соберёт обработчик.
+    """
+    headers = {'ETag': etag, 'Cache-Control': cache_control(max_age)}
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, headers)
+    response.headers.update(headers)
+    return None
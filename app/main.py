@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 
 from routers import admin_router, releases_router, auth_router, channels_router, platforms_router, tasks_router, \
-    features_router, users_router
+    features_router, users_router, metrics_router, reports_router
+from request_metrics import RequestMetricsMiddleware
 
 app = FastAPI()
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(auth_router.router)
 app.include_router(admin_router.router)
@@ -13,3 +15,5 @@ app.include_router(releases_router.router)
 app.include_router(features_router.router)
 app.include_router(tasks_router.router)
 app.include_router(users_router.router)
+app.include_router(reports_router.router)
+app.include_router(metrics_router.router)
@@ -0,0 +1,41 @@
+"""
+Применение миграций схемы к существующей базе.
+
+create_tables.py создаёт схему только на пустой базе: create_all не добавляет новые индексы и колонки
+к уже существующим таблицам. Миграции из каталога migrations выполняются по порядку номеров,
+применённые версии записываются в таблицу schema_migrations.
+
+Каждая миграция — модуль migrations/NNNN_name.py с функцией upgrade(connection). Соединение открыто
+в режиме AUTOCOMMIT, чтобы можно было использовать CREATE INDEX CONCURRENTLY без блокировки записи.
+"""
+import importlib
+import pkgutil
+
+from sqlalchemy import text
+
+import logg_config
+import migrations
+from sql_app.database import engine
+
+logger = logg_config.get_logger(__name__)
+
+
+def pending_migrations(applied: set[str]) -> list[str]:
+    names = sorted(module.name for module in pkgutil.iter_modules(migrations.__path__))
+    return [name for name in names if name not in applied]
+
+
+def migrate():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations ("
+                                "version VARCHAR PRIMARY KEY, "
+                                "applied_at TIMESTAMP NOT NULL DEFAULT now())"))
+        applied = set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+        for name in pending_migrations(applied):
+            logger.info("Applying migration %s", name)
+            importlib.import_module(f'migrations.{name}').upgrade(connection)
+            connection.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {'version': name})
+
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,35 @@
+"""
+Индексы под горячие запросы features_service и releases_service.
+
+Раньше индексы были только на первичных ключах, и любая фильтрация фич/релизов, join задач,
+вложений и комментариев шли последовательным сканированием.
+"""
+from sqlalchemy import text
+
+INDEXES = [
+    # Фильтры листинга фич + keyset-пагинация по id
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_features_release_id_id ON features (release_id, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_features_creator_id_id ON features (creator_id, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_features_status_id ON features (status, id)",
+    # Большинство фич без ключа Jira: частичный индекс меньше и не хранит NULL
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_features_jira_key ON features (jira_key) "
+    "WHERE jira_key IS NOT NULL",
+    # Задачи фичи и delete_task(feature_id, task_type_id)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_feature_id_task_type_id ON tasks (feature_id, task_type_id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_task_type_id ON tasks (task_type_id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_attachment_links_task_id ON attachment_links (task_id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_task_comments_task_id ON task_comments (task_id)",
+    # Фильтры листинга релизов + keyset-пагинация по id
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_releases_platform_id_id ON releases (platform_id, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_releases_channel_id_id ON releases (channel_id, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_releases_status_id ON releases (status, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_feature_type_task_types_feature_type_id "
+    "ON feature_type_task_types (feature_type_id, task_type_id)",
+]
+
+
+def upgrade(connection):
+    for statement in INDEXES:
+        connection.execute(text(statement))
+    for table in ('features', 'tasks', 'attachment_links', 'task_comments', 'releases', 'feature_type_task_types'):
+        connection.execute(text(f"ANALYZE {table}"))
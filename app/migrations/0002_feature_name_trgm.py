@@ -0,0 +1,14 @@
+"""
+Триграммный GIN-индекс по lower(features.name).
+
+Фильтр lower(name) LIKE '%...%' в features_service и tasks_service и поиск /feature/search
+без него читают всю таблицу features.
+"""
+from sqlalchemy import text
+
+
+def upgrade(connection):
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    connection.execute(text("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_features_name_trgm "
+                            "ON features USING gin (lower(name) gin_trgm_ops)"))
+    connection.execute(text("ANALYZE features"))
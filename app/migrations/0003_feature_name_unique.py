@@ -0,0 +1,25 @@
+"""
+Уникальный индекс по lower(features.name).
+
+Проверка дубля при создании фичи и INSERT ... ON CONFLICT в features_service.create_feature
+опираются на этот индекс. Если в базе уже есть фичи с одинаковыми без учёта регистра именами,
+миграция останавливается со списком таких имён: их нужно переименовать вручную и запустить migrate.py снова.
+"""
+from sqlalchemy import text
+
+DUPLICATES = """
+    SELECT lower(name) AS name, array_agg(id ORDER BY id) AS ids
+    FROM features
+    GROUP BY lower(name)
+    HAVING count(*) > 1
+    ORDER BY lower(name)
+"""
+
+
+def upgrade(connection):
+    duplicates = connection.execute(text(DUPLICATES)).all()
+    if duplicates:
+        listing = '; '.join(f'{row.name}: {row.ids}' for row in duplicates[:20])
+        raise RuntimeError(f"Features with duplicate names ({len(duplicates)}): {listing}")
+    connection.execute(text("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_features_name_lower "
+                            "ON features (lower(name))"))
@@ -0,0 +1,14 @@
+"""
+Колонка features.updated_at: время последнего изменения фичи.
+
+Из неё (вместе с числом фич и последним id) складывается версия отчёта по релизу для кэша и ETag.
+Существующим фичам проставляется created_at.
+"""
+from sqlalchemy import text
+
+
+def upgrade(connection):
+    connection.execute(text("ALTER TABLE features ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP"))
+    connection.execute(text("UPDATE features SET updated_at = created_at WHERE updated_at IS NULL"))
+    connection.execute(text("ALTER TABLE features ALTER COLUMN updated_at SET DEFAULT now()"))
+    connection.execute(text("ALTER TABLE features ALTER COLUMN updated_at SET NOT NULL"))
@@ -0,0 +1,25 @@
+"""
+Версии релизов, фич и задач: колонки version и updated_at и триггеры, которые их ведут (см. sql_app.versioning).
+
+Существующим строкам проставляется version = 1 и время миграции (у фич updated_at уже есть).
+"""
+from sqlalchemy import text
+
+from sql_app.versioning import versioning_statements, VERSIONED_TABLES, VERSION_PARENTS
+
+COLUMNS = [
+    "ALTER TABLE releases ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1",
+    "ALTER TABLE releases ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now()",
+    "ALTER TABLE features ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now()",
+]
+
+
+def upgrade(connection):
+    for statement in COLUMNS:
+        connection.execute(text(statement))
+    tables = dict.fromkeys(VERSIONED_TABLES + tuple(child for child, _, _ in VERSION_PARENTS))
+    for table in tables:
+        for statement in versioning_statements(table):
+            connection.execute(text(statement))
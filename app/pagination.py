@@ -0,0 +1,31 @@
+"""
+Непрозрачные курсоры для keyset-пагинации.
+
+Курсор кодирует id последней отданной записи; следующая страница начинается строго после него,
+поэтому стоимость запроса не зависит от глубины листания.
+"""
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(last_id: int | None) -> str | None:
+    if last_id is None:
+        return None
+    raw = json.dumps({'id': last_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str | None) -> int | None:
+    """Пустой курсор означает первую страницу."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        last_id = json.loads(raw)['id']
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
@@ -0,0 +1,52 @@
+"""
+Учёт SQL-запросов текущего HTTP-запроса.
+
+Middleware кладёт QueryStats в contextvar на время запроса; хуки движка (sql_app.query_metrics) добавляют в него
+каждый выполненный statement. Контекст копируется и в поток синхронного обработчика, и в greenlet AsyncSession,
+поэтому запросы из зависимостей, сервисов и run_sync попадают в один и тот же объект.
+"""
+from collections import Counter
+from contextvars import ContextVar
+
+current_stats: ContextVar['QueryStats | None'] = ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # Текст statement -> сколько раз выполнен; параметры не учитываются, поэтому цикл из одинаковых
+        # запросов с разными id виден как один повторяющийся statement
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Подозрения на N+1: statement, выполненные не меньше threshold раз, по убыванию числа повторов."""
+        if threshold <= 0:
+            return []
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+
+def redact_value(value) -> str:
+    return '<null>' if value is None else f'<{type(value).__name__}>'
+
+
+def redact_parameters(parameters):
+    """
+    Параметры statement для лога без значений: остаются имена и типы. Для executemany — число наборов
+    и первый набор.
+    """
+    if isinstance(parameters, dict):
+        return {key: redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return {'sets': len(parameters), 'first': redact_parameters(parameters[0])}
+        return [redact_value(value) for value in parameters]
+    return redact_value(parameters)
@@ -0,0 +1,110 @@
+"""
+Кэш справочников (платформы, каналы, типы релизов и задач, роли, согласующие) в памяти процесса.
+
+Справочник кэшируется целиком: первый запрос читает всю таблицу одним SELECT, дальше поиск по id или имени
+идёт по снимку без обращения к БД. Сервисы, меняющие справочник, сбрасывают его после commit; ttl — страховка
+для изменений в обход сервисов (скрипты, другие воркеры: кэш у каждого процесса свой).
+
+У снимка есть версия — хэш его строк, считается один раз при чтении таблицы; по ней строится ETag списков.
+"""
+import hashlib
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, NamedTuple
+
+
+class Snapshot(NamedTuple):
+    rows: tuple
+    version: str
+
+
+def snapshot_version(rows: tuple) -> str:
+    """Версия не зависит от процесса (в отличие от hash()), поэтому ETag одинаков во всех воркерах."""
+    return hashlib.sha1(repr(rows).encode()).hexdigest()[:20]
+
+
+class ReferenceCache:
+    def __init__(self, ttl: float, on_lookup: Callable[[str, bool], None] | None = None):
+        self.ttl = ttl
+        self.on_lookup = on_lookup
+        self._entries: dict[str, tuple[float, Snapshot]] = {}
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, table: str) -> Snapshot | None:
+        with self._lock:
+            entry = self._entries.get(table)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[table]
+                entry = None
+        if self.on_lookup:
+            self.on_lookup(table, entry is not None)
+        return entry[1] if entry is not None else None
+
+    def generation(self, table: str) -> int:
+        with self._lock:
+            return self._generations.get(table, 0)
+
+    def put(self, table: str, rows: tuple, generation: int) -> Snapshot:
+        """
+        Снимок, прочитанный до сброса, не сохраняется: generation берётся до чтения таблицы, и если за это время
+        справочник сбросили, снимок мог не увидеть изменение.
+        """
+        snapshot = Snapshot(rows, snapshot_version(rows))
+        if self.ttl <= 0:
+            return snapshot
+        with self._lock:
+            if self._generations.get(table, 0) == generation:
+                self._entries[table] = (time.monotonic() + self.ttl, snapshot)
+        return snapshot
+
+    def invalidate(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._entries.pop(table, None)
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            for table in list(self._entries):
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._entries.clear()
+
+
+class ReferenceTable:
+    """
+    Справочник, читаемый запросом stmt. Строки снимка — именованные кортежи с колонками запроса: как Row,
+    доступны по имени и по индексу, не привязаны к сессии и не изменяются, поэтому один снимок отдаётся всем запросам.
+    """
+
+    def __init__(self, cache: ReferenceCache, name: str, stmt):
+        self.cache = cache
+        self.name = name
+        self.stmt = stmt
+        self.row_type = namedtuple(f'{name.title().replace("_", "")}Row', stmt.selected_columns.keys())
+
+    def _rows(self, result) -> tuple:
+        return tuple(self.row_type(*row) for row in result)
+
+    def snapshot(self, db) -> Snapshot:
+        snapshot = self.cache.get(self.name)
+        if snapshot is None:
+            generation = self.cache.generation(self.name)
+            snapshot = self.cache.put(self.name, self._rows(db.execute(self.stmt)), generation)
+        return snapshot
+
+    def rows(self, db) -> tuple:
+        return self.snapshot(db).rows
+
+    def invalidate(self):
+        self.cache.invalidate(self.name)
+
+
+def find_one(rows, **conditions):
+    """
+    Поиск строки снимка, как where(...).scalar_one_or_none() в сервисах: условия со значением None пропускаются.
+    Из нескольких подходящих строк (имена в справочниках не уникальны) возвращается первая.
+    """
+    conditions = {key: value for key, value in conditions.items() if value is not None}
+    return next((row for row in rows if all(getattr(row, key) == value for key, value in conditions.items())), None)
@@ -0,0 +1,96 @@
+"""
+Дисковый кэш готовых отчётов по релизам.
+
+Ключ — id релиза и версия его содержимого: при изменении фич релиза версия меняется, старый файл перестаёт
+находиться и удаляется при сохранении нового. Общий размер ограничен, сверх лимита удаляются давно не
+читавшиеся файлы (LRU по mtime, чтение обновляет mtime). Кэш общий для воркеров одной машины.
+
+Файлы кэша отдаются и попадают в кэш жёсткими ссылками: у каждого ответа свой путь к тому же файлу, который
+он удаляет после отправки, поэтому сброс или вытеснение файла кэша другим запросом не обрывает чтение.
+"""
+import os
+import re
+import uuid
+
+FILE_PATTERN = re.compile(r'^release_(\d+)_([0-9a-f]+)\.xlsx$')
+READ_PREFIX = 'release_read_'
+
+
+class ReportCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, release_id: int, version: str) -> str:
+        return os.path.join(self.directory, f'release_{release_id}_{version}.xlsx')
+
+    def _entries(self) -> list[tuple[str, int, os.stat_result]]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            match = FILE_PATTERN.match(name)
+            if not match:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((path, int(match.group(1)), os.stat(path)))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def get(self, release_id: int, version: str) -> str | None:
+        """
+        Путь к отчёту из кэша для одного ответа — жёсткая ссылка на файл кэша; удалить её должен вызывающий.
+        """
+        path = self.path(release_id, version)
+        link = os.path.join(self.directory, f'{READ_PREFIX}{uuid.uuid4().hex}.xlsx')
+        try:
+            os.link(path, link)
+        except FileNotFoundError:
+            return None
+        os.utime(link)
+        return link
+
+    def put(self, release_id: int, version: str, file_path: str) -> bool:
+        """
+        Кладёт готовый отчёт в кэш жёсткой ссылкой: file_path остаётся у вызывающего, отдать и удалить его — тоже.
+        Отчёт больше лимита кэша не сохраняется (False).
+        """
+        if os.path.getsize(file_path) > self.max_bytes:
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(release_id, version)
+        try:
+            os.link(file_path, path)
+        except FileExistsError:
+            # Тот же отчёт уже положил параллельный запрос
+            pass
+        self.invalidate(release_id, keep=path)
+        self.evict(keep=path)
+        return True
+
+    def invalidate(self, release_id: int, keep: str | None = None):
+        for path, entry_release_id, _ in self._entries():
+            if entry_release_id == release_id and path != keep:
+                remove(path)
+
+    def evict(self, keep: str | None = None):
+        entries = sorted(self._entries(), key=lambda entry: entry[2].st_mtime)
+        total = sum(entry[2].st_size for entry in entries)
+        for path, _, stat in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            remove(path)
+            total -= stat.st_size
+
+
+def remove(file_path: str):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,157 @@
+"""
+Фоновые задачи построения отчётов.
+
+Задача ставится в пул процессов и сразу получает id; клиент опрашивает её статус и скачивает файл, когда он готов.
+openpyxl нагружает CPU, поэтому книга собирается в отдельном процессе со своим подключением к БД и не мешает ни
+event loop, ни потокам обработчиков. Процессы запускаются через spawn: форк процесса с открытыми соединениями
+и потоками небезопасен.
+
+Задачи хранятся в памяти процесса приложения и живут ReportSettings.JOB_TTL секунд после завершения,
+затем удаляются вместе с файлом.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import logg_config
+from reports import ReleaseReport, new_report_path, remove_report, REPORT_TEMP_PREFIX
+from settings import ReportSettings
+
+logger = logg_config.get_logger(__name__)
+
+
+def render_report(releases: list[tuple[int, str]], file_path: str) -> str:
+    """Выполняется в процессе пула: книга с листом на каждый релиз из releases (id, name)."""
+    from sql_app import releases_service
+    from sql_app.database import SessionLocal
+
+    report = ReleaseReport()
+    try:
+        with SessionLocal() as db:
+            for release_id, release_name in releases:
+                report.add_release(release_name)
+                for features in releases_service.get_release_report_rows(release_id=release_id, db=db):
+                    report.add_features(features)
+        return report.save(file_path)
+    except Exception:
+        remove_report(file_path)
+        raise
+
+
+class ReportJobLimitError(Exception):
+    pass
+
+
+class ReportJob:
+    def __init__(self, user_id: int, releases: list[tuple[int, str]]):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.release_ids = [release_id for release_id, _ in releases]
+        self.file_path = new_report_path()
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self.error = None
+        self.future: Future | None = None
+        self.expires = None
+
+    @property
+    def status(self) -> str:
+        if self.finished_at is None:
+            return 'running' if self.future is not None and self.future.running() else 'queued'
+        return 'failed' if self.error else 'done'
+
+    @property
+    def active(self) -> bool:
+        return self.finished_at is None
+
+
+class ReportJobs:
+    def __init__(self, workers: int, max_active: int, max_active_per_user: int, ttl: int):
+        self.workers = workers
+        self.max_active = max_active
+        self.max_active_per_user = max_active_per_user
+        self.ttl = ttl
+        self.jobs: dict[str, ReportJob] = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _finish(self, job: ReportJob, future: Future):
+        # Вызывается потоком пула по завершении задачи
+        error = future.exception()
+        if error is not None:
+            logger.warning("Report job %s failed: %r", job.id, error)
+            job.error = 'Report generation failed'
+            remove_report(job.file_path)
+        job.finished_at = datetime.utcnow()
+        job.expires = time.monotonic() + self.ttl
+
+    def _purge(self):
+        now = time.monotonic()
+        for job_id, job in list(self.jobs.items()):
+            if job.expires is not None and job.expires <= now:
+                del self.jobs[job_id]
+                remove_report(job.file_path)
+
+    def _remove_orphan_files(self):
+        # Файлы задач, потерянных при перезапуске приложения: их id больше никто не знает
+        known = {job.file_path for job in self.jobs.values()}
+        deadline = time.time() - self.ttl
+        try:
+            names = os.listdir(ReportSettings.CACHE_DIR)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(ReportSettings.CACHE_DIR, name)
+            try:
+                stale = name.startswith(REPORT_TEMP_PREFIX) and os.path.getmtime(path) < deadline
+            except FileNotFoundError:
+                continue
+            if stale and path not in known:
+                remove_report(path)
+
+    def submit(self, user_id: int, releases: list[tuple[int, str]]) -> ReportJob:
+        with self._lock:
+            self._purge()
+            self._remove_orphan_files()
+            active = [job for job in self.jobs.values() if job.active]
+            if len(active) >= self.max_active:
+                raise ReportJobLimitError("Too many report jobs in progress")
+            if sum(job.user_id == user_id for job in active) >= self.max_active_per_user:
+                raise ReportJobLimitError("Too many report jobs in progress for this user")
+            job = ReportJob(user_id=user_id, releases=releases)
+            try:
+                future = self._pool().submit(render_report, releases, job.file_path)
+            except BrokenProcessPool:
+                # Процесс пула упал (например, по памяти): пул пересоздаётся, задача ставится заново
+                logger.warning("Report process pool is broken, restarting it")
+                self._executor = None
+                future = self._pool().submit(render_report, releases, job.file_path)
+            except Exception:
+                remove_report(job.file_path)
+                raise
+            job.future = future
+            self.jobs[job.id] = job
+        future.add_done_callback(lambda done: self._finish(job, done))
+        return job
+
+    def get(self, job_id: str) -> ReportJob | None:
+        with self._lock:
+            self._purge()
+            return self.jobs.get(job_id)
+
+
+report_jobs = ReportJobs(workers=ReportSettings.JOB_WORKERS,
+                         max_active=ReportSettings.JOB_MAX_ACTIVE,
+                         max_active_per_user=ReportSettings.JOB_MAX_ACTIVE_PER_USER,
+                         ttl=ReportSettings.JOB_TTL)
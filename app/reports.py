@@ -0,0 +1,123 @@
+"""
+Отчёт по релизу в XLSX.
+
+Книга открывается в write-only режиме openpyxl: строки сразу уходят во временный XML листа на диске,
+поэтому память не растёт с числом фич, а строки можно дописывать пачками прямо из серверного курсора.
+Каждый отчёт пишется в свой временный файл, параллельные запросы не делят один путь.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from typing import Iterable
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Border, Side, Font, PatternFill
+
+from report_cache import ReportCache, remove as remove_report
+from settings import ReportSettings
+
+REPORT_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+REPORT_FILENAME = 'release_report.xlsx'
+REPORT_TEMP_PREFIX = 'release_report_'
+# Увеличить при изменении вида отчёта, чтобы закэшированные файлы старого вида перестали отдаваться
+REPORT_LAYOUT_VERSION = 1
+
+FEATURE_HEADERS = ["Имя фичи", "Ключ фичи", "Статус", "Тип фичи"]
+HEADER_FONT = Font(bold=True, size=14)
+HEADER_FILL = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+THIN_BORDER = Side(border_style='thin', color='000000')
+BORDER = Border(left=THIN_BORDER, right=THIN_BORDER, top=THIN_BORDER, bottom=THIN_BORDER)
+# Ограничения Excel на имя листа
+SHEET_TITLE_LENGTH = 31
+INVALID_SHEET_TITLE = re.compile(r'[\\*?:/\[\]]')
+# Рамка только у заголовка и первых пяти фич, как было в исходном отчёте
+BORDERED_ROWS = 6
+
+
+class ReleaseReport:
+    """
+    Книга отчёта: по листу на релиз.
+
+    add_release открывает лист, add_features дописывает в него строки (name, jira_key, status, feature_type_id),
+    save закрывает последний лист и сохраняет книгу. Писать после save нельзя.
+    """
+
+    def __init__(self):
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = None
+        self.rows = 0
+        self.statuses = set()
+
+    def _cell(self, value, header: bool = False) -> WriteOnlyCell:
+        cell = WriteOnlyCell(self.sheet, value=value)
+        if header:
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+        if self.rows < BORDERED_ROWS:
+            cell.border = BORDER
+        return cell
+
+    def _append(self, values: list, header: bool = False):
+        # Оформленные ячейки нужны только в первых строках, остальные пишутся простыми значениями — так в разы быстрее
+        if header or self.rows < BORDERED_ROWS:
+            values = [self._cell(value, header=header) for value in values]
+        self.sheet.append(values)
+        self.rows += 1
+
+    def _close_sheet(self):
+        # Автофильтр пишется после данных листа, поэтому его можно выставить в конце
+        if self.sheet is None:
+            return
+        self.sheet.auto_filter.ref = f"A1:D{self.rows}"
+        self.sheet.auto_filter.add_filter_column(1, sorted(self.statuses))
+
+    def add_release(self, release_name: str):
+        self._close_sheet()
+        self.sheet = self.workbook.create_sheet(title=sheet_title(release_name))
+        self.rows = 0
+        self.statuses = set()
+        self._append(FEATURE_HEADERS, header=True)
+
+    def add_features(self, features: Iterable):
+        for feature in features:
+            self._append([feature.name, feature.jira_key, feature.status, feature.feature_type_id])
+            self.statuses.add(feature.status)
+
+    def save(self, file_path: str) -> str:
+        self._close_sheet()
+        self.workbook.save(file_path)
+        return file_path
+
+
+def sheet_title(release_name: str) -> str:
+    # Повторяющиеся имена openpyxl различает сам, добавляя к имени номер
+    return INVALID_SHEET_TITLE.sub('_', release_name)[:SHEET_TITLE_LENGTH] or 'release'
+
+
+def new_report_path() -> str:
+    """
+    Путь к новому временному файлу отчёта; удалить его или передать в report_cache.put должен вызывающий.
+    Файл создаётся в каталоге кэша, чтобы перенос в кэш был атомарным переименованием.
+    """
+    os.makedirs(ReportSettings.CACHE_DIR, exist_ok=True)
+    fd, file_path = tempfile.mkstemp(prefix=REPORT_TEMP_PREFIX, suffix='.xlsx', dir=ReportSettings.CACHE_DIR)
+    os.close(fd)
+    return file_path
+
+
+report_cache = ReportCache(directory=ReportSettings.CACHE_DIR, max_bytes=ReportSettings.CACHE_MAX_BYTES)
+
+
+def report_version(release_name: str, release_version: int) -> str:
+    """
+    Версия содержимого отчёта: версия релиза (её поднимают триггеры при любом изменении релиза, его фич и задач,
+    см. sql_app.versioning), имя релиза и вид отчёта.
+    """
+    raw = '|'.join(str(part) for part in (REPORT_LAYOUT_VERSION, release_name, release_version))
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def report_etag(release_id: int, version: str) -> str:
+    return f'"release-{release_id}-{version}"'
@@ -0,0 +1,116 @@
+"""
+Метрики HTTP-запросов по маршрутам: задержка, запросы в работе, коды ответов и размер ответов.
+
+Маршрут в метках — шаблон пути (/releases/{release_id}), а не URL, чтобы число рядов не росло с числом id.
+Шаблон берётся из scope["route"], который FastAPI проставляет при маршрутизации; запросы, не попавшие
+ни в один маршрут, считаются под route="<unmatched>".
+
+Middleware — чистый ASGI (не BaseHTTPMiddleware): не буферизует и не копирует ответ, стриминг выгрузок
+не ломается, а на запрос приходится пара вызовов perf_counter и обновление нескольких метрик. Запросы в работе
+не считаются на горячем пути: активные scope хранятся в словаре, а gauge разбирает их по маршрутам при сборе.
+
+Здесь же подводится итог SQL за запрос (см. query_stats): число запросов и время в БД уходят в метрики
+и в заголовки ответа X-DB-Query-Count и Server-Timing, повторяющиеся statement — в лог как подозрения на N+1.
+Запросы, выполненные уже после отправки заголовков (стриминг), попадают только в метрики.
+"""
+import threading
+import time
+from collections import Counter as Tally
+
+from starlette.datastructures import MutableHeaders
+
+import logg_config
+from metrics import Counter, Gauge, Histogram
+from query_stats import QueryStats, current_stats
+from settings import DbSettings
+
+logger = logg_config.get_logger(__name__)
+
+UNMATCHED_ROUTE = '<unmatched>'
+RESPONSE_SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+_active: dict[int, dict] = {}
+_active_lock = threading.Lock()
+_seen_in_progress: set[tuple[str, str]] = set()
+
+
+def route_template(scope: dict) -> str:
+    route = scope.get('route')
+    return getattr(route, 'path', None) or UNMATCHED_ROUTE
+
+
+def _collect_in_progress():
+    with _active_lock:
+        scopes = list(_active.values())
+    counts = Tally((scope['method'], route_template(scope)) for scope in scopes)
+    # Маршруты, где запросов больше нет, отдаются с нулём, а не остаются с последним значением
+    _seen_in_progress.update(counts)
+    return [({'method': method, 'route': route}, counts.get((method, route), 0))
+            for method, route in _seen_in_progress]
+
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request latency until the last body chunk is sent',
+                             ['method', 'route'])
+REQUESTS = Counter('http_requests_total', 'HTTP requests by route and response status', ['method', 'route', 'status'])
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'HTTP response body size', ['method', 'route'],
+                          buckets=RESPONSE_SIZE_BUCKETS)
+IN_PROGRESS = Gauge('http_requests_in_progress', 'HTTP requests currently being handled', ['method', 'route'],
+                    collect=_collect_in_progress)
+REQUEST_QUERIES = Histogram('http_request_db_queries', 'SQL statements executed per HTTP request', ['method', 'route'],
+                            buckets=QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram('http_request_db_seconds', 'Time spent in SQL statements per HTTP request',
+                            ['method', 'route'])
+N_PLUS_ONE_SUSPECTS = Counter('http_request_n_plus_one_suspects_total',
+                              'Statements repeated at least DB_N_PLUS_ONE_THRESHOLD times within one request',
+                              ['method', 'route'])
+
+
+def report_queries(stats: QueryStats, method: str, route: str):
+    REQUEST_QUERIES.observe(stats.count, method=method, route=route)
+    REQUEST_DB_TIME.observe(stats.duration, method=method, route=route)
+    for statement, count in stats.repeated(DbSettings.N_PLUS_ONE_THRESHOLD):
+        N_PLUS_ONE_SUSPECTS.inc(method=method, route=route)
+        logger.warning("Possible N+1 in %s %s: statement executed %d times: %s", method, route, count, statement)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        size = 0
+        stats = QueryStats()
+        stats_token = current_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers = MutableHeaders(scope=message)
+                headers.append('X-DB-Query-Count', str(stats.count))
+                headers.append('Server-Timing', stats.server_timing())
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        key = id(scope)
+        with _active_lock:
+            _active[key] = scope
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(stats_token)
+            with _active_lock:
+                del _active[key]
+            method, route = scope['method'], route_template(scope)
+            REQUEST_DURATION.observe(time.perf_counter() - started, method=method, route=route)
+            REQUESTS.inc(method=method, route=route, status=status)
+            RESPONSE_SIZE.observe(size, method=method, route=route)
+            report_queries(stats, method, route)
@@ -4,13 +4,14 @@ from typing import Annotated
 from fastapi import Depends, HTTPException, APIRouter
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from schemas import User, UserCreate
 from sql_app import users_service
 from sql_app.database import get_database
 from sql_app.models.user import RolesEnum
 from sql_app.users_service import create_user, get_all_users, get_user
-from auth import get_current_user
+from auth import get_current_user, get_password_hash_async
 
 from schemas import UserOut
 
@@ -31,27 +32,33 @@ def get_users(current_user: get_current_user, db: db_session):
 
 
 @router.post('/users')
-def create_new_user(user: UserCreate, current_user: get_current_user, db: db_session):
+async def create_new_user(user: UserCreate, current_user: get_current_user, db: db_session):
     if current_user.role != RolesEnum.ADMIN.value:
         raise HTTPException(status_code=403, detail='Not enough permissions')
 
-    return create_user(user=user, db=db)
+    hashed_password = await get_password_hash_async(user.password)
+    return await run_in_threadpool(create_user, user=user, hashed_password=hashed_password, db=db)
 
 
 @router.patch('/users/{user_id}', response_model=UserOut, status_code=201)
-def update_user(user_id: int,
-                current_user: get_current_user,
-                db: db_session,
-                role: RolesEnum | None = None,
-                password: Password | None = None,
-                ):
+async def update_user(user_id: int,
+                      current_user: get_current_user,
+                      db: db_session,
+                      role: RolesEnum | None = None,
+                      password: Password | None = None,
+                      ):
     if current_user.role != RolesEnum.ADMIN.value:
         raise HTTPException(status_code=403, detail='Not enough permissions')
-    user = get_user(db, user_id=user_id)
+    user = await run_in_threadpool(get_user, db, user_id=user_id)
     if not user:
         raise HTTPException(status_code=404, detail='User not found')
 
-    return users_service.update_user(db=db, user_id=user_id, role=role, password=password)
+    hashed_password = await get_password_hash_async(password.password) if password is not None else None
+    return await run_in_threadpool(users_service.update_user,
+                                   db=db,
+                                   user_id=user_id,
+                                   role=role,
+                                   hashed_password=hashed_password)
 
 
 @router.delete('/users/{user_id}')
@@ -2,24 +2,59 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from starlette.status import HTTP_401_UNAUTHORIZED
 from auth import authenticate_user, ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
+from schemas import RefreshTokenIn
+from sql_app import tokens_service
 from sql_app.database import get_database
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def token_response(username: str, user_id: int, refresh_token: str) -> dict:
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": username, "uid": user_id}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token,
+            "token_type": "bearer",
+            "expires_in": int(access_token_expires.total_seconds()),
+            "refresh_token": refresh_token}
+
+
 @router.post("/token", response_model=dict)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_database)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(),
+                                 db: Session = Depends(get_database)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await run_in_threadpool(tokens_service.issue_refresh_token, user_id=user.id, db=db)
+    return token_response(user.username, user.id, refresh_token)
+
+
+@router.post("/refresh", response_model=dict)
+def refresh_access_token(token: RefreshTokenIn, db: Session = Depends(get_database)):
+    """
+    Новый access-токен по refresh-токену, без пароля и bcrypt. Refresh-токен одноразовый:
+    в ответе выдаётся следующий, предъявленный отзывается.
+    """
+    rotated = tokens_service.rotate_refresh_token(token=token.refresh_token, db=db)
+    if rotated is None:
+        raise HTTPException(
+            status_code=HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    refresh_token, user_id, username = rotated
+    return token_response(username, user_id, refresh_token)
+
+
+@router.post("/logout", status_code=204)
+def logout(token: RefreshTokenIn, db: Session = Depends(get_database)):
+    tokens_service.revoke_refresh_token(token=token.refresh_token, db=db)
+    return None
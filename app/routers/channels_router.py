@@ -1,7 +1,9 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
 from sqlalchemy.orm import Session
 from auth import get_current_user
+from http_cache import conditional_get, version_etag
+from settings import AppSettings
 from schemas import User, ChannelOut, ChannelCreate
 from sql_app import channels_service
 from sql_app.channels_service import get_channel
@@ -47,17 +49,24 @@ def create_channel(channel: ChannelCreate,
 
 
 @router.get("/", response_model=list[ChannelOut], status_code=200)
-def get_all_channels(db: db_session):
+def get_all_channels(response: Response, db: db_session, if_none_match: str | None = Header(None)):
     """
     Получение всех каналов.
 
+    ETag строится по версии кэшированного справочника; при совпадении If-None-Match ответ 304 без тела.
+
     Args:
+        response (Response): Ответ, в который проставляются ETag и Cache-Control.
         db (Session): Сессия базы данных.
+        if_none_match (str | None): ETag, уже имеющийся у клиента.
 
     Returns:
         list[ChannelOut]: Список всех каналов.
     """
     logger.info("Fetching all channels")
+    etag = version_etag('channels', channels_service.get_channels_version(db=db))
+    if cached := conditional_get(response, if_none_match, etag, max_age=AppSettings.HTTP_CACHE_MAX_AGE):
+        return cached
     channels = channels_service.get_all_channels(db=db)
     logger.info("Fetched %d channels", len(channels))
     return channels
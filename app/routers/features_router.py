@@ -1,25 +1,64 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from auth import get_current_user
 from schemas import User, FeatureTypeOut, FeatureTypeCreate, FeatureCreate, FeatureOut, \
-    FeatureStatusENUM
+    FeatureStatusENUM, FeatureSearchOut, FeatureImportOut, ImportFormatENUM, VersionOut
 from sql_app import features_service, releases_service, tasks_service
-from sql_app.database import get_database
+from sql_app.database import get_mode_database, run_db
 from sql_app.models.user import RolesEnum
 import logg_config
+from pagination import encode_cursor, decode_cursor
+from feature_import import import_rows, import_file_format
+from fast_json import FastJSONResponse, row_dict
 
 logger = logg_config.get_logger(__name__)
 
 router = APIRouter(prefix="/feature", tags=["features"])
 get_current_user = Annotated[User, Depends(get_current_user)]
-db_session = Annotated[Session, Depends(get_database)]
+db_session = Annotated[Session | AsyncSession, Depends(get_mode_database)]
+
+def feature_with_tasks_out(row) -> dict:
+    """
+    Строка all_features_stmt/features_stmt в формате ответа: {'Feature': колонки фичи, 'tasks': задачи}.
+    Если задачи не запрошены (include без tasks), ключа tasks в ответе нет.
+    """
+    feature = row_dict(row)
+    result = {'Feature': feature}
+    if 'tasks' in feature:
+        result['tasks'] = feature.pop('tasks')
+    return result
+
+
+def split_names(value: str) -> list[str]:
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def feature_view(fields: str | None,
+                 include: str | None,
+                 default_include: tuple[str, ...]) -> tuple[list[str] | None, set[str]]:
+    """
+    Разбор параметров fields и include (имена через запятую). Вложения и комментарии — части задач, поэтому
+    подтягивают и задачи; пустой include — только поля фичи.
+    """
+    names = split_names(fields) if fields else None
+    if names and (unknown := [name for name in names if name not in features_service.FEATURE_FIELDS]):
+        logger.warning("Unknown feature fields: %s", unknown)
+        raise HTTPException(status_code=400, detail=f"Unknown feature fields: {', '.join(unknown)}")
+    included = set(default_include if include is None else split_names(include))
+    if unknown := sorted(included - set(features_service.FEATURE_INCLUDES)):
+        logger.warning("Unknown feature include: %s", unknown)
+        raise HTTPException(status_code=400, detail=f"Unknown feature include: {', '.join(unknown)}")
+    if included & {'attachments', 'comments'}:
+        included.add('tasks')
+    return names, included
 
 
 @router.post("/types", response_model=FeatureTypeOut, status_code=201)
-def create_feature_type(feature: FeatureTypeCreate,
-                        current_user: get_current_user,
-                        db: db_session):
+async def create_feature_type(feature: FeatureTypeCreate,
+                              current_user: get_current_user,
+                              db: db_session):
     """
     Создание нового типа фичи.
 
@@ -38,17 +77,15 @@ def create_feature_type(feature: FeatureTypeCreate,
     if current_user.role not in [RolesEnum.ADMIN.value, RolesEnum.RELEASE_MANAGER.value]:
         logger.warning("User %s does not have enough permissions", current_user.username)
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    if features_service.get_feature_type(name=feature.name, db=db):
+    if await run_db(db, features_service.get_feature_type, name=feature.name):
         logger.warning("Feature type with name %s already exists", feature.name)
         raise HTTPException(status_code=400, detail="Feature with this name already exists")
     logger.info("User %s create new feature type: %s ", current_user.username, feature.name)
-    return features_service.create_feature_type(name=feature.name,
-                                                description=feature.description,
-                                                db=db)
+    return await run_db(db, features_service.create_feature_type, name=feature.name, description=feature.description)
 
 
 @router.get("/types/{feature_type_id}", status_code=200)
-def get_feature_type(feature_type_id: int, db: db_session):
+async def get_feature_type(feature_type_id: int, db: db_session):
     """
     Получение типа фичи по ID.
 
@@ -60,12 +97,12 @@ def get_feature_type(feature_type_id: int, db: db_session):
         FeatureTypeOut: Тип фичи с указанным ID.
     """
     logger.info("Getting feature type with ID: %d", feature_type_id)
-    types = features_service.get_feature_type(feature_type_id=feature_type_id, db=db)
+    types = await run_db(db, features_service.get_feature_type, feature_type_id=feature_type_id)
     return types
 
 
 @router.delete("/types/{feature_type_id}", status_code=204)
-def delete_feature_type(feature_type_id: int, current_user: get_current_user, db: db_session):
+async def delete_feature_type(feature_type_id: int, current_user: get_current_user, db: db_session):
     """
     Удаление типа фичи по ID.
 
@@ -84,22 +121,27 @@ def delete_feature_type(feature_type_id: int, current_user: get_current_user, db
     if current_user.role not in [RolesEnum.ADMIN.value, RolesEnum.RELEASE_MANAGER.value]:
         logger.warning("User %s does not have enough permissions", current_user.username)
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    if not features_service.get_feature_type(feature_type_id=feature_type_id, db=db):
+    if not await run_db(db, features_service.get_feature_type, feature_type_id=feature_type_id):
         logger.warning("Feature type with ID %d not found", feature_type_id)
         raise HTTPException(status_code=404, detail="Feature type not found")
     logger.info("User %s delete feature type with ID: %d", current_user.username, feature_type_id)
-    return features_service.delete_feature_type(feature_type_id=feature_type_id, db=db)
+    return await run_db(db, features_service.delete_feature_type, feature_type_id=feature_type_id)
 
 
 @router.get('/all/', status_code=200)
-def get_all_features(db: db_session,
-                     user_id: int | None = None,
-                     release_id: int | None = None,
-                     platform_id: int | None = None,
-                     channel_id: int | None = None,
-                     feature_status: FeatureStatusENUM | None = None,
-                     page: int = 1,
-                     page_size: int = 50):
+async def get_all_features(db: db_session,
+                           user_id: int | None = None,
+                           release_id: int | None = None,
+                           platform_id: int | None = None,
+                           channel_id: int | None = None,
+                           feature_status: FeatureStatusENUM | None = None,
+                           page: int = 1,
+                           page_size: int = 50,
+                           cursor: str | None = None,
+                           include_total: bool | None = None,
+                           estimate_total: bool = False,
+                           fields: str | None = None,
+                           include: str | None = None):
     """
     Получение всех фич.
 
@@ -112,32 +154,110 @@ def get_all_features(db: db_session,
         feature_status (FeatureStatusENUM, optional): Статус фичи
         page: (int, optional): Номер страницы.
         page_size: (int, optional): Размер страницы.
+        cursor: (str, optional): Курсор keyset-пагинации. Пустое значение — первая страница.
+            В этом режиме page игнорируется, total по умолчанию не считается, а в ответе приходит next_cursor.
+        include_total: (bool, optional): Считать ли total. Подсчёт идёт по таблице features без агрегации задач.
+        estimate_total: (bool, optional): Для запроса без фильтров брать total из статистики планировщика.
+        fields: (str, optional): Поля фичи через запятую. По умолчанию — все.
+        include: (str, optional): Вложенные данные через запятую: tasks, attachments, comments.
+            По умолчанию tasks,attachments; пустое значение — только поля фичи, без join задач.
+
+    Exceptions:
+        HTTPException: Если в fields или include неизвестное имя.
 
     Returns:
         list[FeatureOut]: Список всех фич.
     """
     logger.info("Getting all features")
-    data, page_size, total = features_service.get_all_features_pagination(db=db,
-                                                                          page=page,
-                                                                          page_size=page_size,
-                                                                          platform_id=platform_id,
-                                                                          channel_id=channel_id,
-                                                                          feature_status=feature_status.value if feature_status else None,
-                                                                          user_id=user_id,
-                                                                          release_id=release_id)
-
-    return {'data': data,
-            'page_size': page_size,
-            'total': total
-            }
+    fields, include = feature_view(fields, include, features_service.ALL_FEATURES_INCLUDE)
+    if include_total is None:
+        include_total = cursor is None
+    if cursor is not None:
+        data, page_size, next_after_id = await run_db(db, features_service.get_all_features_keyset,
+                                                      page_size=page_size,
+                                                      after_id=decode_cursor(cursor),
+                                                      platform_id=platform_id,
+                                                      channel_id=channel_id,
+                                                      feature_status=feature_status.value if feature_status else None,
+                                                      user_id=user_id,
+                                                      release_id=release_id,
+                                                      fields=fields,
+                                                      include=include)
+        total = None
+        if include_total:
+            total = await run_db(db, features_service.count_features,
+                                 user_id=user_id,
+                                 release_id=release_id,
+                                 platform_id=platform_id,
+                                 channel_id=channel_id,
+                                 feature_status=feature_status.value if feature_status else None,
+                                 estimated=estimate_total)
+        return FastJSONResponse({'data': [feature_with_tasks_out(row) for row in data],
+                                 'page_size': page_size,
+                                 'total': total,
+                                 'next_cursor': encode_cursor(next_after_id)})
+    data, page_size, total = await run_db(db, features_service.get_all_features_pagination,
+                                          page=page,
+                                          page_size=page_size,
+                                          platform_id=platform_id,
+                                          channel_id=channel_id,
+                                          feature_status=feature_status.value if feature_status else None,
+                                          user_id=user_id,
+                                          release_id=release_id,
+                                          include_total=include_total,
+                                          estimate_total=estimate_total,
+                                          fields=fields,
+                                          include=include)
+
+    return FastJSONResponse({'data': [feature_with_tasks_out(row) for row in data],
+                             'page_size': page_size,
+                             'total': total})
+
+
+@router.get('/search', response_model=list[FeatureSearchOut], status_code=200)
+async def search_features(db: db_session,
+                          q: str,
+                          limit: int = Query(20, ge=1, le=features_service.SEARCH_LIMIT),
+                          release_id: int | None = None,
+                          feature_status: FeatureStatusENUM | None = None):
+    """
+    Поиск фич по имени.
+
+    Находит фичи, имя которых содержит строку запроса или похоже на неё (опечатки, другой порядок слов).
+    Сначала идёт точное совпадение имени, дальше по убыванию похожести.
+
+    Args:
+        db (Session): Сессия базы данных.
+        q (str): Строка поиска.
+        limit (int, optional): Максимальное число результатов, от 1 до 100.
+        release_id (int, optional): ID релиза для фильтрации фич.
+        feature_status (FeatureStatusENUM, optional): Статус фичи.
+
+    Exceptions:
+        HTTPException: Если строка поиска пустая.
+
+    Returns:
+        list[FeatureSearchOut]: Найденные фичи с оценкой похожести score.
+    """
+    if not q.strip():
+        logger.warning("Empty feature search query")
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    logger.info("Searching features by name: %s", q)
+    return await run_db(db, features_service.search_features,
+                        query=q,
+                        limit=limit,
+                        release_id=release_id,
+                        feature_status=feature_status.value if feature_status else None)
 
 
 @router.get("/", status_code=200)
-def get_feature(db: db_session,
-                feature_id: int | None = None,
-                feature_name: str | None = None,
-                jira_key: str | None = None,
-                ):
+async def get_feature(db: db_session,
+                      feature_id: int | None = None,
+                      feature_name: str | None = None,
+                      jira_key: str | None = None,
+                      fields: str | None = None,
+                      include: str | None = None,
+                      ):
     """
     Получение фичи по ID или имени.
 
@@ -146,26 +266,33 @@ def get_feature(db: db_session,
         feature_id (int, optional): ID фичи.
         feature_name (str, optional): Имя фичи.
         jira_key (str, optional): Ключ Jira фичи.
+        fields (str, optional): Поля фичи через запятую. По умолчанию — все.
+        include (str, optional): Вложенные данные через запятую: tasks, attachments, comments.
+            По умолчанию все три; пустое значение — только поля фичи.
 
     Exceptions:
+        HTTPException: Если в fields или include неизвестное имя.
         HTTPException: Если фича не найдена.
 
     Returns:
         FeatureOut: Фича с указанным ID или именем.
     """
     logger.info("Getting feature with ID: %s or name: %s", feature_id, feature_name)
-    feature = features_service.get_features(feature_id=feature_id,
-                                            feature_name=feature_name,
-                                            jira_key=jira_key,
-                                            db=db)
+    fields, include = feature_view(fields, include, features_service.FEATURE_DETAIL_INCLUDE)
+    feature = await run_db(db, features_service.get_features,
+                           feature_id=feature_id,
+                           feature_name=feature_name,
+                           jira_key=jira_key,
+                           fields=fields,
+                           include=include)
     if not feature:
         logger.warning("Feature not found with ID: %s or name: %s", feature_id, feature_name)
         raise HTTPException(status_code=404, detail="Feature not found")
-    return feature[0]
+    return FastJSONResponse(feature_with_tasks_out(feature[0]))
 
 
 @router.post('/', status_code=201)
-def create_feature(feature: FeatureCreate, user: get_current_user, db: db_session):
+async def create_feature(feature: FeatureCreate, user: get_current_user, db: db_session):
     """
     Создание новой фичи.
 
@@ -181,30 +308,65 @@ def create_feature(feature: FeatureCreate, user: get_current_user, db: db_sessio
     Returns:
         FeatureOut: Созданная фича.
     """
-    if features_service.get_features(feature_name=feature.name, db=db):
+    if await run_db(db, features_service.feature_name_exists, name=feature.name):
         logger.warning("Feature with name %s already exists", feature.name)
         raise HTTPException(status_code=400, detail="Feature with this name already exists")
-    if not releases_service.get_release(release_id=feature.release_id, db=db):
+    if not await run_db(db, releases_service.get_release, release_id=feature.release_id):
         logger.warning("Release not found with ID: %d", feature.release_id)
         raise HTTPException(status_code=404, detail="Release not found")
-    if not features_service.get_feature_type(feature_type_id=feature.feature_type_id, db=db):
+    if not await run_db(db, features_service.get_feature_type, feature_type_id=feature.feature_type_id):
         logger.warning("Feature type not found with ID: %d", feature.feature_type_id)
         raise HTTPException(status_code=404, detail="Feature type not found")
-    feature = features_service.create_feature(name=feature.name,
-                                              user_id=user.id,
-                                              jira_key=feature.jira_key,
-                                              feature_type_id=feature.feature_type_id,
-                                              release_id=feature.release_id,
-                                              status=feature.status, db=db)
-    task_types = tasks_service.get_task_type_for_feature_type(db=db, feature_type_id=feature.feature_type_id)
-    for task_type in task_types:
-        tasks_service.create_task(feature_id=feature.id, task_type_id=task_type.id, status='open', db=db)
-    logger.info("User %s create feature with name: %s, and ID: %d", user.username, feature.name, feature.id)
-    return features_service.get_features(feature_id=feature.id, db=db)
+    created = await run_db(db, features_service.create_feature,
+                           name=feature.name,
+                           user_id=user.id,
+                           jira_key=feature.jira_key,
+                           feature_type_id=feature.feature_type_id,
+                           release_id=feature.release_id,
+                           status=feature.status)
+    if created is None:
+        logger.warning("Feature with name %s already exists", feature.name)
+        raise HTTPException(status_code=400, detail="Feature with this name already exists")
+    logger.info("User %s create feature with name: %s, and ID: %d",
+                user.username, created['Feature'].name, created['Feature'].id)
+    return [created]
+
+
+@router.post('/import', response_model=FeatureImportOut, status_code=200)
+async def import_features(file: UploadFile,
+                          user: get_current_user,
+                          db: db_session,
+                          file_format: ImportFormatENUM | None = None):
+    """
+    Массовый импорт фич из CSV или JSONL.
+
+    Файл читается построчно. Каждая строка — фича с полями name, jira_key, status, feature_type_id, release_id
+    (для CSV — заголовок с такими колонками). Фичи и задачи по шаблонам их типов создаются в одной транзакции,
+    строки с ошибками пропускаются и попадают в отчёт.
+
+    Args:
+        file (UploadFile): Файл импорта.
+        user (User): Текущий аутентифицированный пользователь.
+        db (Session): Сессия базы данных.
+        file_format (ImportFormatENUM, optional): Формат файла. По умолчанию определяется по расширению:
+            .jsonl и .ndjson — JSONL, остальные — CSV.
+
+    Returns:
+        FeatureImportOut: Число созданных фич и ошибки по номерам строк.
+    """
+    file_format = import_file_format(file.filename, file_format)
+    logger.info("User %s import features from %s (%s)", user.username, file.filename, file_format.value)
+    created, errors = await features_service.import_features(db=db,
+                                                             rows=import_rows(file.file, file_format),
+                                                             user_id=user.id)
+    logger.info("User %s imported %d features, %d rows rejected", user.username, created, len(errors))
+    return {'created': created,
+            'errors': [{'line': line, 'error': error} for line, error in errors]
+            }
 
 
 @router.patch('/{feature_id}/type/{feature_type_id}', response_model=FeatureOut, status_code=200)
-def change_feature_type(feature_id: int, feature_type_id: int, user: get_current_user, db: db_session):
+async def change_feature_type(feature_id: int, feature_type_id: int, user: get_current_user, db: db_session):
     """
     Изменение типа фичи.
     Args:
@@ -219,7 +381,7 @@ def change_feature_type(feature_id: int, feature_type_id: int, user: get_current
     Returns:
         FeatureOut:  Измененная фича.
     """
-    feature = features_service.get_feature(feature_id=feature_id, db=db)
+    feature = await run_db(db, features_service.get_feature, feature_id=feature_id)
     if not feature:
         logger.warning("Feature not found with ID: %d", feature_id)
         raise HTTPException(status_code=404, detail="Feature not found")
@@ -227,7 +389,7 @@ def change_feature_type(feature_id: int, feature_type_id: int, user: get_current
     if feature.status == 'done':
         logger.warning("Feature is done")
         raise HTTPException(status_code=400, detail="Feature is done. Cant change feature type")
-    if not features_service.get_feature_type(feature_type_id=feature_type_id, db=db):
+    if not await run_db(db, features_service.get_feature_type, feature_type_id=feature_type_id):
         logger.warning("Feature type not found with ID: %d", feature_type_id)
         raise HTTPException(status_code=404, detail="Feature type not found")
     # Проверим что пытается поменять либо создатель фичи, либо менеджер и админ.
@@ -235,31 +397,22 @@ def change_feature_type(feature_id: int, feature_type_id: int, user: get_current
         if user.role not in [RolesEnum.ADMIN.value, RolesEnum.RELEASE_MANAGER.value]:
             raise HTTPException(status_code=403, detail="Not enough permissions")
     # Проверим, что нет закрытых доров
-    tasks = tasks_service.get_task_for_feature(feature_id=feature_id, db=db)
+    tasks = await run_db(db, tasks_service.get_task_for_feature, feature_id=feature_id)
     for task in tasks:
         if task.Task.status == 'done':
             task_name = task.task_type.get('name')
             logger.warning("Task %s is done", task_name)
             raise HTTPException(status_code=400, detail=f"Task {task_name} is done. Cant change feature type")
 
-    # Проверим какие Таски надо удалить и создать новые
-    new_task_types = tasks_service.get_task_type_for_feature_type(db=db, feature_type_id=feature_type_id)
-    old_task_types = tasks_service.get_task_type_for_feature_type(feature_type_id=feature.feature_type_id, db=db)
-    new_task_types_id = [task.id for task in new_task_types]
-    old_task_types_id = [task.id for task in old_task_types]
-    tasks_to_delete = list(set(old_task_types_id) - set(new_task_types_id))
-    tasks_to_create = list(set(new_task_types_id) - set(old_task_types_id))
-    for task_id in tasks_to_delete:
-        tasks_service.delete_task(feature_id=feature_id, task_type_id=task_id, db=db)
-    for task_id in tasks_to_create:
-        if task_id not in [task.Task.task_type_id for task in tasks]:
-            tasks_service.create_task(feature_id=feature_id, task_type_id=task_id, status='open', db=db)
+    # Удалим задачи старого шаблона и создадим недостающие задачи нового одной транзакцией
     logger.info('User %s change feature %d type to %d', user.username, feature_id, feature_type_id)
-    return features_service.update_feature(feature_id=feature_id, feature_type_id=feature_type_id, db=db)
+    return await run_db(db, features_service.change_feature_type,
+                        feature_id=feature_id,
+                        feature_type_id=feature_type_id)
 
 
 @router.patch('/{feature_id}/release/{release_id}', response_model=FeatureOut, status_code=200)
-def change_feature_release(feature_id: int, release_id: int, user: get_current_user, db: db_session):
+async def change_feature_release(feature_id: int, release_id: int, user: get_current_user, db: db_session):
     """
     Изменение релиза фичи.
     Args:
@@ -274,13 +427,13 @@ def change_feature_release(feature_id: int, release_id: int, user: get_current_u
     Returns:
         FeatureOut:  Измененная фича.
     """
-    feature = features_service.get_feature(feature_id=feature_id, db=db)
+    feature = await run_db(db, features_service.get_feature, feature_id=feature_id)
     if not feature:
         logger.warning("Feature not found with ID: %d", feature_id)
         raise HTTPException(status_code=404, detail="Feature not found")
     if release_id == feature.release_id:
         return feature
-    release = releases_service.get_release(release_id=release_id, db=db)
+    release = await run_db(db, releases_service.get_release, release_id=release_id)
     if not release:
         logger.warning("Release not found with ID: %d", release_id)
         raise HTTPException(status_code=404, detail="Release not found")
@@ -293,13 +446,35 @@ def change_feature_release(feature_id: int, release_id: int, user: get_current_u
     if feature.creator_id != user.id:
         if user.role not in [RolesEnum.ADMIN.value, RolesEnum.RELEASE_MANAGER.value]:
             raise HTTPException(status_code=403, detail="Not enough permissions")
-    feature = features_service.update_feature(feature_id=feature_id, release_id=release_id, db=db)
+    feature = await run_db(db, features_service.update_feature, feature_id=feature_id, release_id=release_id)
     logger.info("User %s move feature %d to enw release %d", user.username, feature_id, release_id)
     return feature
 
 
+@router.get('/{feature_id}/version', response_model=VersionOut, status_code=200)
+async def get_feature_version(feature_id: int, db: db_session):
+    """
+    Текущая версия фичи вместе с задачами, их вложениями и комментариями.
+
+    Args:
+        feature_id (int): ID фичи.
+        db (Session): Сессия базы данных.
+
+    Exceptions:
+        HTTPException: Если фича не найдена.
+
+    Returns:
+        VersionOut: ID, версия и время последнего изменения самой фичи.
+    """
+    version = await run_db(db, features_service.get_feature_version, feature_id=feature_id)
+    if not version:
+        logger.warning("Feature not found with ID: %d", feature_id)
+        raise HTTPException(status_code=404, detail="Feature not found")
+    return version
+
+
 @router.delete('/{feature_id}', status_code=204)
-def delete_feature(feature_id: int, user: get_current_user, db: db_session):
+async def delete_feature(feature_id: int, user: get_current_user, db: db_session):
     """
     Удаление фичи.
     Args:
@@ -311,7 +486,7 @@ def delete_feature(feature_id: int, user: get_current_user, db: db_session):
     Returns:
         None
     """
-    feature = features_service.get_feature(feature_id=feature_id, db=db)
+    feature = await run_db(db, features_service.get_feature, feature_id=feature_id)
     if not feature:
         logger.warning("Feature not found with ID: %d", feature_id)
         raise HTTPException(status_code=404, detail="Feature not found")
@@ -319,5 +494,5 @@ def delete_feature(feature_id: int, user: get_current_user, db: db_session):
         if user.role not in [RolesEnum.ADMIN.value, RolesEnum.RELEASE_MANAGER.value]:
             raise HTTPException(status_code=403, detail="Not enough permissions")
     logger.info("User %s delete feature with ID: %d", user.username, feature_id)
-    features_service.delete_feature(feature_id=feature_id, db=db)
+    await run_db(db, features_service.delete_feature, feature_id=feature_id)
     return
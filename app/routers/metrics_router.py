@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from starlette.responses import PlainTextResponse
+
+import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """
+    Метрики процесса в текстовом формате Prometheus: запросы по маршрутам, пул соединений БД и т.д.
+    """
+    return PlainTextResponse(metrics.render_latest(), media_type="text/plain; version=0.0.4")
@@ -1,9 +1,11 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
 from sqlalchemy.orm import Session
 
 from auth import get_current_user
+from http_cache import conditional_get, version_etag
+from settings import AppSettings
 from schemas import User, PlatformOut, PlatformCreate
 from sql_app import platforms_service
 from sql_app.database import get_database
@@ -48,16 +50,23 @@ def create_platform(platform: PlatformCreate,
 
 
 @router.get("/", response_model=list[PlatformOut], status_code=200)
-def get_all_platforms(db: db_session):
+def get_all_platforms(response: Response, db: db_session, if_none_match: str | None = Header(None)):
     """
     Получение всех платформ.
 
+    ETag строится по версии кэшированного справочника; при совпадении If-None-Match ответ 304 без тела.
+
     Args:
+        response (Response): Ответ, в который проставляются ETag и Cache-Control.
         db (Session): Сессия базы данных.
+        if_none_match (str | None): ETag, уже имеющийся у клиента.
 
     Returns:
         list[PlatformOut]: Список всех платформ.
     """
     logger.info("Fetching all platforms")
+    etag = version_etag('platforms', platforms_service.get_platforms_version(db=db))
+    if cached := conditional_get(response, if_none_match, etag, max_age=AppSettings.HTTP_CACHE_MAX_AGE):
+        return cached
     platforms = platforms_service.get_all_platforms(db=db)
     return platforms
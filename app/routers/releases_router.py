@@ -1,201 +1,326 @@
 from typing import Annotated
-import openpyxl
-from openpyxl.styles import Border, Side, Font, PatternFill
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from starlette.responses import FileResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, StreamingResponse
 
 from sql_app import releases_service
 from sql_app.channels_service import get_channel
-from sql_app.database import get_database
+from sql_app.database import get_mode_database, database_session, run_db, iterate_db
 
 from sql_app.models.user import RolesEnum
 from sql_app.platforms_service import get_platform
-from sql_app.releases_service import get_all_releases, update_release, get_release, get_all_release_types
-from schemas import ReleaseStageCreate, User, ReleaseStageOut, ReleaseTypeOut, ReleaseStageOutWithFeature, \
-    PaginationReleaseStages, ReleaseStatusENUM
+from schemas import ReleaseStageCreate, User, ReleaseStageOut, ReleaseTypeOut, \
+    PaginationReleaseStages, ReleaseStatusENUM, ExportFormatENUM, VersionOut
 from auth import get_current_user
 import logg_config
+from pagination import encode_cursor, decode_cursor
+from reports import ReleaseReport, new_report_path, remove_report, REPORT_MEDIA_TYPE, REPORT_FILENAME, \
+    report_cache, report_version, report_etag
+from http_cache import etag_matches, not_modified, conditional_get, version_etag
+from settings import AppSettings
+import exports
+from fast_json import FastJSONResponse, row_dict
 
 logger = logg_config.get_logger(__name__)
 router = APIRouter(prefix="/releases", tags=["releases"])
 get_current_user = Annotated[User, Depends(get_current_user)]
-db_session = Annotated[Session, Depends(get_database)]
+db_session = Annotated[Session | AsyncSession, Depends(get_mode_database)]
+
+
+def release_with_features_out(release) -> dict:
+    """Строка all_releases_stmt/release_with_features_stmt в формате ReleaseStageOutWithFeature."""
+    return row_dict(release)
 
 
 @router.post("/", response_model=ReleaseStageOut)
-def create_release(stage: ReleaseStageCreate,
-                   current_user: get_current_user,
-                   db: db_session,
-                   ):
+async def create_release(stage: ReleaseStageCreate,
+                         current_user: get_current_user,
+                         db: db_session,
+                         ):
     logger.info("User %s is attempting to create a new release: %s", current_user.username, stage.name)
     if current_user.role not in [RolesEnum.ADMIN.value, RolesEnum.RELEASE_MANAGER.value]:
         logger.warning("User %s does not have enough permissions", current_user.username)
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    if get_release(name=stage.name, db=db):
+    if await run_db(db, releases_service.get_release, name=stage.name):
         logger.warning("Release stage with name %s already exists", stage.name)
         raise HTTPException(status_code=400, detail="Release stage with this name already exists")
-    if not get_channel(channel_id=stage.channel_id, db=db):
+    if not await run_db(db, get_channel, channel_id=stage.channel_id):
         logger.warning("Channel not found with ID: %d", stage.channel_id)
         raise HTTPException(status_code=404, detail="Channel not found")
-    if not get_platform(platform_id=stage.platform_id, db=db):
+    if not await run_db(db, get_platform, platform_id=stage.platform_id):
         logger.warning("Platform not found with ID: %d", stage.platform_id)
         raise HTTPException(status_code=404, detail="Platform not found")
-    release = releases_service.create_release(stage=stage, db=db)
+    release = await run_db(db, releases_service.create_release, stage=stage)
     logger.info("Release %s created successfully by user %s", stage.name, current_user.username)
     return release
 
 
 @router.get("/all", response_model=PaginationReleaseStages, status_code=200)
-def get_all_releases(db: db_session,
-                     platform_id: int | None = None,
-                     channel_id: int | None = None,
-                     status: ReleaseStatusENUM | None = None,
-                     page: int = 1,
-                     page_size: int = 50):
+async def get_all_releases(db: db_session,
+                           platform_id: int | None = None,
+                           channel_id: int | None = None,
+                           status: ReleaseStatusENUM | None = None,
+                           page: int = 1,
+                           page_size: int = 50,
+                           cursor: str | None = None,
+                           include_total: bool | None = None,
+                           estimate_total: bool = False):
+    """
+    Список релизов с фичами.
+
+    По умолчанию постраничный (page/page_size). Если передан cursor (пустой — первая страница),
+    включается keyset-пагинация по id релиза: ответ содержит next_cursor, total не считается.
+
+    total считается по таблице releases без агрегации фич. include_total=false отключает подсчёт,
+    estimate_total=true для запроса без фильтров берёт оценку из статистики планировщика.
+
+    Ответ собирается из строк Core-запроса и кодируется FastJSONResponse без проверки через pydantic;
+    response_model описывает формат для OpenAPI.
+    """
     logger.info("Fetching all releases")
-    data, page_size, total = releases_service.get_all_releases(db=db,
-                                                               platform_id=platform_id,
-                                                               channel_id=channel_id,
-                                                               status=status.value if status else None,
-                                                               page=page,
-                                                               page_size=page_size)
-    result = []
-    for release in data:
-        result_row = ReleaseStageOutWithFeature.from_orm(release.Release)
-        result_row.features = release.features
-        result.append(result_row)
-    return {'data': result, 'page': page, 'page_size': page_size, 'total': total}
+    if include_total is None:
+        include_total = cursor is None
+    if cursor is not None:
+        data, page_size, next_after_id = await run_db(db, releases_service.get_all_releases_keyset,
+                                                      page_size=page_size,
+                                                      after_id=decode_cursor(cursor),
+                                                      platform_id=platform_id,
+                                                      channel_id=channel_id,
+                                                      status=status.value if status else None)
+        total = None
+        if include_total:
+            total = await run_db(db, releases_service.count_releases,
+                                 platform_id=platform_id,
+                                 channel_id=channel_id,
+                                 status=status.value if status else None,
+                                 estimated=estimate_total)
+        return FastJSONResponse({'data': [release_with_features_out(release) for release in data],
+                                 'page': None,
+                                 'page_size': page_size,
+                                 'total': total,
+                                 'next_cursor': encode_cursor(next_after_id)})
+    data, page_size, total = await run_db(db, releases_service.get_all_releases,
+                                          platform_id=platform_id,
+                                          channel_id=channel_id,
+                                          status=status.value if status else None,
+                                          page=page,
+                                          page_size=page_size,
+                                          include_total=include_total,
+                                          estimate_total=estimate_total)
+    result = [release_with_features_out(release) for release in data]
+    return FastJSONResponse({'data': result, 'page': page, 'page_size': page_size, 'total': total, 'next_cursor': None})
+
+
+async def export_chunks(export_format: ExportFormatENUM,
+                        release_id: int | None = None,
+                        platform_id: int | None = None,
+                        channel_id: int | None = None,
+                        status: ReleaseStatusENUM | None = None):
+    # Сессия из Depends закрывается до отправки ответа, поэтому строки читаются через свою сессию;
+    # форматирование пачки нагружает CPU и выполняется вне event loop
+    export = exports.EXPORT_WRITERS[export_format.value]()
+    async with database_session() as db:
+        async for rows in iterate_db(db, releases_service.get_export_rows,
+                                     release_id=release_id,
+                                     platform_id=platform_id,
+                                     channel_id=channel_id,
+                                     status=status.value if status else None):
+            if chunk := await run_in_threadpool(export.write, rows):
+                yield chunk
+    yield await run_in_threadpool(export.close)
+
+
+def check_export_format(export_format: ExportFormatENUM):
+    try:
+        exports.check_format(export_format.value)
+    except exports.ExportFormatError as error:
+        logger.warning("Export format %s is unavailable: %s", export_format.value, error)
+        raise HTTPException(status_code=501, detail=str(error))
+
+
+def export_response(chunks, export_format: ExportFormatENUM, name: str) -> StreamingResponse:
+    filename = exports.export_filename(name, export_format.value)
+    return StreamingResponse(chunks,
+                             media_type=exports.EXPORT_MEDIA_TYPES[export_format.value],
+                             headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+@router.get("/export")
+async def export_releases(platform_id: int | None = None,
+                          channel_id: int | None = None,
+                          status: ReleaseStatusENUM | None = None,
+                          export_format: ExportFormatENUM = Query(ExportFormatENUM.CSV, alias='format')):
+    """
+    Выгрузка фич и задач релизов (по фильтрам платформы, канала и статуса) в CSV, JSONL или Parquet.
+
+    Строки стримятся из серверного курсора пачками, память не зависит от размера выгрузки.
+    """
+    logger.info("Exporting releases to %s", export_format.value)
+    check_export_format(export_format)
+    chunks = export_chunks(export_format, platform_id=platform_id, channel_id=channel_id, status=status)
+    return export_response(chunks, export_format, 'releases')
+
+
+@router.get("/{release_id}/export")
+async def export_release(release_id: int,
+                         db: db_session,
+                         export_format: ExportFormatENUM = Query(ExportFormatENUM.CSV, alias='format')):
+    logger.info("Exporting release with ID: %d to %s", release_id, export_format.value)
+    if not await run_db(db, releases_service.get_release, release_id=release_id):
+        logger.warning("Release not found with ID: %d", release_id)
+        raise HTTPException(status_code=404, detail="Release not found")
+    check_export_format(export_format)
+    return export_response(export_chunks(export_format, release_id=release_id), export_format, f'release_{release_id}')
 
 
 @router.get('/{release_id}', status_code=200)
-def get_release(release_id: int, db: db_session):
+async def get_release(release_id: int, response: Response, db: db_session, if_none_match: str | None = Header(None)):
     logger.info("Getting release with ID: %d", release_id)
-    release = releases_service.get_release_with_features(release_id=release_id, db=db)
+    version = await run_db(db, releases_service.get_release_version, release_id=release_id)
+    if not version:
+        logger.warning("Release not found with ID: %d", release_id)
+        raise HTTPException(status_code=404, detail="Release not found")
+    etag = version_etag(f'release-{release_id}', version.version)
+    if cached := conditional_get(response, if_none_match, etag):
+        return cached
+    release = await run_db(db, releases_service.get_release_with_features, release_id=release_id)
     if not release:
         logger.warning("Release not found with ID: %d", release_id)
         raise HTTPException(status_code=404, detail="Release not found")
-    response = ReleaseStageOutWithFeature.from_orm(release.Release)
-    response.features = release.features
-    return response
+    return FastJSONResponse(release_with_features_out(release), headers=response.headers)
+
+
+@router.get('/{release_id}/version', response_model=VersionOut, status_code=200)
+async def get_release_version(release_id: int, db: db_session):
+    """
+    Текущая версия релиза вместе с фичами и задачами: меняется при любом их изменении.
+    Дешёвая проверка актуальности для кэшей и инкрементальной синхронизации.
+    """
+    version = await run_db(db, releases_service.get_release_version, release_id=release_id)
+    if not version:
+        logger.warning("Release not found with ID: %d", release_id)
+        raise HTTPException(status_code=404, detail="Release not found")
+    return version
 
 
 @router.delete("/{release_id}", status_code=204)
-def delete_release(release_id: int,
-                   current_user: get_current_user,
-                   db: db_session):
+async def delete_release(release_id: int,
+                         current_user: get_current_user,
+                         db: db_session):
     logger.info("User %s is attempting to delete release with ID: %d", current_user.username, release_id)
     if current_user.role not in [RolesEnum.ADMIN.value, RolesEnum.RELEASE_MANAGER.value]:
         logger.warning("User %s does not have enough permissions", current_user.username)
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    release = releases_service.get_release(release_id=release_id, db=db)
+    release = await run_db(db, releases_service.get_release, release_id=release_id)
     if not release:
         logger.warning("Release not found with ID: %d", release_id)
         raise HTTPException(status_code=404, detail="Release not found")
-    releases_service.delete_release(stage_id=release_id, db=db)
+    await run_db(db, releases_service.delete_release, stage_id=release_id)
     logger.info("Release with ID: %d deleted successfully by user %s", release_id, current_user.username)
     return None
 
 
+async def build_report(release, db: Session | AsyncSession) -> str:
+    # openpyxl нагружает CPU, поэтому строки дописываются в книгу вне event loop
+    file_path = new_report_path()
+    try:
+        report = ReleaseReport()
+        await run_in_threadpool(report.add_release, release.name)
+        async for features in iterate_db(db, releases_service.get_release_report_rows, release_id=release.id):
+            await run_in_threadpool(report.add_features, features)
+        return await run_in_threadpool(report.save, file_path)
+    except Exception:
+        remove_report(file_path)
+        raise
+
+
 @router.get("/{release_id}/report", response_class=FileResponse)
-def generate_report(release_id: int, db: db_session):
-    release = get_release(release_id=release_id, db=db)
+async def generate_report(release_id: int, db: db_session, if_none_match: str | None = Header(None)):
+    """
+    Отчёт по фичам релиза в XLSX.
+
+    Готовые отчёты кэшируются на диске по версии содержимого релиза; ETag ответа — эта версия,
+    и при совпадении If-None-Match отчёт не строится и не передаётся (304).
+    """
+    release = await run_db(db, releases_service.get_release, release_id=release_id)
     if not release:
         logger.warning("Release not found with ID: %d", release_id)
         raise HTTPException(status_code=404, detail="Release not found")
 
-    features = releases_service.get_release_with_features(release_id=release_id, db=db).features
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = release.name
-
-    # Feature details
-    feature_headers = ["Имя фичи", "Ключ фичи", "Статус", "Тип фичи"]
-    for col_num, header in enumerate(feature_headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.font = Font(bold=True, size=14)
-        cell.fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-
-    thin_border = Side(border_style='thin', color='000000')
-    border = Border(left=thin_border, right=thin_border, top=thin_border, bottom=thin_border)
-
-    for row_num, feature in enumerate(features, 2):
-        for col_num in range(1, 5):
-            cell = ws.cell(row=row_num, column=col_num)
-            if col_num == 1:
-                cell.value = feature['name']
-            elif col_num == 2:
-                cell.value = feature['jira_key']
-            elif col_num == 3:
-                cell.value = feature['status']
-            elif col_num == 4:
-                cell.value = feature['feature_type_id']
-
-    ws.auto_filter.ref = ws.dimensions
-    ws.auto_filter.add_filter_column(1, [feature['status'] for feature in features])
-
-    for row in ws['A1:D6']:
-        for cell in row:
-            cell.border = border
-
-    file_path = "release_report.xlsx"
-    wb.save(file_path)
-    logger.info("Report generated successfully")
+    version = report_version(release.name, release.version)
+    etag = report_etag(release_id, version)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, headers)
+
+    # И из кэша, и после сборки у ответа свой путь к файлу: удаляется после отправки
+    file_path = await run_in_threadpool(report_cache.get, release_id, version)
+    if file_path is None:
+        file_path = await build_report(release, db)
+        await run_in_threadpool(report_cache.put, release_id, version, file_path)
+        logger.info("Report generated successfully")
     return FileResponse(file_path,
-                        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                        filename=file_path)
+                        media_type=REPORT_MEDIA_TYPE,
+                        filename=REPORT_FILENAME,
+                        headers=headers,
+                        background=BackgroundTask(remove_report, file_path))
 
 
 @router.patch("/{release_id}")
-def update_release(release_id: int,
-                   current_user: get_current_user,
-                   db: db_session,
-                   name: str | None = None,
-                   description: str | None = None,
-                   start_date: str | None = None,
-                   end_date: str | None = None,
-                   ):
+async def update_release(release_id: int,
+                         current_user: get_current_user,
+                         db: db_session,
+                         name: str | None = None,
+                         description: str | None = None,
+                         start_date: str | None = None,
+                         end_date: str | None = None,
+                         ):
     logger.info("User %s is attempting to update release with ID: %d", current_user.username, release_id)
     if current_user.role not in [RolesEnum.ADMIN.value, RolesEnum.RELEASE_MANAGER.value]:
         logger.warning("User %s does not have enough permissions", current_user.username)
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    updated_release = update_release(stage_id=release_id,
-                                     name=name,
-                                     description=description,
-                                     start_date=start_date,
-                                     end_date=end_date,
-                                     db=db)
+    updated_release = await run_db(db, releases_service.update_release,
+                                   stage_id=release_id,
+                                   name=name,
+                                   description=description,
+                                   start_date=start_date,
+                                   end_date=end_date)
     logger.info("Release with ID: %d updated successfully by user %s", release_id, current_user.username)
     return updated_release
 
 
 @router.get('/types/', response_model=list[ReleaseTypeOut], status_code=200)
-def get_release_types(db: db_session):
+async def get_release_types(response: Response, db: db_session, if_none_match: str | None = Header(None)):
     logger.info("Fetching all release types")
-    release_types = get_all_release_types(db=db)
+    etag = version_etag('release-types', await run_db(db, releases_service.get_release_types_version))
+    if cached := conditional_get(response, if_none_match, etag, max_age=AppSettings.HTTP_CACHE_MAX_AGE):
+        return cached
+    release_types = await run_db(db, releases_service.get_all_release_types)
     return release_types
 
 
 @router.post("/types/", response_model=ReleaseTypeOut, status_code=201)
-def create_release_type(name: str,
-                        platform_id: int,
-                        channel_id: int,
-                        current_user: get_current_user,
-                        db: db_session):
+async def create_release_type(name: str,
+                              platform_id: int,
+                              channel_id: int,
+                              current_user: get_current_user,
+                              db: db_session):
     logger.info("User %s is attempting to create a new release type: %s", current_user.username, name)
     if current_user.role not in [RolesEnum.ADMIN.value, RolesEnum.RELEASE_MANAGER.value]:
         logger.warning("User %s does not have enough permissions", current_user.username)
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    if not get_platform(platform_id=platform_id, db=db):
+    if not await run_db(db, get_platform, platform_id=platform_id):
         logger.warning("Platform not found with ID: %d", platform_id)
         raise HTTPException(status_code=404, detail="Platform not found")
-    if not get_channel(channel_id=channel_id, db=db):
+    if not await run_db(db, get_channel, channel_id=channel_id):
         logger.warning("Channel not found with ID: %d", channel_id)
         raise HTTPException(status_code=404, detail="Channel not found")
-    new_release_type = releases_service.create_release_type(name=name, platform_id=platform_id, channel_id=channel_id,
-                                                            db=db)
+    new_release_type = await run_db(db, releases_service.create_release_type,
+                                    name=name, platform_id=platform_id, channel_id=channel_id)
     logger.info("Release type %s created successfully by user %s", name, current_user.username)
     return new_release_type
@@ -0,0 +1,123 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from starlette.responses import FileResponse
+
+from auth import get_current_user
+from schemas import User, ReportJobCreate, ReportJobOut
+from sql_app import releases_service
+from sql_app.database import get_database
+from sql_app.models.user import RolesEnum
+from report_jobs import report_jobs, ReportJobLimitError
+from reports import REPORT_MEDIA_TYPE, REPORT_FILENAME
+from settings import ReportSettings
+import logg_config
+
+logger = logg_config.get_logger(__name__)
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+get_current_user = Annotated[User, Depends(get_current_user)]
+db_session = Annotated[Session, Depends(get_database)]
+
+
+def get_user_job(job_id: str, current_user: User):
+    job = report_jobs.get(job_id)
+    if not job or (job.user_id != current_user.id and current_user.role != RolesEnum.ADMIN.value):
+        logger.warning("Report job not found: %s", job_id)
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
+
+
+@router.post("/jobs", response_model=ReportJobOut, status_code=202)
+def create_report_job(job: ReportJobCreate,
+                      current_user: get_current_user,
+                      db: db_session):
+    """
+    Постановка в очередь отчёта по одному или нескольким релизам: по листу на релиз в одной книге.
+
+    Релизы выбираются по списку id и/или фильтрам платформы, канала и статуса (например, все релизы
+    платформы в канале). Книга собирается в отдельном процессе; статус опрашивается через GET /reports/jobs/{id},
+    готовый файл скачивается через GET /reports/jobs/{id}/file.
+
+    Args:
+        job (ReportJobCreate): Выбор релизов.
+        current_user (User): Текущий аутентифицированный пользователь.
+        db (Session): Сессия базы данных.
+
+    Exceptions:
+        HTTPException: Если не задан ни список релизов, ни фильтр.
+        HTTPException: Если релизов больше ReportSettings.JOB_MAX_RELEASES.
+        HTTPException: Если ни один релиз не найден.
+        HTTPException: Если превышен лимит незавершённых задач (429).
+
+    Returns:
+        ReportJobOut: Поставленная задача.
+    """
+    logger.info("User %s is requesting a report job", current_user.username)
+    if not (job.release_ids or job.platform_id or job.channel_id or job.status):
+        logger.warning("Report job without releases selection from user %s", current_user.username)
+        raise HTTPException(status_code=400, detail="Release ids or filters are required")
+    releases = releases_service.get_report_releases(db=db,
+                                                    limit=ReportSettings.JOB_MAX_RELEASES + 1,
+                                                    release_ids=job.release_ids,
+                                                    platform_id=job.platform_id,
+                                                    channel_id=job.channel_id,
+                                                    status=job.status.value if job.status else None)
+    if len(releases) > ReportSettings.JOB_MAX_RELEASES:
+        logger.warning("Too many releases for report job from user %s", current_user.username)
+        raise HTTPException(status_code=400,
+                            detail=f"Report is limited to {ReportSettings.JOB_MAX_RELEASES} releases")
+    if not releases:
+        logger.warning("Releases not found for report job from user %s", current_user.username)
+        raise HTTPException(status_code=404, detail="Releases not found")
+    try:
+        report_job = report_jobs.submit(user_id=current_user.id, releases=releases)
+    except ReportJobLimitError as error:
+        logger.warning("Report job rejected for user %s: %s", current_user.username, error)
+        raise HTTPException(status_code=429, detail=str(error))
+    logger.info("Report job %s queued for %d releases", report_job.id, len(releases))
+    return report_job
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobOut, status_code=200)
+def get_report_job(job_id: str, current_user: get_current_user):
+    """
+    Статус задачи отчёта. Задача видна создавшему её пользователю и администратору.
+
+    Args:
+        job_id (str): ID задачи.
+        current_user (User): Текущий аутентифицированный пользователь.
+
+    Exceptions:
+        HTTPException: Если задача не найдена или уже удалена по истечении срока хранения.
+
+    Returns:
+        ReportJobOut: Задача.
+    """
+    return get_user_job(job_id, current_user)
+
+
+@router.get("/jobs/{job_id}/file", response_class=FileResponse)
+def download_report_job(job_id: str, current_user: get_current_user):
+    """
+    Готовый файл отчёта.
+
+    Args:
+        job_id (str): ID задачи.
+        current_user (User): Текущий аутентифицированный пользователь.
+
+    Exceptions:
+        HTTPException: Если задача не найдена.
+        HTTPException: Если отчёт ещё строится (409) или построить его не удалось (410).
+
+    Returns:
+        FileResponse: Книга XLSX.
+    """
+    job = get_user_job(job_id, current_user)
+    if job.status == 'failed':
+        logger.warning("Report job %s failed, nothing to download", job_id)
+        raise HTTPException(status_code=410, detail=job.error)
+    if job.status != 'done':
+        raise HTTPException(status_code=409, detail="Report is not ready yet")
+    return FileResponse(job.file_path, media_type=REPORT_MEDIA_TYPE, filename=REPORT_FILENAME)
@@ -3,7 +3,9 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from auth import get_current_user
+from starlette.concurrency import run_in_threadpool
+
+from auth import get_current_user, get_password_hash_async
 from schemas import User, UserCreate, RegisterUser, UserOut
 from sql_app import users_service
 from sql_app.database import get_database
@@ -31,7 +33,7 @@ def get_me(current_user: get_current_user):
 
 
 @router.post("/register", response_model=UserOut, status_code=201)
-def register(user: RegisterUser, db: db_session):
+async def register(user: RegisterUser, db: db_session):
 	"""
 	Регистрация нового пользователя.
 	Args:
@@ -40,8 +42,9 @@ def register(user: RegisterUser, db: db_session):
 	Returns:
 		User: Информация о новом пользователе.
 	"""
-	db_user = users_service.get_user(username=user.username, db=db)
+	db_user = await run_in_threadpool(users_service.get_user, username=user.username, db=db)
 	if db_user:
 		raise HTTPException(status_code=400, detail="Username already registered")
 	new_user = UserCreate(username=user.username, password=user.password, email=user.email, role=RolesEnum.USER.value)
-	return users_service.create_user(user=new_user, db=db)
+	hashed_password = await get_password_hash_async(user.password)
+	return await run_in_threadpool(users_service.create_user, user=new_user, hashed_password=hashed_password, db=db)
@@ -8,9 +8,10 @@ from sql_app.models.user import RolesEnum
 
 
 class BasePagination(BaseModel):
-    page: int
+    page: int | None
     page_size: int
-    total: int
+    total: int | None
+    next_cursor: str | None = None
 
 
 class ReleaseStageCreate(BaseModel):
@@ -95,6 +96,10 @@ class UserInDB(User):
     hashed_password: str
 
 
+class RefreshTokenIn(BaseModel):
+    refresh_token: str
+
+
 class PlatformCreate(BaseModel):
     name: str
 
@@ -188,6 +193,20 @@ class FeatureOut(BaseModel):
         orm_mode = True
 
 
+class FeatureSearchOut(FeatureOut):
+    score: float
+
+
+class FeatureImportError(BaseModel):
+    line: int
+    error: str
+
+
+class FeatureImportOut(BaseModel):
+    created: int
+    errors: list[FeatureImportError]
+
+
 class ReleaseFeature(BaseModel):
     id: int
     name: str
@@ -265,8 +284,54 @@ class FeatureStatusENUM(enum.Enum):
     CANCELLED = 'cancelled'
 
 
+class ImportFormatENUM(enum.Enum):
+    CSV = 'csv'
+    JSONL = 'jsonl'
+
+
+class ExportFormatENUM(enum.Enum):
+    CSV = 'csv'
+    JSONL = 'jsonl'
+    PARQUET = 'parquet'
+
+
 class ReleaseStatusENUM(enum.Enum):
     OPEN = 'open'
     IN_PROGRESS = 'in_progress'
     DONE = 'done'
     CANCELLED = 'cancelled'
+
+
+class ReportJobStatusENUM(enum.Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class ReportJobCreate(BaseModel):
+    release_ids: list[int] | None = None
+    platform_id: int | None = None
+    channel_id: int | None = None
+    status: ReleaseStatusENUM | None = None
+
+
+class VersionOut(BaseModel):
+    id: int
+    version: int
+    updated_at: datetime.datetime
+
+    class Config:
+        orm_mode = True
+
+
+class ReportJobOut(BaseModel):
+    id: str
+    status: ReportJobStatusENUM
+    release_ids: list[int]
+    created_at: datetime.datetime
+    finished_at: datetime.datetime | None
+    error: str | None
+
+    class Config:
+        orm_mode = True
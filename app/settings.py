@@ -1,9 +1,58 @@
 import os
+import tempfile
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
 
 
 class DbSettings:
     DB_URL = os.environ.get('DATABASE_URL')
+    # Асинхронный режим: запросы релизов, фич и задач идут через asyncpg + AsyncSession (см. sql_app.database.run_db)
+    ASYNC_MODE = env_bool('DB_ASYNC_MODE')
+    ASYNC_DB_URL = os.environ.get('ASYNC_DATABASE_URL') or (
+        DB_URL.replace('postgresql://', 'postgresql+asyncpg://', 1) if DB_URL else None)
+    # Пул соединений. В сумме (POOL_SIZE + MAX_OVERFLOW) * число воркеров не должно превышать max_connections
+    POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', -1))
+    POOL_PRE_PING = env_bool('DB_POOL_PRE_PING')
+    # Statement дольше стольких миллисекунд пишется в лог с обезличенными параметрами; 0 отключает
+    SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 500))
+    # Один и тот же statement, выполненный за HTTP-запрос столько раз и больше, помечается как подозрение на N+1
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('DB_N_PLUS_ONE_THRESHOLD', 5))
 
 
 class AppSettings:
     TOKEN = os.environ.get('TOKEN')
+    # Срок refresh-токена: пока он действует, access-токен обновляется без пароля и bcrypt
+    REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get('REFRESH_TOKEN_EXPIRE_DAYS', 30))
+    # Кэш аутентифицированных пользователей: время жизни записи в секундах (0 отключает) и число записей
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    # Кэш справочников (платформы, каналы, типы релизов и задач, роли): время жизни в секундах, 0 отключает.
+    # Изменения через API сбрасывают кэш сразу, ttl ограничивает устаревание в других воркерах
+    REFERENCE_CACHE_TTL = float(os.environ.get('REFERENCE_CACHE_TTL', 300))
+    # Сколько секунд клиенты и обратный прокси могут отдавать справочники без перепроверки (Cache-Control max-age)
+    HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', 60))
+    # Стоимость bcrypt (log2 числа раундов); хэши с другой стоимостью пересчитываются при входе
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    # Потоки для bcrypt: одновременно считается не больше стольких хэшей, остальные ждут в очереди
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+class ReportSettings:
+    # Дисковый кэш отчётов по релизам; CACHE_MAX_MB=0 отключает кэш
+    CACHE_DIR = os.environ.get('REPORT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'release_reports')
+    CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_MB', 512)) * 2 ** 20
+    # Фоновые отчёты: процессы-рендереры, лимиты незавершённых задач (всего и на пользователя),
+    # число релизов в одной книге и время хранения готовых файлов
+    JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 2))
+    JOB_MAX_ACTIVE = int(os.environ.get('REPORT_JOB_MAX_ACTIVE', 20))
+    JOB_MAX_ACTIVE_PER_USER = int(os.environ.get('REPORT_JOB_MAX_ACTIVE_PER_USER', 3))
+    JOB_MAX_RELEASES = int(os.environ.get('REPORT_JOB_MAX_RELEASES', 100))
+    JOB_TTL = int(os.environ.get('REPORT_JOB_TTL', 3600))
@@ -1,24 +1,25 @@
-from sqlalchemy import select, insert
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from reference_cache import find_one
 from sql_app.models.channels import Channel
+from sql_app.reference_data import CHANNELS
 
 
 def create_channel(name: str, db: Session):
     stmt = insert(Channel).values(name=name).returning(Channel)
     channel = db.execute(stmt).scalar()
     db.commit()
+    CHANNELS.invalidate()
     return channel
 
 
 def get_channel(db: Session, channel_id: int | None = None, name: str | None = None):
-    stmt = select(Channel)
-    if channel_id is not None:
-        stmt = stmt.where(Channel.id == channel_id)
-    if name is not None:
-        stmt = stmt.where(Channel.name == name)
-    return db.execute(stmt).scalar_one_or_none()
+    return find_one(CHANNELS.rows(db), id=channel_id, name=name)
 
 
 def get_all_channels(db: Session):
-    stmt = select(Channel)
-    return db.execute(stmt).scalars().all()
+    return list(CHANNELS.rows(db))
+
+
+def get_channels_version(db: Session) -> str:
+    return CHANNELS.snapshot(db).version
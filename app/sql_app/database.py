@@ -1,13 +1,40 @@
+from contextlib import asynccontextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
+import fast_json
 from settings import DbSettings
+from sql_app.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool, register_pool
+from sql_app.query_metrics import instrument_engine
+
+# json_deserializer: агрегаты задач и фич приходят из базы json-значениями, разбор через orjson (если есть) дешевле
+POOL_OPTIONS = dict(pool_size=DbSettings.POOL_SIZE,
+                    max_overflow=DbSettings.MAX_OVERFLOW,
+                    pool_timeout=DbSettings.POOL_TIMEOUT,
+                    pool_recycle=DbSettings.POOL_RECYCLE,
+                    pool_pre_ping=DbSettings.POOL_PRE_PING,
+                    json_deserializer=fast_json.loads)
 
-engine = create_engine(DbSettings.DB_URL)
+# Единственный синхронный движок приложения: его же использует create_tables.py
+engine = instrument_engine(register_pool(create_engine(DbSettings.DB_URL, poolclass=InstrumentedQueuePool,
+                                                     **POOL_OPTIONS),
+                                           max_overflow=DbSettings.MAX_OVERFLOW))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+if DbSettings.ASYNC_MODE:
+    async_engine = instrument_engine(register_pool(create_async_engine(DbSettings.ASYNC_DB_URL,
+                                                                       poolclass=InstrumentedAsyncQueuePool,
+                                                                       **POOL_OPTIONS),
+                                           max_overflow=DbSettings.MAX_OVERFLOW))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_database():
     db = SessionLocal()
@@ -15,3 +42,56 @@ def get_database():
         yield db
     finally:
         db.close()
+
+
+@asynccontextmanager
+async def database_session():
+    """
+    Сессия обработчиков, общих для обоих режимов БД: AsyncSession при DbSettings.ASYNC_MODE, иначе Session.
+    expire_on_commit=False в обоих режимах: после commit объекты отдаются в ответ без ленивой подгрузки атрибутов,
+    которая шла бы уже из event loop.
+    """
+    if DbSettings.ASYNC_MODE:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
+
+async def get_mode_database():
+    async with database_session() as db:
+        yield db
+
+
+async def run_db(db: Session | AsyncSession, func, /, *args, **kwargs):
+    """
+    Вызов синхронной функции сервиса (сессия — аргумент db) из async-обработчика. С AsyncSession функция
+    выполняется через run_sync: запросы идут через asyncpg и event loop не ждёт базу; с Session — в пуле потоков.
+    Сервисы пишутся один раз и одинаково работают в обоих режимах.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: func(*args, db=session, **kwargs))
+    return await run_in_threadpool(func, *args, db=db, **kwargs)
+
+
+async def iterate_db(db: Session | AsyncSession, func, /, *args, **kwargs):
+    """Обход генератора сервиса (пачки серверного курсора): каждая пачка читается отдельным вызовом run_db."""
+    batches = None
+
+    def next_batch(db):
+        nonlocal batches
+        if batches is None:
+            batches = func(*args, db=db, **kwargs)
+        return next(batches, None)
+
+    try:
+        while (batch := await run_db(db, next_batch)) is not None:
+            yield batch
+    finally:
+        # При обрыве стрима курсор тоже закрывается через run_db: в асинхронном режиме это запрос к базе
+        if batches is not None:
+            await run_db(db, lambda db: batches.close())
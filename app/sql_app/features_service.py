@@ -1,12 +1,21 @@
-from sqlalchemy import select, func, delete, update
-from sqlalchemy.orm import Session
+from typing import Iterable
 
+from sqlalchemy import select, func, delete, update, exists, literal, union, true
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
+
+from feature_import import batched
+from sql_app.database import run_db
 from sql_app.models.features import FeatureType, FeatureTypeTaskType, Feature
 from sql_app.models.releases import Release
+from sql_app.releases_service import EMPTY_JSON_ARRAY
 from sql_app.models.task import TaskType, Task, AttachmentLink, TaskComment
+from sql_app.statistics import estimated_count_stmt
 
 
-def get_feature_type(db: Session, name: str | None = None, feature_type_id: int | None = None):
+def feature_type_stmt(name: str | None = None, feature_type_id: int | None = None):
     stmt = select(FeatureType, func.array_agg(func.json_build_object('id', TaskType.id,
                                                                      'key_name', TaskType.key_name,
                                                                      'name', TaskType.name,
@@ -20,8 +29,11 @@ def get_feature_type(db: Session, name: str | None = None, feature_type_id: int
         stmt = stmt.where(FeatureType.name == name)
     if feature_type_id:
         stmt = stmt.where(FeatureType.id == feature_type_id)
+    return stmt
 
-    return db.execute(stmt).mappings().all()
+
+def get_feature_type(db: Session, name: str | None = None, feature_type_id: int | None = None):
+    return db.execute(feature_type_stmt(name=name, feature_type_id=feature_type_id)).mappings().all()
 
 
 def create_feature_type(name: str, description: str, db: Session):
@@ -39,30 +51,92 @@ def delete_feature_type(feature_type_id: int, db: Session):
     return None
 
 
-def get_all_features_pagination(db: Session,
-                                page: int = 1,
-                                page_size: int | None = None,
-                                user_id: int | None = None,
-                                release_id: int | None = None,
-                                platform_id: int | None = None,
-                                channel_id: int | None = None,
-                                feature_status: str | None = None,
-                                ):
-    task_attachments = select(AttachmentLink.task_id, func.json_build_object('id', AttachmentLink.id,
-                                                                             'link', AttachmentLink.link,
-                                                                             'uploadet_at', AttachmentLink.uploaded_at,
-                                                                             'uploaded_by',
-                                                                             AttachmentLink.uploaded_by).label(
-        'attachments'))
-    task_attachments_cte = task_attachments.cte('task_attachments_cte')
-    stmt = select(Feature, func.array_agg(func.json_build_object('id', Task.id,
-                                                                 'feature_id', Task.feature_id,
-                                                                 'task_type_id', Task.task_type_id,
-                                                                 'status', Task.status,
-                                                                 'attachments',
-                                                                 task_attachments_cte.c.attachments)).label('tasks'))
+# Колонки фичи в ответах списка и карточки ({'Feature': колонки, 'tasks': задачи}): строки читаются Core-запросом
+# и отдаются как dict без ORM-объектов
+FEATURE_OUT_COLUMNS = tuple(Feature.__table__.c)
+FEATURE_FIELDS = tuple(column.key for column in FEATURE_OUT_COLUMNS)
+# Вложенные данные фичи: вложения и комментарии — части задач, поэтому подтягивают и задачи
+FEATURE_INCLUDES = ('tasks', 'attachments', 'comments')
+# По умолчанию: список — задачи с вложениями, карточка — всё
+ALL_FEATURES_INCLUDE = ('tasks', 'attachments')
+FEATURE_DETAIL_INCLUDE = FEATURE_INCLUDES
+
+
+def feature_columns(fields: Iterable[str] | None = None) -> tuple:
+    """Колонки фичи по именам из FEATURE_FIELDS; без fields — все."""
+    if not fields:
+        return FEATURE_OUT_COLUMNS
+    return tuple(Feature.__table__.c[name] for name in fields)
+
+
+def task_attachments_lateral():
+    """
+    Вложения задачи — по строке на вложение, как и раньше: задача с несколькими вложениями повторяется в tasks.
+    LATERAL с условием по задаче читает только её вложения по ix_attachment_links_task_id, а не всю таблицу.
+    """
+    attachment = func.json_build_object('id', AttachmentLink.id,
+                                        'link', AttachmentLink.link,
+                                        'uploadet_at', AttachmentLink.uploaded_at,
+                                        'uploaded_by', AttachmentLink.uploaded_by)
+    return select(attachment.label('attachments')).where(AttachmentLink.task_id == Task.id).lateral('task_attachments')
+
+
+def task_comments_subquery():
+    """Комментарии задачи массивом (NULL, если их нет) — подзапрос по ix_task_comments_task_id."""
+    comment = func.json_build_object('id', TaskComment.id,
+                                     'comment', TaskComment.comment,
+                                     'created_at', TaskComment.created_at,
+                                     'user_id', TaskComment.user_id)
+    return select(func.array_agg(comment)).where(TaskComment.task_id == Task.id).scalar_subquery()
+
+
+def with_feature_tasks(stmt, task_fields: list, include: Iterable[str] = ALL_FEATURES_INCLUDE):
+    """
+    Добавляет к запросу фич задачи (агрегат tasks с полями task_fields) и, если они запрошены в include,
+    вложения и комментарии задач. Без задач в include join не строится: остаётся только условие, что задачи
+    у фичи есть, поэтому набор фич и total не зависят от include.
+    """
+    if 'tasks' not in include:
+        return stmt.where(exists().where(Task.feature_id == Feature.id))
+    fields = list(task_fields)
     stmt = stmt.join(Task, Task.feature_id == Feature.id)
-    stmt = stmt.join(task_attachments_cte, task_attachments_cte.c.task_id == Task.id, isouter=True)
+    if 'attachments' in include:
+        attachments = task_attachments_lateral()
+        stmt = stmt.join(attachments, true(), isouter=True)
+        fields += ['attachments', attachments.c.attachments]
+    if 'comments' in include:
+        fields += ['comments', task_comments_subquery()]
+    return stmt.add_columns(func.array_agg(func.json_build_object(*fields)).label('tasks')).group_by(Feature.id)
+
+
+def all_features_stmt(user_id: int | None = None,
+                      release_id: int | None = None,
+                      platform_id: int | None = None,
+                      channel_id: int | None = None,
+                      feature_status: str | None = None,
+                      fields: Iterable[str] | None = None,
+                      include: Iterable[str] = ALL_FEATURES_INCLUDE,
+                      ):
+    stmt = select(*feature_columns(fields))
+    stmt = with_feature_tasks(stmt,
+                              ['id', Task.id, 'feature_id', Task.feature_id, 'task_type_id', Task.task_type_id,
+                               'status', Task.status],
+                              include=include)
+    return apply_feature_filters(stmt,
+                                 user_id=user_id,
+                                 release_id=release_id,
+                                 platform_id=platform_id,
+                                 channel_id=channel_id,
+                                 feature_status=feature_status)
+
+
+def apply_feature_filters(stmt,
+                          user_id: int | None = None,
+                          release_id: int | None = None,
+                          platform_id: int | None = None,
+                          channel_id: int | None = None,
+                          feature_status: str | None = None,
+                          ):
     if user_id:
         stmt = stmt.where(Feature.creator_id == user_id)
     if release_id:
@@ -75,64 +149,236 @@ def get_all_features_pagination(db: Session,
             stmt = stmt.where(Release.channel_id == channel_id)
     if feature_status:
         stmt = stmt.where(Feature.status == feature_status)
-    stmt = stmt.group_by(Feature.id)
+    return stmt
+
+
+def features_count_stmt(user_id: int | None = None,
+                        release_id: int | None = None,
+                        platform_id: int | None = None,
+                        channel_id: int | None = None,
+                        feature_status: str | None = None,
+                        ):
+    """
+    Количество фич для листинга: только таблица features с фильтрами, без задач, вложений и агрегации.
+    """
+    stmt = select(func.count()).select_from(Feature).where(exists().where(Task.feature_id == Feature.id))
+    return apply_feature_filters(stmt,
+                                 user_id=user_id,
+                                 release_id=release_id,
+                                 platform_id=platform_id,
+                                 channel_id=channel_id,
+                                 feature_status=feature_status)
+
+
+def count_features(db: Session,
+                   user_id: int | None = None,
+                   release_id: int | None = None,
+                   platform_id: int | None = None,
+                   channel_id: int | None = None,
+                   feature_status: str | None = None,
+                   estimated: bool = False) -> int:
+    filtered = any([user_id, release_id, platform_id, channel_id, feature_status])
+    if estimated and not filtered:
+        estimate = db.execute(estimated_count_stmt(Feature)).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.execute(features_count_stmt(user_id=user_id,
+                                          release_id=release_id,
+                                          platform_id=platform_id,
+                                          channel_id=channel_id,
+                                          feature_status=feature_status)).scalar()
+
+
+def features_page_ids_stmt(page_size: int,
+                           after_id: int | None = None,
+                           user_id: int | None = None,
+                           release_id: int | None = None,
+                           platform_id: int | None = None,
+                           channel_id: int | None = None,
+                           feature_status: str | None = None,
+                           ):
+    """
+    id фич следующей keyset-страницы (от новых к старым) плюс один лишний — признак наличия продолжения.
+    Как и в all_features_stmt, фичи без задач в выдачу не попадают.
+    """
+    stmt = select(Feature.id).where(exists().where(Task.feature_id == Feature.id))
+    stmt = apply_feature_filters(stmt,
+                                 user_id=user_id,
+                                 release_id=release_id,
+                                 platform_id=platform_id,
+                                 channel_id=channel_id,
+                                 feature_status=feature_status)
+    if after_id is not None:
+        stmt = stmt.where(Feature.id < after_id)
+    return stmt.order_by(Feature.id.desc()).limit(page_size + 1)
+
+
+def get_all_features_pagination(db: Session,
+                                page: int = 1,
+                                page_size: int | None = None,
+                                user_id: int | None = None,
+                                release_id: int | None = None,
+                                platform_id: int | None = None,
+                                channel_id: int | None = None,
+                                feature_status: str | None = None,
+                                include_total: bool = True,
+                                estimate_total: bool = False,
+                                fields: Iterable[str] | None = None,
+                                include: Iterable[str] = ALL_FEATURES_INCLUDE,
+                                ):
+    stmt = all_features_stmt(user_id=user_id,
+                             release_id=release_id,
+                             platform_id=platform_id,
+                             channel_id=channel_id,
+                             feature_status=feature_status,
+                             fields=fields,
+                             include=include)
     # Защита от дурака
     if page == 0:
         page = 1
-    total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+    total = None
+    if include_total:
+        total = count_features(db=db,
+                               user_id=user_id,
+                               release_id=release_id,
+                               platform_id=platform_id,
+                               channel_id=channel_id,
+                               feature_status=feature_status,
+                               estimated=estimate_total)
     stmt = stmt.offset((page - 1) * page_size)
     stmt = stmt.limit(page_size)
     result = db.execute(stmt).mappings().all()
     return result, len(result), total
 
 
-def get_features(db: Session,
-                 feature_id: int | None = None,
-                 feature_name: str | None = None,
-                 user_id: int | None = None,
-                 jira_key: str | None = None,
-                 feature_status: str | None = None
-                 ):
-    task_attachments = select(AttachmentLink.task_id, func.json_build_object('id', AttachmentLink.id,
-                                                                             'link', AttachmentLink.link,
-                                                                             'uploadet_at', AttachmentLink.uploaded_at,
-                                                                             'uploaded_by',
-                                                                             AttachmentLink.uploaded_by).label(
-        'attachments'))
-    task_attachments_cte = task_attachments.cte('task_attachments_cte')
-
-    task_comments = select(TaskComment.task_id, func.array_agg(func.json_build_object('id', TaskComment.id,
-                                                                                      'comment', TaskComment.comment,
-                                                                                      'created_at',
-                                                                                      TaskComment.created_at,
-                                                                                      'user_id', TaskComment.user_id,
-                                                                                      )).label('comments'))
-    task_comments = task_comments.group_by(TaskComment.task_id)
-    task_comments_cte = task_comments.cte('task_comments_cte')
-
-    stmt = select(Feature, func.array_agg(func.json_build_object('id', Task.id,
-                                                                 'feature_id', Task.feature_id,
-                                                                 'task_type', TaskType.name,
-                                                                 'status', Task.status,
-                                                                 'attachments',
-                                                                 task_attachments_cte.c.attachments,
-                                                                 'comments', task_comments_cte.c.comments)).label(
-        'tasks'))
-    stmt = stmt.join(Task, Task.feature_id == Feature.id)
-    stmt = stmt.join(TaskType, TaskType.id == Task.task_type_id)
-    stmt = stmt.join(task_attachments_cte, task_attachments_cte.c.task_id == Task.id, isouter=True)
-    stmt = stmt.join(task_comments_cte, task_comments_cte.c.task_id == Task.id, isouter=True)
+def get_all_features_keyset(db: Session,
+                            page_size: int,
+                            after_id: int | None = None,
+                            user_id: int | None = None,
+                            release_id: int | None = None,
+                            platform_id: int | None = None,
+                            channel_id: int | None = None,
+                            feature_status: str | None = None,
+                            fields: Iterable[str] | None = None,
+                            include: Iterable[str] = ALL_FEATURES_INCLUDE,
+                            ):
+    if page_size == 0:
+        page_size = 50
+    ids = db.execute(features_page_ids_stmt(page_size=page_size,
+                                            after_id=after_id,
+                                            user_id=user_id,
+                                            release_id=release_id,
+                                            platform_id=platform_id,
+                                            channel_id=channel_id,
+                                            feature_status=feature_status)).scalars().all()
+    next_after_id = ids[page_size - 1] if len(ids) > page_size else None
+    ids = ids[:page_size]
+    if not ids:
+        return [], 0, None
+    stmt = all_features_stmt(fields=fields, include=include).where(Feature.id.in_(ids)).order_by(Feature.id.desc())
+    result = db.execute(stmt).mappings().all()
+    return result, len(result), next_after_id
+
+
+SEARCH_LIMIT = 100
+SEARCH_CANDIDATES = 1000
+
+
+def name_contains(query: str):
+    """lower(name) LIKE '%query%' с экранированием спецсимволов LIKE; обслуживается ix_features_name_trgm."""
+    escaped = query.lower().replace('/', '//').replace('%', '/%').replace('_', '/_')
+    return func.lower(Feature.name).like(f'%{escaped}%', escape='/')
+
+
+def features_stmt(feature_id: int | None = None,
+                  feature_name: str | None = None,
+                  user_id: int | None = None,
+                  jira_key: str | None = None,
+                  feature_status: str | None = None,
+                  fields: Iterable[str] | None = None,
+                  include: Iterable[str] = FEATURE_DETAIL_INCLUDE,
+                  ):
+    stmt = with_feature_tasks(select(*feature_columns(fields)),
+                              ['id', Task.id, 'feature_id', Task.feature_id, 'task_type', TaskType.name,
+                               'status', Task.status],
+                              include=include)
+    if 'tasks' in include:
+        stmt = stmt.join(TaskType, TaskType.id == Task.task_type_id)
     if feature_id:
         stmt = stmt.where(Feature.id == feature_id)
     if feature_name:
-        stmt = stmt.where(func.lower(Feature.name).like(f'%{feature_name.lower()}%'))
+        stmt = stmt.where(name_contains(feature_name))
     if user_id:
         stmt = stmt.where(Feature.creator_id == user_id)
     if jira_key:
         stmt = stmt.where(Feature.jira_key == jira_key)
     if feature_status:
         stmt = stmt.where(Feature.status == feature_status)
-    stmt = stmt.group_by(Feature.id)
+    return stmt
+
+
+def search_features_stmt(query: str,
+                         limit: int = 20,
+                         release_id: int | None = None,
+                         feature_status: str | None = None):
+    """
+    Поиск фич по имени: подстрока или похожее слово (pg_trgm word similarity).
+    Сначала точное совпадение имени, дальше по убыванию похожести.
+
+    Кандидаты отбираются по ix_features_name_trgm и ограничены SEARCH_CANDIDATES, поэтому
+    слишком общий запрос (совпадает с большей частью таблицы) не ранжирует всю таблицу.
+    """
+    query = query.strip().lower()
+    name = func.lower(Feature.name)
+    columns = [Feature.id,
+               Feature.name,
+               Feature.jira_key,
+               Feature.status,
+               Feature.created_at,
+               Feature.feature_type_id,
+               Feature.release_id]
+    filters = []
+    if release_id:
+        filters.append(Feature.release_id == release_id)
+    if feature_status:
+        filters.append(Feature.status == feature_status)
+    # Совпадения по подстроке и похожие имена отбираются отдельно, чтобы на общем запросе
+    # похожие имена не вытеснили точное совпадение из ограниченного набора кандидатов
+    contains = select(*columns).where(name_contains(query), *filters).limit(SEARCH_CANDIDATES)
+    similar = select(*columns).where(literal(query).op('<%')(name), *filters).limit(SEARCH_CANDIDATES)
+    candidates = union(contains, similar).subquery('candidates')
+    candidate_name = func.lower(candidates.c.name)
+    score = func.word_similarity(literal(query), candidate_name)
+    stmt = select(candidates, score.label('score'))
+    stmt = stmt.order_by((candidate_name == query).desc(), score.desc(), candidates.c.id.desc())
+    return stmt.limit(limit)
+
+
+def search_features(db: Session,
+                    query: str,
+                    limit: int = 20,
+                    release_id: int | None = None,
+                    feature_status: str | None = None):
+    stmt = search_features_stmt(query=query, limit=limit, release_id=release_id, feature_status=feature_status)
+    return db.execute(stmt).mappings().all()
+
+
+def get_features(db: Session,
+                 feature_id: int | None = None,
+                 feature_name: str | None = None,
+                 user_id: int | None = None,
+                 jira_key: str | None = None,
+                 feature_status: str | None = None,
+                 fields: Iterable[str] | None = None,
+                 include: Iterable[str] = FEATURE_DETAIL_INCLUDE,
+                 ):
+    stmt = features_stmt(feature_id=feature_id,
+                         feature_name=feature_name,
+                         user_id=user_id,
+                         jira_key=jira_key,
+                         feature_status=feature_status,
+                         fields=fields,
+                         include=include)
     return db.execute(stmt).mappings().all()
 
 
@@ -141,6 +387,65 @@ def get_feature(feature_id: int, db: Session) -> Feature:
     return db.execute(stmt).scalar_one_or_none()
 
 
+def feature_version_stmt(feature_id: int):
+    return select(Feature.id, Feature.version, Feature.updated_at).where(Feature.id == feature_id)
+
+
+def get_feature_version(feature_id: int, db: Session):
+    """Версия фичи вместе с задачами (см. sql_app.versioning); None, если фичи нет."""
+    return db.execute(feature_version_stmt(feature_id=feature_id)).one_or_none()
+
+
+def feature_name_exists_stmt(name: str):
+    return select(exists().where(func.lower(Feature.name) == name.lower()))
+
+
+def feature_name_exists(name: str, db: Session) -> bool:
+    """Проверка дубля по ix_features_name_lower: точное совпадение имени без учёта регистра."""
+    return db.execute(feature_name_exists_stmt(name)).scalar()
+
+
+def create_feature_stmt(user_id: int,
+                        name: str,
+                        feature_type_id: int,
+                        release_id: int,
+                        status: str,
+                        jira_key: str | None = None,
+                        task_status: str = 'open'):
+    """
+    Создание фичи вместе с задачами по шаблону её типа одним запросом.
+
+    Фича вставляется в CTE new_feature, задачи — INSERT ... SELECT из feature_type_task_types в CTE new_tasks,
+    результат собирается в ту же форму, что и у features_stmt: Feature и tasks.
+    При конфликте по имени (ix_features_name_lower) ничего не вставляется и запрос не возвращает строк.
+    """
+    new_feature = insert(Feature).values(creator_id=user_id,
+                                         name=name,
+                                         jira_key=jira_key,
+                                         feature_type_id=feature_type_id,
+                                         release_id=release_id,
+                                         status=status)
+    new_feature = new_feature.on_conflict_do_nothing(index_elements=[func.lower(Feature.name)])
+    new_feature = new_feature.returning(*Feature.__table__.c).cte('new_feature')
+
+    template = select(new_feature.c.id, FeatureTypeTaskType.task_type_id, literal(task_status))
+    template = template.join(FeatureTypeTaskType, FeatureTypeTaskType.feature_type_id == new_feature.c.feature_type_id)
+    new_tasks = insert(Task).from_select(['feature_id', 'task_type_id', 'status'], template)
+    new_tasks = new_tasks.returning(Task.id, Task.feature_id, Task.task_type_id, Task.status).cte('new_tasks')
+
+    feature = aliased(Feature, new_feature, name='Feature')
+    tasks = func.array_agg(func.json_build_object('id', new_tasks.c.id,
+                                                  'feature_id', new_tasks.c.feature_id,
+                                                  'task_type', TaskType.name,
+                                                  'status', new_tasks.c.status,
+                                                  'attachments', None,
+                                                  'comments', None)).filter(new_tasks.c.id.isnot(None))
+    stmt = select(feature, func.coalesce(tasks, EMPTY_JSON_ARRAY).label('tasks'))
+    stmt = stmt.join(new_tasks, new_tasks.c.feature_id == feature.id, isouter=True)
+    stmt = stmt.join(TaskType, TaskType.id == new_tasks.c.task_type_id, isouter=True)
+    return stmt.group_by(*new_feature.c)
+
+
 def create_feature(user_id: int,
                    name: str,
                    feature_type_id: int,
@@ -148,25 +453,30 @@ def create_feature(user_id: int,
                    status: str,
                    db: Session,
                    jira_key: str | None = None):
-    feature = Feature(creator_id=user_id,
-                      name=name,
-                      jira_key=jira_key,
-                      feature_type_id=feature_type_id,
-                      release_id=release_id,
-                      status=status)
-    db.add(feature)
+    """
+    Фича и её задачи создаются в одной транзакции за один запрос.
+    Возвращает строку с Feature и tasks или None, если фича с таким именем уже есть.
+    """
+    stmt = create_feature_stmt(user_id=user_id,
+                               name=name,
+                               jira_key=jira_key,
+                               feature_type_id=feature_type_id,
+                               release_id=release_id,
+                               status=status)
+    feature = db.execute(stmt).mappings().one_or_none()
+    if feature is not None:
+        # Отвязываем от сессии, чтобы commit не сбросил загруженные поля и ответ не перечитывал фичу
+        db.expunge(feature['Feature'])
     db.commit()
-    db.refresh(feature)
     return feature
 
 
-def update_feature(db: Session,
-                   feature_id: int | None = None,
-                   name: str | None = None,
-                   feature_type_id: int | None = None,
-                   release_id: int | None = None,
-                   status: str | None = None
-                   ):
+def update_feature_stmt(feature_id: int | None = None,
+                        name: str | None = None,
+                        feature_type_id: int | None = None,
+                        release_id: int | None = None,
+                        status: str | None = None
+                        ):
     stmt = update(Feature).where(Feature.id == feature_id)
     if name:
         stmt = stmt.values(name=name)
@@ -176,12 +486,158 @@ def update_feature(db: Session,
         stmt = stmt.values(release_id=release_id)
     if status:
         stmt = stmt.values(status=status)
-    stmt = stmt.returning(Feature)
+    return stmt.returning(Feature)
+
+
+def update_feature(db: Session,
+                   feature_id: int | None = None,
+                   name: str | None = None,
+                   feature_type_id: int | None = None,
+                   release_id: int | None = None,
+                   status: str | None = None
+                   ):
+    stmt = update_feature_stmt(feature_id=feature_id,
+                               name=name,
+                               feature_type_id=feature_type_id,
+                               release_id=release_id,
+                               status=status)
     result = db.execute(stmt).scalar_one()
     db.commit()
     return result
 
 
+def feature_type_task_types_stmt(feature_type_id):
+    return select(FeatureTypeTaskType.task_type_id).where(FeatureTypeTaskType.feature_type_id == feature_type_id)
+
+
+def delete_type_tasks_stmt(feature_id: int, feature_type_id: int):
+    """Задачи из шаблона текущего типа фичи, которых нет в шаблоне нового типа."""
+    current_type_id = select(Feature.feature_type_id).where(Feature.id == feature_id).scalar_subquery()
+    stmt = delete(Task).where(Task.feature_id == feature_id)
+    stmt = stmt.where(Task.task_type_id.in_(feature_type_task_types_stmt(current_type_id)))
+    return stmt.where(Task.task_type_id.not_in(feature_type_task_types_stmt(feature_type_id)))
+
+
+def create_type_tasks_stmt(feature_id: int, feature_type_id: int, status: str = 'open'):
+    """Задачи из шаблона нового типа, которых у фичи ещё нет."""
+    existing = select(Task.id).where(Task.feature_id == feature_id,
+                                     Task.task_type_id == FeatureTypeTaskType.task_type_id)
+    template = select(literal(feature_id), FeatureTypeTaskType.task_type_id, literal(status))
+    template = template.where(FeatureTypeTaskType.feature_type_id == feature_type_id, ~existing.exists())
+    return insert(Task).from_select(['feature_id', 'task_type_id', 'status'], template)
+
+
+def change_feature_type(feature_id: int, feature_type_id: int, db: Session) -> Feature:
+    """
+    Смена типа фичи с пересборкой задач по шаблону нового типа в одной транзакции:
+    удаление лишних задач, вставка недостающих и обновление фичи — по одному запросу на каждое.
+    """
+    db.execute(delete_type_tasks_stmt(feature_id=feature_id, feature_type_id=feature_type_id))
+    db.execute(create_type_tasks_stmt(feature_id=feature_id, feature_type_id=feature_type_id))
+    result = db.execute(update_feature_stmt(feature_id=feature_id, feature_type_id=feature_type_id)).scalar_one()
+    db.commit()
+    return result
+
+
+IMPORT_BATCH_SIZE = 1000
+
+
+def existing_release_ids_stmt(release_ids: set[int]):
+    return select(Release.id).where(Release.id.in_(release_ids))
+
+
+def existing_feature_type_ids_stmt(feature_type_ids: set[int]):
+    return select(FeatureType.id).where(FeatureType.id.in_(feature_type_ids))
+
+
+def existing_feature_names_stmt(names: set[str]):
+    return select(func.lower(Feature.name)).where(func.lower(Feature.name).in_(names))
+
+
+def import_features_stmt(user_id: int, rows: list[dict]):
+    stmt = insert(Feature).values([dict(row, creator_id=user_id) for row in rows])
+    stmt = stmt.on_conflict_do_nothing(index_elements=[func.lower(Feature.name)])
+    return stmt.returning(Feature.id, Feature.name)
+
+
+def create_template_tasks_stmt(feature_ids: list[int], status: str = 'open'):
+    """Задачи по шаблону типа для только что созданных фич: один INSERT ... SELECT на всю пачку."""
+    template = select(Feature.id, FeatureTypeTaskType.task_type_id, literal(status))
+    template = template.join(FeatureTypeTaskType, FeatureTypeTaskType.feature_type_id == Feature.feature_type_id)
+    template = template.where(Feature.id.in_(feature_ids))
+    return insert(Task).from_select(['feature_id', 'task_type_id', 'status'], template)
+
+
+def check_import_batch(batch: list[tuple[int, dict | None, str | None]],
+                       release_ids: set[int],
+                       feature_type_ids: set[int],
+                       existing_names: set[str],
+                       seen_names: set[str]):
+    """
+    Проверка пачки строк импорта по уже загруженным множествам существующих id и имён.
+    seen_names накапливает имена из предыдущих пачек, чтобы поймать дубли внутри файла.
+    """
+    valid, errors = [], []
+    for line, row, error in batch:
+        if error:
+            errors.append((line, error))
+        elif row['release_id'] not in release_ids:
+            errors.append((line, "Release not found"))
+        elif row['feature_type_id'] not in feature_type_ids:
+            errors.append((line, "Feature type not found"))
+        elif row['name'].lower() in seen_names:
+            errors.append((line, "Duplicate feature name in file"))
+        elif row['name'].lower() in existing_names:
+            errors.append((line, "Feature with this name already exists"))
+        else:
+            seen_names.add(row['name'].lower())
+            valid.append((line, row))
+    return valid, errors
+
+
+def import_features_batch(db: Session, batch: list, user_id: int, seen_names: set[str]):
+    rows = [row for _, row, error in batch if not error]
+    release_ids = set(db.execute(existing_release_ids_stmt({row['release_id'] for row in rows})).scalars())
+    feature_type_ids = set(db.execute(existing_feature_type_ids_stmt({row['feature_type_id'] for row in rows}))
+                           .scalars())
+    existing_names = set(db.execute(existing_feature_names_stmt({row['name'].lower() for row in rows})).scalars())
+    valid, errors = check_import_batch(batch, release_ids, feature_type_ids, existing_names, seen_names)
+    if not valid:
+        return 0, errors
+    inserted = db.execute(import_features_stmt(user_id=user_id, rows=[row for _, row in valid])).all()
+    # Имя могли занять параллельно после проверки: такие строки ON CONFLICT пропустил
+    inserted_names = {feature.name for feature in inserted}
+    errors.extend((line, "Feature with this name already exists") for line, row in valid
+                  if row['name'] not in inserted_names)
+    if inserted:
+        db.execute(create_template_tasks_stmt(feature_ids=[feature.id for feature in inserted]))
+    return len(inserted), errors
+
+
+async def import_features(db: Session | AsyncSession,
+                          rows: Iterable[tuple[int, dict | None, str | None]],
+                          user_id: int):
+    """
+    Массовое создание фич с задачами по шаблону их типов в одной транзакции.
+
+    rows — строки (номер строки, данные, ошибка разбора), читаются пачками по IMPORT_BATCH_SIZE:
+    на пачку приходится по одному запросу на проверку релизов, типов и имён, одна многострочная вставка фич
+    и один INSERT ... SELECT задач. Строки с ошибками пропускаются и попадают в отчёт.
+    Чтение файла и разбор строк синхронные, поэтому каждая пачка собирается в пуле потоков: event loop
+    не ждёт файла, а в памяти одновременно не больше одной пачки.
+    Возвращает число созданных фич и список (номер строки, ошибка).
+    """
+    created, errors, seen_names = 0, [], set()
+    batches = batched(rows, IMPORT_BATCH_SIZE)
+    while batch := await run_in_threadpool(next, batches, None):
+        batch_created, batch_errors = await run_db(db, import_features_batch,
+                                                   batch=batch, user_id=user_id, seen_names=seen_names)
+        created += batch_created
+        errors.extend(batch_errors)
+    await run_db(db, lambda db: db.commit())
+    return created, sorted(errors)
+
+
 def delete_feature(feature_id: int, db: Session):
     stmt = delete(Feature).where(Feature.id == feature_id).returning(Feature)
     result = db.execute(stmt).scalar_one()
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func, Index, text, event, DDL, BigInteger
 from datetime import datetime
 from sql_app.database import Base
+from sql_app.versioning import create_versioning
 
 
 class Feature(Base):
@@ -11,9 +12,29 @@ class Feature(Base):
     jira_key = Column(String, nullable=True)
     status = Column(String, nullable=False)
     created_at = Column(DateTime, nullable=False, server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
     release_id = Column(Integer, ForeignKey('releases.id', ondelete='CASCADE'), nullable=False)
     feature_type_id = Column(Integer, nullable=False)
     creator_id = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=False)
+    # Версия фичи вместе с задачами; ведётся триггерами (см. sql_app.versioning)
+    version = Column(BigInteger, nullable=False, server_default='1')
+
+    # Составные индексы (фильтр, id) обслуживают и фильтрацию, и keyset-пагинацию по id
+    __table_args__ = (
+        Index('ix_features_release_id_id', 'release_id', 'id'),
+        Index('ix_features_creator_id_id', 'creator_id', 'id'),
+        Index('ix_features_status_id', 'status', 'id'),
+        Index('ix_features_jira_key', 'jira_key', postgresql_where=text('jira_key IS NOT NULL')),
+        # Имя фичи уникально без учёта регистра; индекс же обслуживает проверку дубля и ON CONFLICT
+        Index('ix_features_name_lower', text('lower(name)'), unique=True),
+        # Триграммный индекс под поиск по подстроке и нечёткий поиск по имени (lower(name) LIKE / <%)
+        Index('ix_features_name_trgm', text('lower(name) gin_trgm_ops'), postgresql_using='gin'),
+    )
+
+
+# ix_features_name_trgm требует расширения pg_trgm ещё до создания таблицы
+event.listen(Feature.__table__, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+event.listen(Feature.__table__, 'after_create', create_versioning)
 
 
 class FeatureType(Base):
@@ -30,3 +51,7 @@ class FeatureTypeTaskType(Base):
     id = Column(Integer, primary_key=True, index=True)
     feature_type_id = Column(Integer, ForeignKey('feature_types.id'), nullable=False)
     task_type_id = Column(Integer, ForeignKey('task_types.id'), nullable=False)
+
+    __table_args__ = (
+        Index('ix_feature_type_task_types_feature_type_id', 'feature_type_id', 'task_type_id'),
+    )
@@ -1,8 +1,9 @@
 import enum
 
-from sqlalchemy import Column, Integer, String, Date, Enum, DateTime, func, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Enum, DateTime, func, ForeignKey, Index, BigInteger, event
 
 from sql_app.database import Base
+from sql_app.versioning import create_versioning
 
 
 class ReleaseStageEnum(enum.Enum):
@@ -24,6 +25,19 @@ class Release(Base):
     platform_id = Column(Integer, ForeignKey('platforms.id', ondelete='CASCADE'), nullable=False)
     channel_id = Column(Integer, ForeignKey('channels.id', ondelete='CASCADE'), nullable=False)
     release_type_id = Column(Integer, ForeignKey('release_types.id', ondelete='CASCADE'), nullable=False)
+    # Ведутся триггерами (см. sql_app.versioning): version — версия релиза вместе с фичами и задачами
+    version = Column(BigInteger, nullable=False, server_default='1')
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    # Составные индексы (фильтр, id) обслуживают и фильтрацию, и keyset-пагинацию по id
+    __table_args__ = (
+        Index('ix_releases_platform_id_id', 'platform_id', 'id'),
+        Index('ix_releases_channel_id_id', 'channel_id', 'id'),
+        Index('ix_releases_status_id', 'status', 'id'),
+    )
+
+
+event.listen(Release.__table__, 'after_create', create_versioning)
 
 
 class ReleaseType(Base):
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func, Index, BigInteger, event
 
 from sql_app.database import Base
+from sql_app.versioning import create_versioning
 
 
 class TaskType(Base):
@@ -20,6 +21,14 @@ class Task(Base):
     feature_id = Column(Integer, ForeignKey('features.id', ondelete='CASCADE'), nullable=False)
     task_type_id = Column(Integer, ForeignKey('task_types.id'), nullable=False)
     status = Column(String, nullable=False)
+    # Версия задачи вместе с вложениями и комментариями; ведётся триггерами (см. sql_app.versioning)
+    version = Column(BigInteger, nullable=False, server_default='1')
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_tasks_feature_id_task_type_id', 'feature_id', 'task_type_id'),
+        Index('ix_tasks_task_type_id', 'task_type_id'),
+    )
 
 
 class AttachmentLink(Base):
@@ -31,6 +40,10 @@ class AttachmentLink(Base):
     uploaded_at = Column(DateTime, nullable=False, server_default=func.now())
     uploaded_by = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=False)
 
+    __table_args__ = (
+        Index('ix_attachment_links_task_id', 'task_id'),
+    )
+
 
 class TaskTypeApprover(Base):
     __tablename__ = 'task_type_approvers'
@@ -46,3 +59,11 @@ class TaskComment(Base):
     user_id = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=False)
     comment = Column(String, nullable=False)
     created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_task_comments_task_id', 'task_id'),
+    )
+
+
+for versioned_table in (Task.__table__, AttachmentLink.__table__, TaskComment.__table__):
+    event.listen(versioned_table, 'after_create', create_versioning)
@@ -1,7 +1,7 @@
 import enum
 
 from passlib.context import CryptContext
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime, func, Index
 from sql_app.database import Base
 
 
@@ -29,3 +29,25 @@ class Role(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
     description = Column(String, nullable=True)
+
+
+class RefreshToken(Base):
+    """
+    Выданный refresh-токен. Хранится только sha256 токена; family_id общий у всей цепочки ротаций одного входа.
+    Отозванные токены живут до истечения срока: повторное предъявление такого токена отзывает всю цепочку.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    token_hash = Column(String, nullable=False)
+    family_id = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_refresh_tokens_token_hash', 'token_hash', unique=True),
+        Index('ix_refresh_tokens_user_id', 'user_id'),
+        Index('ix_refresh_tokens_family_id', 'family_id'),
+    )
@@ -1,23 +1,25 @@
-from sqlalchemy import select, insert
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from reference_cache import find_one
 from sql_app.models.platforms import Platform
+from sql_app.reference_data import PLATFORMS
 
 
 def create_platform(name: str, db: Session):
     stmt = insert(Platform).values(name=name).returning(Platform)
     platform = db.execute(stmt).scalar()
+    db.commit()
+    PLATFORMS.invalidate()
     return platform
 
 
 def get_platform(db: Session, platform_id: int | None = None, name: str | None = None):
-    stmt = select(Platform)
-    if platform_id:
-        stmt = stmt.where(Platform.id == platform_id)
-    if name:
-        stmt = stmt.where(Platform.name == name)
-    return db.execute(stmt).scalar_one_or_none()
+    return find_one(PLATFORMS.rows(db), id=platform_id or None, name=name or None)
 
 
 def get_all_platforms(db: Session):
-    stmt = select(Platform)
-    return db.execute(stmt).scalars().all()
+    return list(PLATFORMS.rows(db))
+
+
+def get_platforms_version(db: Session) -> str:
+    return PLATFORMS.snapshot(db).version
@@ -0,0 +1,72 @@
+"""
+Пулы соединений с телеметрией: время ожидания соединения, ошибки checkout и текущее заполнение пула.
+"""
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from metrics import Counter, Gauge, Histogram
+
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_engines: dict = {}
+# Настроенный max_overflow по имени пула: у QueuePool нет публичного способа его прочитать
+_max_overflows: dict[str, int] = {}
+
+
+def _collect(getter):
+    def collect():
+        return [({'pool': name}, getter(engine.pool)) for name, engine in _engines.items()]
+    return collect
+
+
+POOL_SIZE = Gauge('db_pool_size', 'Configured number of persistent connections in the pool', ['pool'],
+                  collect=_collect(lambda pool: pool.size()))
+POOL_MAX_OVERFLOW = Gauge('db_pool_max_overflow', 'Configured overflow limit of the pool', ['pool'],
+                          collect=lambda: [({'pool': name}, value) for name, value in _max_overflows.items()])
+POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections currently checked out of the pool', ['pool'],
+                         collect=_collect(lambda pool: pool.checkedout()))
+POOL_CHECKED_IN = Gauge('db_pool_checked_in', 'Idle connections currently held by the pool', ['pool'],
+                        collect=_collect(lambda pool: pool.checkedin()))
+POOL_OVERFLOW = Gauge('db_pool_overflow', 'Overflow connections currently open (negative while below pool size)',
+                      ['pool'], collect=_collect(lambda pool: pool.overflow()))
+POOL_CHECKOUT_WAIT = Histogram('db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection',
+                               ['pool'], buckets=POOL_WAIT_BUCKETS)
+POOL_CHECKOUT_FAILURES = Counter('db_pool_checkout_failures_total', 'Failed attempts to check out a connection',
+                                 ['pool', 'reason'])
+
+
+class _InstrumentedPoolMixin:
+    metrics_name = 'default'
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_FAILURES.inc(pool=self.metrics_name, reason='timeout')
+            raise
+        except Exception:
+            POOL_CHECKOUT_FAILURES.inc(pool=self.metrics_name, reason='error')
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, pool=self.metrics_name)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics_name = 'sync'
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics_name = 'async'
+
+
+def register_pool(engine, max_overflow: int):
+    """
+    Подключить пул движка к gauge-метрикам /metrics. Пул читается при каждом сборе, т.к. dispose() его пересоздаёт;
+    max_overflow — значение, с которым пул создан (DbSettings.MAX_OVERFLOW).
+    """
+    _engines[engine.pool.metrics_name] = engine
+    _max_overflows[engine.pool.metrics_name] = max_overflow
+    return engine
@@ -0,0 +1,46 @@
+"""
+Хуки движков SQLAlchemy: время каждого statement, учёт в QueryStats текущего HTTP-запроса и лог медленных запросов.
+"""
+import time
+
+from sqlalchemy import event
+
+import logg_config
+from metrics import Counter, Histogram
+from query_stats import current_stats, redact_parameters
+from settings import DbSettings
+
+logger = logg_config.get_logger(__name__)
+
+QUERY_DURATION = Histogram('db_query_duration_seconds', 'SQL statement execution time', ['pool'])
+SLOW_QUERIES = Counter('db_slow_queries_total', 'SQL statements slower than DB_SLOW_QUERY_MS', ['pool'])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'query_started', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    pool = conn.engine.pool.metrics_name
+    QUERY_DURATION.observe(duration, pool=pool)
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if DbSettings.SLOW_QUERY_MS and duration * 1000 >= DbSettings.SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(pool=pool)
+        # Значения параметров не логируются: в них могут быть хэши паролей, токены и персональные данные
+        logger.warning("Slow query (%.1f ms): %s; parameters: %s",
+                       duration * 1000, statement, redact_parameters(parameters))
+
+
+def instrument_engine(engine):
+    """Подключить хуки к движку; для AsyncEngine — к его sync_engine, события которого срабатывают и в async режиме."""
+    target = getattr(engine, 'sync_engine', engine)
+    event.listen(target, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(target, 'after_cursor_execute', _after_cursor_execute)
+    return engine
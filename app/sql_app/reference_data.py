@@ -0,0 +1,35 @@
+"""
+Справочники, которые читаются почти на каждой записи (проверка платформы и канала при создании релиза,
+согласующий при смене статуса задачи), а меняются несколько раз в год. См. reference_cache.
+"""
+from sqlalchemy import select
+
+from metrics import Counter
+from reference_cache import ReferenceCache, ReferenceTable
+from settings import AppSettings
+from sql_app.models.channels import Channel
+from sql_app.models.platforms import Platform
+from sql_app.models.releases import ReleaseType
+from sql_app.models.task import TaskType, TaskTypeApprover
+from sql_app.models.user import Role
+
+REFERENCE_CACHE_LOOKUPS = Counter('reference_cache_lookups_total', 'Reference data cache lookups by table and result',
+                                  ['table', 'result'])
+
+reference_cache = ReferenceCache(
+    ttl=AppSettings.REFERENCE_CACHE_TTL,
+    on_lookup=lambda table, hit: REFERENCE_CACHE_LOOKUPS.inc(table=table, result='hit' if hit else 'miss'))
+
+
+def table_stmt(model):
+    return select(*model.__table__.columns).order_by(model.id)
+
+
+PLATFORMS = ReferenceTable(reference_cache, 'platforms', table_stmt(Platform))
+CHANNELS = ReferenceTable(reference_cache, 'channels', table_stmt(Channel))
+RELEASE_TYPES = ReferenceTable(reference_cache, 'release_types', table_stmt(ReleaseType))
+TASK_TYPES = ReferenceTable(reference_cache, 'task_types', table_stmt(TaskType))
+ROLES = ReferenceTable(reference_cache, 'roles', table_stmt(Role))
+TASK_TYPE_APPROVERS = ReferenceTable(
+    reference_cache, 'task_type_approvers',
+    select(TaskTypeApprover.task_type_id, Role.name.label('role_name')).join(Role, Role.id == TaskTypeApprover.role_id))
@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from fastapi import HTTPException
-from sqlalchemy import select, delete, func
+from sqlalchemy import select, delete, func, literal_column, cast, String
 import pytz
 from sqlalchemy.orm import Session
 from sqlalchemy.sql.functions import coalesce
@@ -9,42 +9,120 @@ from sqlalchemy.sql.functions import coalesce
 from schemas import ReleaseStageCreate
 from sql_app.models.features import Feature
 from sql_app.models.releases import Release, ReleaseType
+from sql_app.models.task import Task, TaskType
+from sql_app.reference_data import RELEASE_TYPES
+from sql_app.statistics import estimated_count_stmt
+
+# Явный тип литерала: asyncpg иначе передаёт '{}' параметром VARCHAR и COALESCE с json[] падает
+EMPTY_JSON_ARRAY = literal_column("'{}'::json[]")
 
 
 def create_release(stage: ReleaseStageCreate, db) -> Release:
-    db_stage = Release(**stage.dict())
+    # Даты приходят строками: psycopg2 передаёт их как есть, asyncpg требует datetime — разбираются как в update_release
+    db_stage = Release(**stage.dict(exclude={'start_date', 'end_date'}),
+                       start_date=datetime.fromisoformat(stage.start_date).astimezone(pytz.UTC),
+                       end_date=datetime.fromisoformat(stage.end_date).astimezone(pytz.UTC))
     db.add(db_stage)
     db.commit()
     db.refresh(db_stage)
     return db_stage
 
 
+def release_filters(platform_id: int | None = None,
+                    channel_id: int | None = None,
+                    status: str | None = None) -> list:
+    filters = []
+    if platform_id:
+        filters.append(Release.platform_id == platform_id)
+    if channel_id:
+        filters.append(Release.channel_id == channel_id)
+    if status:
+        filters.append(Release.status == status)
+    return filters
+
+
+# Поля релиза и его фич в ответах списка и карточки (ReleaseStageOutWithFeature): строки читаются Core-запросом
+# и отдаются как dict без ORM-объектов и pydantic-моделей
+RELEASE_OUT_COLUMNS = (Release.id, Release.name, Release.description, Release.start_date, Release.end_date,
+                       Release.status, Release.platform_id, Release.channel_id, Release.release_type_id)
+RELEASE_FEATURE_COLUMNS = (Feature.id, Feature.name, Feature.jira_key, Feature.feature_type_id, Feature.status)
+
+
+def release_features_agg():
+    fields = []
+    for column in RELEASE_FEATURE_COLUMNS:
+        fields += [column.key, column]
+    return coalesce(func.array_agg(func.json_build_object(*fields)).filter(Feature.id.isnot(None)),
+                    EMPTY_JSON_ARRAY).label('features')
+
+
+def all_releases_stmt(platform_id: int | None = None,
+                      channel_id: int | None = None,
+                      status: str | None = None):
+    stmt = select(*RELEASE_OUT_COLUMNS, release_features_agg())
+    stmt = stmt.join(Feature, Feature.release_id == Release.id, isouter=True)
+    stmt = stmt.where(*release_filters(platform_id=platform_id, channel_id=channel_id, status=status))
+    return stmt.group_by(Release.id)
+
+
+def releases_count_stmt(platform_id: int | None = None,
+                        channel_id: int | None = None,
+                        status: str | None = None):
+    """
+    Количество релизов считается по самой таблице releases, без join с фичами и агрегации.
+    """
+    stmt = select(func.count()).select_from(Release)
+    return stmt.where(*release_filters(platform_id=platform_id, channel_id=channel_id, status=status))
+
+
+def count_releases(db: Session,
+                   platform_id: int | None = None,
+                   channel_id: int | None = None,
+                   status: str | None = None,
+                   estimated: bool = False) -> int:
+    filters = release_filters(platform_id=platform_id, channel_id=channel_id, status=status)
+    if estimated and not filters:
+        estimate = db.execute(estimated_count_stmt(Release)).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.execute(releases_count_stmt(platform_id=platform_id, channel_id=channel_id, status=status)).scalar()
+
+
+def releases_page_ids_stmt(page_size: int,
+                           after_id: int | None = None,
+                           platform_id: int | None = None,
+                           channel_id: int | None = None,
+                           status: str | None = None):
+    """
+    id релизов следующей keyset-страницы (от новых к старым) плюс один лишний — признак наличия продолжения.
+    """
+    stmt = select(Release.id).where(*release_filters(platform_id=platform_id, channel_id=channel_id, status=status))
+    if after_id is not None:
+        stmt = stmt.where(Release.id < after_id)
+    return stmt.order_by(Release.id.desc()).limit(page_size + 1)
+
+
 def get_all_releases(db: Session,
                      page: int,
                      page_size: int,
                      platform_id: int | None = None,
                      channel_id: int | None = None,
                      status: str | None = None,
+                     include_total: bool = True,
+                     estimate_total: bool = False,
                      ):
-    stmt = select(Release, coalesce(func.array_agg(func.json_build_object('id', Feature.id,
-                                                                          'name', Feature.name,
-                                                                          'feature_type_id', Feature.feature_type_id,
-                                                                          'status', Feature.status,
-                                                                          )).filter(Feature.id.isnot(None)),
-                                    '{}').label('features'))
-    stmt = stmt.join(Feature, Feature.release_id == Release.id, isouter=True)
-    if platform_id:
-        stmt = stmt.where(Release.platform_id == platform_id)
-    if channel_id:
-        stmt = stmt.where(Release.channel_id == channel_id)
-    if status:
-        stmt = stmt.where(Release.status == status)
+    stmt = all_releases_stmt(platform_id=platform_id, channel_id=channel_id, status=status)
     if page == 0:
         page = 1
     if page_size == 0:
         page_size = 50
-    stmt = stmt.group_by(Release.id)
-    total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+    total = None
+    if include_total:
+        total = count_releases(db=db,
+                               platform_id=platform_id,
+                               channel_id=channel_id,
+                               status=status,
+                               estimated=estimate_total)
     stmt = stmt.offset((page - 1) * page_size)
     stmt = stmt.limit(page_size)
     result = db.execute(stmt).mappings().all()
@@ -52,6 +130,29 @@ def get_all_releases(db: Session,
     return result, len(result), total
 
 
+def get_all_releases_keyset(db: Session,
+                            page_size: int,
+                            after_id: int | None = None,
+                            platform_id: int | None = None,
+                            channel_id: int | None = None,
+                            status: str | None = None,
+                            ):
+    if page_size == 0:
+        page_size = 50
+    ids = db.execute(releases_page_ids_stmt(page_size=page_size,
+                                            after_id=after_id,
+                                            platform_id=platform_id,
+                                            channel_id=channel_id,
+                                            status=status)).scalars().all()
+    next_after_id = ids[page_size - 1] if len(ids) > page_size else None
+    ids = ids[:page_size]
+    if not ids:
+        return [], 0, None
+    stmt = all_releases_stmt().where(Release.id.in_(ids)).order_by(Release.id.desc())
+    result = db.execute(stmt).mappings().all()
+    return result, len(result), next_after_id
+
+
 def get_release(db: Session, name: str | None = None, release_id: int | None = None):
     stmt = select(Release)
     if name:
@@ -93,13 +194,18 @@ def delete_release(stage_id: int, db: Session):
 
 
 def get_all_release_types(db: Session):
-    return db.execute(select(ReleaseType)).scalars().all()
+    return list(RELEASE_TYPES.rows(db))
+
+
+def get_release_types_version(db: Session) -> str:
+    return RELEASE_TYPES.snapshot(db).version
 
 
 def create_release_type(name: str, platform_id: int, channel_id: int, db: Session):
     release_type = ReleaseType(name=name, platform_id=platform_id, channel_id=channel_id)
     db.add(release_type)
     db.commit()
+    RELEASE_TYPES.invalidate()
     db.refresh(release_type)
     return release_type
 
@@ -108,18 +214,97 @@ def delete_release_type(release_type_id: int, db: Session):
     stmt = delete(ReleaseType).where(ReleaseType.id == release_type_id).returning(ReleaseType)
     release_type = db.execute(stmt).one()
     db.commit()
+    RELEASE_TYPES.invalidate()
     return release_type
 
 
-def get_release_with_features(release_id: int, db: Session):
-    stmt = select(Release, coalesce(func.array_agg(func.json_build_object('id', Feature.id,
-                                                                          'name', Feature.name,
-                                                                          'jira_key', Feature.jira_key,
-                                                                          'feature_type_id', Feature.feature_type_id,
-                                                                          'status', Feature.status,
-                                                                          )).filter(Feature.id.isnot(None)),
-                                    '{}').label('features'))
+def release_with_features_stmt(release_id: int):
+    stmt = select(*RELEASE_OUT_COLUMNS, release_features_agg())
     stmt = stmt.join(Feature, Feature.release_id == Release.id, isouter=True)
     stmt = stmt.where(Release.id == release_id)
-    stmt = stmt.group_by(Release.id)
-    return db.execute(stmt).one()
+    return stmt.group_by(Release.id)
+
+
+def get_release_with_features(release_id: int, db: Session):
+    return db.execute(release_with_features_stmt(release_id=release_id)).one()
+
+
+def release_version_stmt(release_id: int):
+    return select(Release.id, Release.version, Release.updated_at).where(Release.id == release_id)
+
+
+def get_release_version(release_id: int, db: Session):
+    """
+    Версия релиза вместе с фичами и задачами (см. sql_app.versioning) — чтение одной строки по ключу;
+    None, если релиза нет.
+    """
+    return db.execute(release_version_stmt(release_id=release_id)).one_or_none()
+
+
+REPORT_BATCH_SIZE = 1000
+
+
+def release_report_rows_stmt(release_id: int):
+    stmt = select(Feature.name, Feature.jira_key, Feature.status, Feature.feature_type_id)
+    return stmt.where(Feature.release_id == release_id).order_by(Feature.id)
+
+
+def report_releases_stmt(release_ids: list[int] | None = None,
+                         platform_id: int | None = None,
+                         channel_id: int | None = None,
+                         status: str | None = None):
+    stmt = select(Release.id, Release.name)
+    stmt = stmt.where(*release_filters(platform_id=platform_id, channel_id=channel_id, status=status))
+    if release_ids:
+        stmt = stmt.where(Release.id.in_(release_ids))
+    return stmt.order_by(Release.id)
+
+
+def get_report_releases(db: Session,
+                        limit: int,
+                        release_ids: list[int] | None = None,
+                        platform_id: int | None = None,
+                        channel_id: int | None = None,
+                        status: str | None = None) -> list[tuple[int, str]]:
+    """Релизы (id, name) для отчёта на несколько релизов; limit отсекает слишком большие выборки."""
+    stmt = report_releases_stmt(release_ids=release_ids, platform_id=platform_id, channel_id=channel_id, status=status)
+    return [tuple(row) for row in db.execute(stmt.limit(limit))]
+
+
+def get_release_report_rows(release_id: int, db: Session, batch_size: int = REPORT_BATCH_SIZE):
+    """Фичи релиза для отчёта пачками по batch_size из серверного курсора, без загрузки всего релиза в память."""
+    stmt = release_report_rows_stmt(release_id=release_id).execution_options(yield_per=batch_size)
+    yield from db.execute(stmt).partitions()
+
+
+EXPORT_BATCH_SIZE = 5000
+
+
+def export_rows_stmt(release_id: int | None = None,
+                     platform_id: int | None = None,
+                     channel_id: int | None = None,
+                     status: str | None = None):
+    """Строки выгрузки (поля exports.EXPORT_FIELDS): задача фичи вместе с фичей и релизом."""
+    stmt = select(Release.id, Release.name, cast(Release.status, String), Release.platform_id, Release.channel_id,
+                  Feature.id, Feature.name, Feature.jira_key, Feature.status, Feature.feature_type_id,
+                  Feature.created_at, Feature.updated_at,
+                  Task.id, Task.task_type_id, TaskType.key_name, Task.status)
+    stmt = stmt.join(Feature, Feature.release_id == Release.id)
+    stmt = stmt.join(Task, Task.feature_id == Feature.id, isouter=True)
+    stmt = stmt.join(TaskType, TaskType.id == Task.task_type_id, isouter=True)
+    stmt = stmt.where(*release_filters(platform_id=platform_id, channel_id=channel_id, status=status))
+    if release_id is not None:
+        stmt = stmt.where(Release.id == release_id)
+    return stmt.order_by(Release.id, Feature.id, Task.id)
+
+
+def get_export_rows(db: Session,
+                    release_id: int | None = None,
+                    platform_id: int | None = None,
+                    channel_id: int | None = None,
+                    status: str | None = None,
+                    batch_size: int = EXPORT_BATCH_SIZE):
+    """Строки выгрузки пачками из серверного курсора, без загрузки всей выборки в память."""
+    stmt = export_rows_stmt(release_id=release_id, platform_id=platform_id, channel_id=channel_id, status=status)
+    stmt = stmt.execution_options(yield_per=batch_size)
+    yield from db.execute(stmt).partitions()
@@ -0,0 +1,13 @@
+from sqlalchemy import select, cast, BigInteger, table, column, literal
+from sqlalchemy.dialects.postgresql import REGCLASS
+
+pg_class = table('pg_class', column('oid'), column('reltuples'))
+
+
+def estimated_count_stmt(model):
+    """
+    Оценка числа строк таблицы по статистике планировщика (pg_class.reltuples) — без сканирования таблицы.
+    Для таблицы, по которой ещё не было ANALYZE, Postgres возвращает -1.
+    """
+    return select(cast(pg_class.c.reltuples, BigInteger)).where(
+        pg_class.c.oid == cast(literal(model.__tablename__), REGCLASS))
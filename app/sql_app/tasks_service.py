@@ -1,18 +1,15 @@
 from sqlalchemy import select, delete, func, and_, update, insert
 from sqlalchemy.orm import Session
 
+from reference_cache import find_one
+from sql_app.features_service import name_contains
 from sql_app.models.features import FeatureTypeTaskType, Feature, FeatureType
 from sql_app.models.task import TaskType, Task, AttachmentLink, TaskTypeApprover, TaskComment
-from sql_app.models.user import Role
+from sql_app.reference_data import reference_cache, TASK_TYPES, TASK_TYPE_APPROVERS
 
 
 def get_task_type(db: Session, key_name: str | None = None, id: int | None = None):
-    stmt = select(TaskType)
-    if key_name:
-        stmt = stmt.where(TaskType.key_name == key_name)
-    if id:
-        stmt = stmt.where(TaskType.id == id)
-    return db.execute(stmt).scalar_one_or_none()
+    return find_one(TASK_TYPES.rows(db), key_name=key_name or None, id=id or None)
 
 
 def create_task_type(db: Session,
@@ -27,6 +24,7 @@ def create_task_type(db: Session,
                          )
     db.add(task_type)
     db.commit()
+    TASK_TYPES.invalidate()
     db.refresh(task_type)
     return task_type
 
@@ -35,13 +33,13 @@ def delete_task_type(task_type_id: int, db: Session):
     stmt = delete(TaskType).where(TaskType.id == task_type_id).returning(TaskType)
     db.execute(stmt)
     db.commit()
+    reference_cache.invalidate(TASK_TYPES.name, TASK_TYPE_APPROVERS.name)
     return None
 
 
-def get_all_task_types(db: Session,
-                       feature_id: int | None = None,
-                       feature_name: str | None = None,
-                       key_name: str | None = None):
+def all_task_types_stmt(feature_id: int | None = None,
+                        feature_name: str | None = None,
+                        key_name: str | None = None):
     stmt = select(TaskType)
     if feature_id or feature_name:
         stmt = stmt.join(FeatureTypeTaskType, FeatureTypeTaskType.task_type_id == TaskType.id)
@@ -50,17 +48,34 @@ def get_all_task_types(db: Session,
     if feature_id:
         stmt = stmt.where(Feature.id == feature_id)
     if feature_name:
-        stmt = stmt.where(func.lower(Feature.name).like(f'%{feature_name.lower()}%'))
+        stmt = stmt.where(name_contains(feature_name))
     if key_name:
         stmt = stmt.where(TaskType.key_name == key_name)
+    return stmt
+
+
+def get_all_task_types(db: Session,
+                       feature_id: int | None = None,
+                       feature_name: str | None = None,
+                       key_name: str | None = None):
+    if not (feature_id or feature_name or key_name):
+        return list(TASK_TYPES.rows(db))
+    stmt = all_task_types_stmt(feature_id=feature_id, feature_name=feature_name, key_name=key_name)
     return db.execute(stmt).scalars().all()
 
 
-def get_task_type_for_feature_type(db: Session, feature_type_id: int):
+def get_task_types_version(db: Session) -> str:
+    return TASK_TYPES.snapshot(db).version
+
+
+def task_type_for_feature_type_stmt(feature_type_id: int):
     stmt = select(TaskType)
     stmt = stmt.join(FeatureTypeTaskType, FeatureTypeTaskType.task_type_id == TaskType.id)
-    stmt = stmt.where(FeatureTypeTaskType.feature_type_id == feature_type_id)
-    return db.execute(stmt).scalars().all()
+    return stmt.where(FeatureTypeTaskType.feature_type_id == feature_type_id)
+
+
+def get_task_type_for_feature_type(db: Session, feature_type_id: int):
+    return db.execute(task_type_for_feature_type_stmt(feature_type_id=feature_type_id)).scalars().all()
 
 
 def create_task(feature_id: int, task_type_id: int, status: str, db: Session):
@@ -71,7 +86,7 @@ def create_task(feature_id: int, task_type_id: int, status: str, db: Session):
     return None
 
 
-def get_task_for_feature(db: Session, feature_id: int):
+def task_for_feature_stmt(feature_id: int):
     stmt = select(Task, func.json_build_object('id', TaskType.id,
                                                'key_name', TaskType.key_name,
                                                'name', TaskType.name,
@@ -80,8 +95,11 @@ def get_task_for_feature(db: Session, feature_id: int):
         'task_type'))
     stmt = stmt.join(TaskType, TaskType.id == Task.task_type_id)
     stmt = stmt.where(Task.feature_id == feature_id)
-    stmt = stmt.group_by(Task.id, TaskType.id)
-    return db.execute(stmt).all()
+    return stmt.group_by(Task.id, TaskType.id)
+
+
+def get_task_for_feature(db: Session, feature_id: int):
+    return db.execute(task_for_feature_stmt(feature_id=feature_id)).all()
 
 
 def delete_task(feature_id: int, task_type_id: int, db: Session):
@@ -112,16 +130,14 @@ def create_attachment(task_id: int, link: str, user_id: int, db: Session):
 
 
 def get_task_type_approver(task_type_id: int, db: Session):
-    stmt = select(TaskTypeApprover.task_type_id, Role.name.label('role_name'))
-    stmt = stmt.join(Role, Role.id == TaskTypeApprover.role_id)
-    stmt = stmt.where(TaskTypeApprover.task_type_id == task_type_id)
-    return db.execute(stmt).one_or_none()
+    return find_one(TASK_TYPE_APPROVERS.rows(db), task_type_id=task_type_id)
 
 
 def create_task_type_approver(task_type_id: int, role_id: int, db):
     stmt = insert(TaskTypeApprover).values(task_type_id=task_type_id, role_id=role_id).returning(TaskTypeApprover)
     approver = db.execute(stmt).scalar()
     db.commit()
+    TASK_TYPE_APPROVERS.invalidate()
     return approver
 
 
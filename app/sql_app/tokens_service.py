@@ -0,0 +1,79 @@
+import hashlib
+import secrets
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.orm import Session
+
+from settings import AppSettings
+from sql_app.models.user import RefreshToken, User
+
+
+def refresh_token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def add_refresh_token(user_id: int, db: Session, family_id: str | None = None) -> str:
+    """Добавляет токен в сессию без коммита; без family_id начинается новая цепочка (новый вход)."""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(user_id=user_id,
+                        token_hash=refresh_token_hash(token),
+                        family_id=family_id or uuid.uuid4().hex,
+                        expires_at=func.now() + timedelta(days=AppSettings.REFRESH_TOKEN_EXPIRE_DAYS)))
+    return token
+
+
+def issue_refresh_token(user_id: int, db: Session) -> str:
+    # Просроченные токены пользователя удаляются при входе, чтобы таблица не росла бесконечно
+    db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id, RefreshToken.expires_at <= func.now()))
+    token = add_refresh_token(user_id=user_id, db=db)
+    db.commit()
+    return token
+
+
+def rotate_refresh_token_stmt(token_hash: str):
+    """Отзыв действующего токена одним UPDATE: из двух одновременных обновлений одним токеном пройдёт одно."""
+    stmt = update(RefreshToken).where(RefreshToken.token_hash == token_hash,
+                                      RefreshToken.revoked_at.is_(None),
+                                      RefreshToken.expires_at > func.now())
+    username = select(User.username).where(User.id == RefreshToken.user_id).scalar_subquery()
+    return stmt.values(revoked_at=func.now()).returning(RefreshToken.user_id,
+                                                        RefreshToken.family_id,
+                                                        username.label('username'))
+
+
+def revoke_family_stmt(token_hash: str):
+    family_id = select(RefreshToken.family_id).where(RefreshToken.token_hash == token_hash).scalar_subquery()
+    stmt = update(RefreshToken).where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+    return stmt.values(revoked_at=func.now())
+
+
+def revoke_user_tokens_stmt(user_id: int):
+    stmt = update(RefreshToken).where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+    return stmt.values(revoked_at=func.now())
+
+
+def rotate_refresh_token(token: str, db: Session):
+    """
+    Обмен refresh-токена на новый из той же цепочки. Возвращает (новый токен, user_id, username)
+    или None, если токен неизвестен, просрочен или отозван.
+
+    Предъявление уже отозванного токена значит, что им воспользовался кто-то ещё (токен украден или
+    клиент повторил запрос): вся цепочка отзывается, и входить придётся заново.
+    """
+    token_hash = refresh_token_hash(token)
+    row = db.execute(rotate_refresh_token_stmt(token_hash)).one_or_none()
+    if row is None:
+        db.execute(revoke_family_stmt(token_hash))
+        db.commit()
+        return None
+    new_token = add_refresh_token(user_id=row.user_id, db=db, family_id=row.family_id)
+    db.commit()
+    return new_token, row.user_id, row.username
+
+
+def revoke_refresh_token(token: str, db: Session):
+    """Выход: отзывается вся цепочка токена, то есть этот вход на всех его ротациях."""
+    db.execute(revoke_family_stmt(refresh_token_hash(token)))
+    db.commit()
@@ -1,9 +1,12 @@
 from sqlalchemy import select, update, delete
 from sqlalchemy.orm import Session
 
-from auth import get_password_hash
+from auth import user_cache
+from reference_cache import find_one
 from schemas import UserCreate
 from sql_app.models.user import User, Role
+from sql_app.reference_data import ROLES
+from sql_app.tokens_service import revoke_user_tokens_stmt
 
 
 def get_user(db: Session, username: str | None = None, user_id: int | None = None) -> User:
@@ -19,23 +22,28 @@ def update_user_email(user_id: int, email: str, db) -> User:
     stmt = update(User).where(User.id == user_id).values(email=email).returning(User)
     user = db.execute(stmt).first()
     db.commit()
+    user_cache.invalidate(user_id=user_id)
     return user
 
 
-def update_user(user_id: int, db: Session, role: str | None = None, password: str | None = None) -> User:
+def update_user(user_id: int, db: Session, role: str | None = None, hashed_password: str | None = None) -> User:
+    """hashed_password считает вызывающий (auth.get_password_hash_async), чтобы bcrypt не шёл в потоке запроса."""
     values = {}
     if role is not None:
         values['role'] = role.value
-    if password is not None:
-        values['hashed_password'] = get_password_hash(password.password)
+    if hashed_password is not None:
+        values['hashed_password'] = hashed_password
+        # Смена пароля завершает все входы пользователя
+        db.execute(revoke_user_tokens_stmt(user_id=user_id))
     stmt = update(User).where(User.id == user_id).values(**values).returning(User)
     user = db.execute(stmt).scalar_one()
     db.commit()
+    user_cache.invalidate(user_id=user_id)
     return user
 
 
-def create_user(user: UserCreate, db: Session) -> User:
-    db_user = User(username=user.username, email=user.email, hashed_password=get_password_hash(user.password))
+def create_user(user: UserCreate, hashed_password: str, db: Session) -> User:
+    db_user = User(username=user.username, email=user.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
@@ -50,13 +58,9 @@ def delete_user(db: Session, user_id: int):
     stmt = delete(User).where(User.id == user_id).returning(User)
     user = db.execute(stmt).scalar_one()
     db.commit()
+    user_cache.invalidate(user_id=user_id)
     return user
 
 
 def get_role(db: Session, role_id: int | None = None, name: str | None = None) -> Role:
-    stmt = select(Role)
-    if role_id:
-        stmt = stmt.where(Role.id == role_id)
-    if name:
-        stmt = stmt.where(Role.name == name)
-    return db.execute(stmt).scalar_one_or_none()
+    return find_one(ROLES.rows(db), id=role_id or None, name=name or None)
@@ -0,0 +1,98 @@
+"""
+Версии релизов, фич и задач, которые ведёт сама база.
+
+У строки releases, features и tasks есть version и updated_at. BEFORE UPDATE-триггер увеличивает version
+при любом изменении строки, а updated_at ставит только при изменении самой строки. Изменение дочерних строк
+поднимается вверх statement-триггерами: комментарий или вложение задачи -> задача -> фича -> релиз.
+Поэтому version релиза — версия всего агрегата (релиз, его фичи и их задачи), version фичи — версия фичи с
+задачами, и проверка актуальности кэша — чтение одной строки по первичному ключу.
+
+Триггеры срабатывают на любые изменения — из сервисов, импорта и ручных запросов. Цена — блокировка строки
+родителя до конца транзакции: параллельные изменения фич одного релиза выстраиваются в очередь на строке релиза.
+"""
+from sqlalchemy import text
+
+# (таблица, родительская таблица, колонка ссылки на родителя)
+VERSIONED_TABLES = ('releases', 'features', 'tasks')
+VERSION_PARENTS = (
+    ('features', 'releases', 'release_id'),
+    ('tasks', 'features', 'feature_id'),
+    ('attachment_links', 'tasks', 'task_id'),
+    ('task_comments', 'tasks', 'task_id'),
+)
+
+ROW_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    -- version, выставленный явно, приходит из дочерней таблицы: сама строка не менялась
+    IF NEW.version IS NOT DISTINCT FROM OLD.version THEN
+        NEW.updated_at := now();
+    END IF;
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END
+$$
+"""
+
+# TG_ARGV[0] — родительская таблица, TG_ARGV[1] — колонка ссылки на неё. Строки родителей блокируются
+# в порядке id, чтобы параллельные пакетные изменения не взаимоблокировались, и FOR NO KEY UPDATE, а не
+# FOR UPDATE: проверка внешнего ключа у вставки дочерней строки держит FOR KEY SHARE на родителе, и две
+# транзакции, добавляющие фичи в один релиз, с FOR UPDATE ждали бы друг друга.
+PARENT_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_parent_version() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    parent_ids text;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        parent_ids := 'SELECT ' || quote_ident(TG_ARGV[1]) || ' FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        parent_ids := 'SELECT ' || quote_ident(TG_ARGV[1]) || ' FROM old_rows';
+    ELSE
+        parent_ids := 'SELECT ' || quote_ident(TG_ARGV[1]) || ' FROM new_rows UNION SELECT '
+                      || quote_ident(TG_ARGV[1]) || ' FROM old_rows';
+    END IF;
+    EXECUTE 'UPDATE ' || quote_ident(TG_ARGV[0]) || ' SET version = version + 1 WHERE id IN (SELECT id FROM '
+            || quote_ident(TG_ARGV[0]) || ' WHERE id IN (' || parent_ids || ') ORDER BY id FOR NO KEY UPDATE)';
+    RETURN NULL;
+END
+$$
+"""
+
+PARENT_TRIGGERS = (
+    ('insert', 'INSERT', 'REFERENCING NEW TABLE AS new_rows'),
+    ('update', 'UPDATE', 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+    ('delete', 'DELETE', 'REFERENCING OLD TABLE AS old_rows'),
+)
+
+
+def row_version_statements(table: str) -> list[str]:
+    trigger = f'{table}_row_version'
+    return [f'DROP TRIGGER IF EXISTS {trigger} ON {table}',
+            f'CREATE TRIGGER {trigger} BEFORE UPDATE ON {table} FOR EACH ROW EXECUTE FUNCTION bump_row_version()']
+
+
+def parent_version_statements(table: str) -> list[str]:
+    statements = []
+    for child, parent, column in VERSION_PARENTS:
+        if child != table:
+            continue
+        for suffix, operation, referencing in PARENT_TRIGGERS:
+            trigger = f'{table}_{parent}_version_{suffix}'
+            statements += [f'DROP TRIGGER IF EXISTS {trigger} ON {table}',
+                           f"CREATE TRIGGER {trigger} AFTER {operation} ON {table} {referencing} "
+                           f"FOR EACH STATEMENT EXECUTE FUNCTION bump_parent_version('{parent}', '{column}')"]
+    return statements
+
+
+def versioning_statements(table: str) -> list[str]:
+    """Функции и триггеры версий для таблицы: ведение своей версии и подъём версии родителя."""
+    statements = [ROW_VERSION_FUNCTION, PARENT_VERSION_FUNCTION]
+    if table in VERSIONED_TABLES:
+        statements += row_version_statements(table)
+    return statements + parent_version_statements(table)
+
+
+def create_versioning(target, connection, **kw):
+    """Слушатель after_create: create_all создаёт триггеры вместе с таблицей, миграция 0006 — на существующей базе."""
+    for statement in versioning_statements(target.name):
+        connection.execute(text(statement))
@@ -0,0 +1,79 @@
+"""
+Кэш аутентифицированных пользователей в памяти процесса.
+
+Без него каждый запрос с токеном делает запрос к users. Записи живут ttl секунд (LRU сверх max_size)
+и сбрасываются явно при изменении и удалении пользователя. Кэш у каждого процесса свой: сброс в одном
+воркере другие увидят только по истечении ttl, поэтому ttl короткий.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Снимок пользователя, не привязанный к сессии: один объект безопасно отдаётся разным запросам."""
+    id: int
+    username: str
+    email: str | None
+    role: str | None
+
+    @classmethod
+    def from_orm(cls, user) -> 'CachedUser':
+        return cls(id=user.id, username=user.username, email=user.email, role=user.role)
+
+
+class UserCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, CachedUser]] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> CachedUser | None:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires <= time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return user
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, user: CachedUser, generation: int):
+        """
+        Пользователь, прочитанный до сброса, не сохраняется: generation берётся до чтения из users, и если за это
+        время пользователя изменили или удалили, строка могла не увидеть изменение.
+        """
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            if self._generation != generation:
+                return
+            self._entries[user.username] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int | None = None, username: str | None = None):
+        with self._lock:
+            self._generation += 1
+            if username is not None:
+                self._entries.pop(username, None)
+            if user_id is not None:
+                for key, (_, user) in list(self._entries.items()):
+                    if user.id == user_id:
+                        del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
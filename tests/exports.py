@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app.exports import EXPORT_FIELDS, export_chunks
+
+ROWS = [
+    (1, 'Release', 'open', 1, 2, 10, 'Feature', None, 'open', 1, datetime(2024, 1, 1), datetime(2024, 1, 2),
+     100, 3, 'test', 'done'),
+    (1, 'Release', 'open', 1, 2, 11, 'Без задач', 'J-1', 'review', 2, datetime(2024, 1, 1), datetime(2024, 1, 1),
+     None, None, None, None),
+]
+
+
+def test_csv_export_has_header_once():
+    data = b''.join(export_chunks('csv', [ROWS[:1], [], ROWS[1:]])).decode()
+    rows = list(csv.reader(io.StringIO(data)))
+    assert rows[0] == list(EXPORT_FIELDS)
+    assert len(rows) == 3
+    assert rows[2][6] == 'Без задач' and rows[2][12] == ''
+
+
+def test_csv_export_without_rows_is_header_only():
+    assert b''.join(export_chunks('csv', [])).decode().strip() == ','.join(EXPORT_FIELDS)
+
+
+def test_jsonl_export_rows_are_objects():
+    lines = b''.join(export_chunks('jsonl', [ROWS])).decode().splitlines()
+    assert len(lines) == 2
+    first = json.loads(lines[0])
+    assert list(first) == list(EXPORT_FIELDS)
+    assert first['feature_created_at'] == '2024-01-01T00:00:00'
+    assert json.loads(lines[1])['task_id'] is None
+
+
+def test_parquet_export_writes_row_group_per_batch():
+    pq = pytest.importorskip('pyarrow.parquet')
+    data = b''.join(export_chunks('parquet', [ROWS[:1], ROWS[1:]]))
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column_names == list(EXPORT_FIELDS)
+    assert table.column('task_id').to_pylist() == [100, None]
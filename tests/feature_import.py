@@ -0,0 +1,56 @@
+import io
+
+from app.feature_import import read_rows, batched, import_rows, import_file_format, ImportFormatENUM
+
+HEADER = b'name,jira_key,status,feature_type_id,release_id\r\n'
+
+
+def rows(data: bytes, file_format: str = 'csv'):
+    return list(read_rows(io.BytesIO(data), file_format))
+
+
+def test_csv_rows_are_normalized():
+    result = rows(b'\xef\xbb\xbf' + HEADER + b' Login ,,open,1,2\r\n,,,,\r\n"Multi\nline",J-1,done,2,1\r\n')
+    assert result == [
+        (2, {'name': 'Login', 'jira_key': None, 'status': 'open', 'feature_type_id': '1', 'release_id': '2'}, None),
+        (5, {'name': 'Multi\nline', 'jira_key': 'J-1', 'status': 'done', 'feature_type_id': '2', 'release_id': '1'},
+         None),
+    ]
+
+
+def test_csv_requires_header_columns():
+    assert rows(b'name,status\nA,open\n') == [(1, None, 'Missing columns: feature_type_id, release_id')]
+
+
+def test_csv_stops_on_invalid_encoding():
+    result = rows(HEADER + b'A,,open,1,1\nB\xff,,open,1,1\nC,,open,1,1\n')
+    assert [line for line, _, _ in result] == [2, 3]
+    assert result[-1][2] == 'Line is not valid UTF-8'
+
+
+def test_jsonl_reports_bad_lines_and_continues():
+    result = rows(b'{"name": "A", "status": "open", "feature_type_id": 1, "release_id": 1}\n'
+                  b'\n[1]\n{oops\n{"name": "\xff"}\n{"name": "B"}\n', 'jsonl')
+    assert [(line, error) for line, _, error in result] == [
+        (1, None), (3, 'Row must be a JSON object'), (4, 'Invalid JSON'), (5, 'Invalid JSON'), (6, None)]
+    assert result[-1][1]['status'] is None
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+def test_import_rows_validate_schema_and_status():
+    data = HEADER + b'Login,,open,1,2\r\nNo type,,open,x,2\r\nOdd,,lost,1,2\r\n'
+    result = list(import_rows(io.BytesIO(data), ImportFormatENUM.CSV))
+    assert result[0] == (2, {'name': 'Login', 'jira_key': None, 'status': 'open', 'feature_type_id': 1,
+                             'release_id': 2}, None)
+    assert result[1][0] == 3 and result[1][2].startswith('feature_type_id: ')
+    assert result[2] == (4, None, 'Unknown feature status: lost')
+
+
+def test_import_file_format():
+    assert import_file_format('features.NDJSON', None) is ImportFormatENUM.JSONL
+    assert import_file_format('features.txt', None) is ImportFormatENUM.CSV
+    assert import_file_format(None, ImportFormatENUM.JSONL) is ImportFormatENUM.JSONL
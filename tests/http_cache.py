@@ -0,0 +1,23 @@
+from starlette.responses import Response
+
+from app.http_cache import conditional_get, version_etag
+
+
+def test_version_etag_is_strong_and_stable():
+    etag = version_etag('platforms', 'abc', 1)
+    assert etag == version_etag('platforms', 'abc', 1)
+    assert etag.startswith('"platforms-') and etag.endswith('"')
+    assert etag != version_etag('platforms', 'abc', 2)
+
+
+def test_conditional_get_sets_headers_on_mismatch():
+    response = Response()
+    assert conditional_get(response, '"other"', '"current"', max_age=60) is None
+    assert response.headers['etag'] == '"current"'
+    assert response.headers['cache-control'] == 'public, max-age=60'
+
+
+def test_conditional_get_returns_not_modified_on_match():
+    cached = conditional_get(Response(), 'W/"current"', '"current"')
+    assert cached.status_code == 304
+    assert cached.headers['cache-control'] == 'public, no-cache'
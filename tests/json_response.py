@@ -0,0 +1,46 @@
+import datetime
+import enum
+import json
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+
+from app import fast_json
+from app.fast_json import FastJSONResponse, dumps, row_dict
+
+
+class Status(enum.Enum):
+    OPEN = 'open'
+
+
+CONTENT = {'data': [{'id': 1,
+                     'name': 'Релиз',
+                     'status': Status.OPEN,
+                     'start_date': datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc),
+                     'created_at': datetime.datetime(2026, 10, 18, 12, 51, 21, 39000),
+                     'end_date': None,
+                     'features': [{'id': 2, 'jira_key': None}]}],
+           'total': 1}
+
+
+def test_dumps_matches_jsonable_encoder():
+    assert json.loads(dumps(CONTENT)) == jsonable_encoder(CONTENT)
+
+
+def test_dumps_without_orjson(monkeypatch):
+    monkeypatch.setattr(fast_json, 'orjson', None)
+    assert json.loads(dumps(CONTENT)) == jsonable_encoder(CONTENT)
+    assert 'Релиз' in dumps(CONTENT).decode()
+
+
+def test_response_renders_with_dumps():
+    response = FastJSONResponse(CONTENT)
+    assert response.body == dumps(CONTENT)
+    assert response.media_type == 'application/json'
+
+
+def test_row_dict_accepts_row_and_mapping():
+    with create_engine('sqlite://').connect() as connection:
+        row = connection.exec_driver_sql('SELECT 1 AS a, 2 AS b').one()
+    assert row_dict(row) == {'a': 1, 'b': 2}
+    assert row_dict(row._mapping) == {'a': 1, 'b': 2}
@@ -0,0 +1,33 @@
+from app.metrics import Counter, Histogram, REGISTRY, render_latest
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_wait_seconds', 'Test histogram', ['pool'], buckets=(0.1, 1))
+    REGISTRY.remove(histogram)
+    histogram.observe(0.05, pool='sync')
+    histogram.observe(0.5, pool='sync')
+    histogram.observe(5, pool='sync')
+    samples = {(name, labels.get('le')): value for name, labels, value in histogram.samples()}
+    assert samples[('test_wait_seconds_bucket', '0.1')] == 1
+    assert samples[('test_wait_seconds_bucket', '1')] == 2
+    assert samples[('test_wait_seconds_bucket', '+Inf')] == 3
+    assert samples[('test_wait_seconds_count', None)] == 3
+
+
+def test_counter_renders_prometheus_text():
+    counter = Counter('test_failures_total', 'Test counter', ['pool', 'reason'])
+    counter.inc(pool='sync', reason='timeout')
+    counter.inc(2, pool='sync', reason='timeout')
+    try:
+        assert 'test_failures_total{pool="sync",reason="timeout"} 3' in render_latest()
+    finally:
+        REGISTRY.remove(counter)
+
+
+def test_histogram_value_on_bound_lands_in_that_bucket():
+    histogram = Histogram('test_size_bytes', 'Test histogram', ['route'], buckets=(100, 1000))
+    REGISTRY.remove(histogram)
+    histogram.observe(100, route='/metrics')
+    histogram.observe(1001, route='/metrics')
+    samples = {labels.get('le'): value for name, labels, value in histogram.samples() if name.endswith('_bucket')}
+    assert samples == {'100': 1, '1000': 1, '+Inf': 2}
@@ -0,0 +1,20 @@
+import pytest
+from fastapi import HTTPException
+
+from app.pagination import encode_cursor, decode_cursor
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+
+
+def test_empty_cursor_is_first_page():
+    assert decode_cursor('') is None
+    assert encode_cursor(None) is None
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor(1)[:-2] + '!!', 'eyJpZCI6ImEifQ'])
+def test_invalid_cursor_returns_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
@@ -0,0 +1,81 @@
+import time
+
+from sqlalchemy import column, select, table
+
+from app.reference_cache import ReferenceCache, ReferenceTable, find_one
+
+platforms = table('platforms', column('id'), column('name'))
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def execute(self, stmt):
+        self.queries += 1
+        return list(self.rows)
+
+
+def make_table(ttl: float = 60, lookups: list | None = None) -> ReferenceTable:
+    on_lookup = (lambda name, hit: lookups.append((name, hit))) if lookups is not None else None
+    return ReferenceTable(ReferenceCache(ttl=ttl, on_lookup=on_lookup), 'platforms', select(platforms))
+
+
+def test_table_is_read_once_and_counted():
+    lookups = []
+    reference = make_table(lookups=lookups)
+    db = FakeSession([(1, 'android'), (2, 'ios')])
+    assert reference.rows(db) == reference.rows(db)
+    assert db.queries == 1
+    assert lookups == [('platforms', False), ('platforms', True)]
+
+
+def test_rows_are_accessible_by_name_and_index():
+    rows = make_table().rows(FakeSession([(1, 'android')]))
+    assert rows[0].name == 'android'
+    assert rows[0][1] == 'android'
+
+
+def test_find_one_skips_empty_conditions():
+    rows = make_table().rows(FakeSession([(1, 'android'), (2, 'ios')]))
+    assert find_one(rows, id=None, name='ios').id == 2
+    assert find_one(rows, id=1, name='ios') is None
+    assert find_one(rows, id=3) is None
+
+
+def test_invalidate_reloads_table():
+    reference = make_table()
+    db = FakeSession([(1, 'android')])
+    reference.rows(db)
+    db.rows.append((2, 'ios'))
+    reference.invalidate()
+    assert len(reference.rows(db)) == 2
+    assert db.queries == 2
+
+
+def test_entries_expire_after_ttl():
+    reference = make_table(ttl=0.01)
+    db = FakeSession([(1, 'android')])
+    reference.rows(db)
+    time.sleep(0.02)
+    reference.rows(db)
+    assert db.queries == 2
+
+
+def test_snapshot_read_before_invalidation_is_not_stored():
+    reference = make_table()
+    generation = reference.cache.generation('platforms')
+    reference.invalidate()
+    reference.cache.put('platforms', ((1, 'stale'),), generation)
+    assert reference.cache.get('platforms') is None
+
+
+def test_snapshot_version_changes_with_rows():
+    reference = make_table()
+    db = FakeSession([(1, 'android')])
+    version = reference.snapshot(db).version
+    assert reference.snapshot(db).version == version
+    db.rows.append((2, 'ios'))
+    reference.invalidate()
+    assert reference.snapshot(db).version != version
@@ -0,0 +1,73 @@
+import uuid
+
+import pytest
+from sqlalchemy import exc, update, func, text
+from sqlalchemy.orm import Session
+
+from sql_app import tokens_service, users_service
+from sql_app.database import engine
+from sql_app.models.user import RefreshToken, User
+
+
+@pytest.fixture
+def db():
+    """Сессия в транзакции, которая откатывается после теста: commit в сервисах фиксирует только savepoint."""
+    try:
+        connection = engine.connect()
+    except exc.OperationalError:
+        pytest.skip('database is not available')
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode='create_savepoint')
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(username=f'tokens-{uuid.uuid4().hex}', email=None, hashed_password='hash', role=None)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_rotation_is_one_time(db, user):
+    token = tokens_service.issue_refresh_token(user_id=user.id, db=db)
+    new_token, user_id, username = tokens_service.rotate_refresh_token(token=token, db=db)
+    assert (user_id, username) == (user.id, user.username)
+    assert new_token != token
+    assert tokens_service.rotate_refresh_token(token=new_token, db=db) is not None
+
+
+def test_reused_token_revokes_whole_family(db, user):
+    token = tokens_service.issue_refresh_token(user_id=user.id, db=db)
+    other_login = tokens_service.issue_refresh_token(user_id=user.id, db=db)
+    new_token, _, _ = tokens_service.rotate_refresh_token(token=token, db=db)
+    assert tokens_service.rotate_refresh_token(token=token, db=db) is None
+    assert tokens_service.rotate_refresh_token(token=new_token, db=db) is None
+    assert tokens_service.rotate_refresh_token(token=other_login, db=db) is not None
+
+
+def test_expired_token_is_rejected(db, user):
+    token = tokens_service.issue_refresh_token(user_id=user.id, db=db)
+    db.execute(update(RefreshToken).where(RefreshToken.user_id == user.id)
+               .values(expires_at=func.now() - text("interval '1 second'")))
+    assert tokens_service.rotate_refresh_token(token=token, db=db) is None
+
+
+def test_unknown_token_is_rejected(db, user):
+    assert tokens_service.rotate_refresh_token(token='unknown', db=db) is None
+
+
+def test_logout_revokes_family(db, user):
+    token = tokens_service.issue_refresh_token(user_id=user.id, db=db)
+    new_token, _, _ = tokens_service.rotate_refresh_token(token=token, db=db)
+    tokens_service.revoke_refresh_token(token=token, db=db)
+    assert tokens_service.rotate_refresh_token(token=new_token, db=db) is None
+
+
+def test_password_change_revokes_all_logins(db, user):
+    tokens = [tokens_service.issue_refresh_token(user_id=user.id, db=db) for _ in range(2)]
+    users_service.update_user(user_id=user.id, db=db, hashed_password='new hash')
+    assert all(tokens_service.rotate_refresh_token(token=token, db=db) is None for token in tokens)
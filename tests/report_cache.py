@@ -0,0 +1,75 @@
+import os
+
+from app.http_cache import etag_matches
+from app.report_cache import ReportCache
+
+
+def write_report(directory, name: str, size: int) -> str:
+    file_path = os.path.join(directory, name)
+    with open(file_path, 'wb') as file:
+        file.write(b'x' * size)
+    return file_path
+
+
+def cached(cache: ReportCache, release_id: int, version: str) -> bytes | None:
+    file_path = cache.get(release_id, version)
+    if file_path is None:
+        return None
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    os.remove(file_path)
+    return content
+
+
+def test_put_replaces_previous_release_version(tmp_path):
+    cache = ReportCache(directory=str(tmp_path / 'cache'), max_bytes=100)
+    assert cache.put(1, 'aaa', write_report(tmp_path, 'first.xlsx', 10))
+    assert cached(cache, 1, 'aaa') == b'x' * 10
+    assert cache.put(1, 'bbb', write_report(tmp_path, 'second.xlsx', 20))
+    assert cached(cache, 1, 'aaa') is None
+    assert cached(cache, 1, 'bbb') == b'x' * 20
+
+
+def test_put_keeps_callers_file(tmp_path):
+    cache = ReportCache(directory=str(tmp_path), max_bytes=100)
+    file_path = write_report(tmp_path, 'report.xlsx', 10)
+    assert cache.put(1, 'aaa', file_path)
+    assert cache.put(1, 'aaa', write_report(tmp_path, 'same.xlsx', 10))
+    assert os.path.exists(file_path)
+
+
+def test_read_survives_invalidation(tmp_path):
+    cache = ReportCache(directory=str(tmp_path), max_bytes=100)
+    cache.put(1, 'aaa', write_report(tmp_path, 'first.xlsx', 10))
+    file_path = cache.get(1, 'aaa')
+    cache.put(1, 'bbb', write_report(tmp_path, 'second.xlsx', 10))
+    assert not os.path.exists(cache.path(1, 'aaa'))
+    with open(file_path, 'rb') as file:
+        assert file.read() == b'x' * 10
+
+
+def test_evicts_least_recently_read(tmp_path):
+    cache = ReportCache(directory=str(tmp_path), max_bytes=25)
+    cache.put(1, 'aaa', write_report(tmp_path, 'one.xlsx', 10))
+    cache.put(2, 'aaa', write_report(tmp_path, 'two.xlsx', 10))
+    os.utime(cache.path(1, 'aaa'), (1, 1))
+    os.utime(cache.path(2, 'aaa'), (2, 2))
+    cached(cache, 1, 'aaa')
+    cache.put(3, 'aaa', write_report(tmp_path, 'three.xlsx', 10))
+    assert cached(cache, 2, 'aaa') is None
+    assert cached(cache, 1, 'aaa') and cached(cache, 3, 'aaa')
+
+
+def test_report_larger_than_cache_is_not_stored(tmp_path):
+    cache = ReportCache(directory=str(tmp_path), max_bytes=5)
+    file_path = write_report(tmp_path, 'big.xlsx', 10)
+    assert not cache.put(1, 'aaa', file_path)
+    assert os.path.exists(file_path)
+    assert cache.get(1, 'aaa') is None
+
+
+def test_etag_matches_weak_and_wildcard():
+    assert etag_matches('W/"release-1-aaa", "other"', '"release-1-aaa"')
+    assert etag_matches('*', '"release-1-aaa"')
+    assert not etag_matches('"release-1-bbb"', '"release-1-aaa"')
+    assert not etag_matches(None, '"release-1-aaa"')
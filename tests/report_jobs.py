@@ -0,0 +1,90 @@
+import os
+import time
+from concurrent.futures import Future
+
+import pytest
+from fastapi import HTTPException
+
+from app.report_jobs import ReportJobs, ReportJobLimitError, ReportSettings, REPORT_TEMP_PREFIX
+from app.routers import reports_router
+from app.routers.reports_router import get_user_job
+from app.user_cache import CachedUser
+
+RELEASES = [(1, 'Release 1')]
+
+
+class StubPool:
+    """Вместо пула процессов: задачи не выполняются, их завершают тесты."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, func, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(ReportSettings, 'CACHE_DIR', str(tmp_path))
+    jobs = ReportJobs(workers=1, max_active=2, max_active_per_user=1, ttl=60)
+    jobs._executor = StubPool()
+    return jobs
+
+
+def test_active_jobs_are_limited_per_user_and_overall(jobs):
+    jobs.submit(user_id=1, releases=RELEASES)
+    with pytest.raises(ReportJobLimitError, match='for this user'):
+        jobs.submit(user_id=1, releases=RELEASES)
+    jobs.submit(user_id=2, releases=RELEASES)
+    with pytest.raises(ReportJobLimitError, match='Too many report jobs in progress$'):
+        jobs.submit(user_id=3, releases=RELEASES)
+
+
+def test_finished_job_frees_its_slot(jobs):
+    job = jobs.submit(user_id=1, releases=RELEASES)
+    job.future.set_result(job.file_path)
+    assert job.status == 'done'
+    jobs.submit(user_id=1, releases=RELEASES)
+
+
+def test_failed_job_keeps_error_and_drops_file(jobs):
+    job = jobs.submit(user_id=1, releases=RELEASES)
+    job.future.set_exception(RuntimeError('boom'))
+    assert job.status == 'failed'
+    assert job.error == 'Report generation failed'
+    assert not os.path.exists(job.file_path)
+
+
+def test_purge_removes_expired_jobs_with_files(jobs):
+    job = jobs.submit(user_id=1, releases=RELEASES)
+    running = jobs.submit(user_id=2, releases=RELEASES)
+    job.future.set_result(job.file_path)
+    job.expires = time.monotonic() - 1
+    assert jobs.get(job.id) is None
+    assert not os.path.exists(job.file_path)
+    assert jobs.get(running.id) is running
+
+
+def test_orphan_files_are_removed_on_submit(jobs, tmp_path):
+    orphan = tmp_path / f'{REPORT_TEMP_PREFIX}orphan.xlsx'
+    orphan.write_bytes(b'x')
+    os.utime(orphan, (1, 1))
+    fresh = tmp_path / f'{REPORT_TEMP_PREFIX}fresh.xlsx'
+    fresh.write_bytes(b'x')
+    old_job = jobs.submit(user_id=1, releases=RELEASES)
+    os.utime(old_job.file_path, (1, 1))
+    jobs.submit(user_id=2, releases=RELEASES)
+    assert not orphan.exists()
+    assert fresh.exists() and os.path.exists(old_job.file_path)
+
+
+def test_job_is_visible_to_owner_and_admin_only(jobs, monkeypatch):
+    monkeypatch.setattr(reports_router, 'report_jobs', jobs)
+    job = jobs.submit(user_id=1, releases=RELEASES)
+    assert get_user_job(job.id, CachedUser(id=1, username='owner', email=None, role='user')) is job
+    assert get_user_job(job.id, CachedUser(id=2, username='admin', email=None, role='admin')) is job
+    with pytest.raises(HTTPException) as error:
+        get_user_job(job.id, CachedUser(id=3, username='other', email=None, role='user'))
+    assert error.value.status_code == 404
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from app.query_stats import QueryStats, redact_parameters
+
+
+def test_repeated_statements_are_reported_above_threshold():
+    stats = QueryStats()
+    for _ in range(5):
+        stats.record('SELECT * FROM tasks WHERE id = %(id_1)s', 0.001)
+    stats.record('SELECT * FROM features', 0.002)
+    assert stats.count == 6
+    assert stats.repeated(5) == [('SELECT * FROM tasks WHERE id = %(id_1)s', 5)]
+    assert stats.repeated(6) == []
+    assert stats.repeated(0) == []
+
+
+def test_server_timing_header():
+    stats = QueryStats()
+    stats.record('SELECT 1', 0.0125)
+    assert stats.server_timing() == 'db;dur=12.5;desc="1 queries"'
+
+
+def test_parameters_are_redacted():
+    assert redact_parameters({'name': 'secret', 'id': 1, 'at': datetime(2024, 1, 1), 'none': None}) == \
+        {'name': '<str>', 'id': '<int>', 'at': '<datetime>', 'none': '<null>'}
+    assert redact_parameters(('token', 5)) == ['<str>', '<int>']
+    assert redact_parameters([{'hash': 'x'}, {'hash': 'y'}]) == {'sets': 2, 'first': {'hash': '<str>'}}
@@ -0,0 +1,51 @@
+import time
+
+from app.user_cache import CachedUser, UserCache
+
+
+def make_user(user_id: int, username: str, role: str = 'user') -> CachedUser:
+    return CachedUser(id=user_id, username=username, email=f'{username}@example.com', role=role)
+
+
+def test_entries_expire_after_ttl():
+    cache = UserCache(ttl=0.01, max_size=10)
+    cache.put(make_user(1, 'admin'), cache.generation())
+    assert cache.get('admin').id == 1
+    time.sleep(0.02)
+    assert cache.get('admin') is None
+
+
+def test_least_recently_used_entry_is_dropped():
+    cache = UserCache(ttl=60, max_size=2)
+    cache.put(make_user(1, 'admin'), cache.generation())
+    cache.put(make_user(2, 'manager'), cache.generation())
+    cache.get('admin')
+    cache.put(make_user(3, 'tester'), cache.generation())
+    assert cache.get('manager') is None
+    assert cache.get('admin') and cache.get('tester')
+
+
+def test_invalidate_by_user_id():
+    cache = UserCache(ttl=60, max_size=10)
+    cache.put(make_user(1, 'admin'), cache.generation())
+    cache.put(make_user(2, 'manager'), cache.generation())
+    cache.invalidate(user_id=2)
+    assert cache.get('manager') is None
+    assert cache.get('admin') is not None
+
+
+def test_zero_ttl_disables_cache():
+    cache = UserCache(ttl=0, max_size=10)
+    cache.put(make_user(1, 'admin'), cache.generation())
+    assert cache.get('admin') is None
+
+
+def test_user_read_before_invalidate_is_not_cached():
+    cache = UserCache(ttl=60, max_size=10)
+    generation = cache.generation()
+    stale = make_user(1, 'admin', role='admin')
+    cache.invalidate(user_id=1)
+    cache.put(stale, generation)
+    assert cache.get('admin') is None
+    cache.put(make_user(1, 'admin'), cache.generation())
+    assert cache.get('admin').role == 'user'